@@ -0,0 +1,238 @@
+"""
+Module with the statistics of the channels, kept up to date incrementally.
+
+Each batch of samples is reduced once to its count, mean, sum of squared
+deviations from the mean, minimum and maximum, per channel, and the
+batches are then merged with the formulas of Welford and Chan et al.,
+so the statistics never need to scan the stored data again.
+The NaN samples are ignored.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+class RunningStats:
+    """
+    Statistics of a set of samples, per column.
+
+    `m2` is the sum of the squared deviations from the mean.
+    """
+
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+
+    def __init__(self, n_columns: int) -> None:
+        """Create the statistics of no samples."""
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.nan)
+        self.max = np.full(n_columns, np.nan)
+
+    @classmethod
+    def from_batch(cls, values: np.ndarray) -> RunningStats:
+        """Return the statistics of a `(n_columns, n)` batch."""
+        stats = cls(values.shape[0])
+        if values.shape[1] == 0:
+            return stats
+
+        valid = ~np.isnan(values)
+        stats.count = valid.sum(axis=1).astype(float)
+        total = np.where(valid, values, 0).sum(axis=1)
+        stats.mean = np.divide(
+            total, stats.count, out=np.zeros_like(total), where=stats.count > 0
+        )
+        deviations = np.where(valid, values - stats.mean[:, None], 0)
+        stats.m2 = (deviations**2).sum(axis=1)
+        stats.min = np.fmin.reduce(values, axis=1)
+        stats.max = np.fmax.reduce(values, axis=1)
+        return stats
+
+    def copy(self) -> RunningStats:
+        """Return an independent copy of the statistics."""
+        stats = RunningStats(len(self.count))
+        stats.merge(self)
+        return stats
+
+    def merge(self, other: RunningStats) -> None:
+        """Add the samples of `other` to these statistics."""
+        count = self.count + other.count
+        # The columns without samples keep zero mean and m2
+        weight = np.divide(
+            other.count, count, out=np.zeros_like(count), where=count > 0
+        )
+        delta = other.mean - self.mean
+
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * weight
+        self.mean = self.mean + delta * weight
+        self.count = count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Return the sample variance, NaN with less than two samples."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        """Return the sample standard deviation."""
+        return np.sqrt(self.variance)
+
+    @property
+    def rms(self) -> np.ndarray:
+        """Return the root mean square, NaN without samples."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(
+                self.count > 0,
+                np.sqrt(self.mean**2 + self.m2 / self.count),
+                np.nan,
+            )
+
+    def get_mean(self) -> np.ndarray:
+        """Return the mean, NaN without samples."""
+        return np.where(self.count > 0, self.mean, np.nan)
+
+
+def get_rates(stats: RunningStats, t_first: float, t_last: float) -> np.ndarray:
+    """Return the samples per second of each column in `[t_first, t_last]`."""
+    span = t_last - t_first
+    if not span > 0:
+        return np.full(len(stats.count), np.nan)
+    return np.maximum(stats.count - 1, 0) / span
+
+
+class SessionStatistics:
+    """Statistics of the channels over the whole session."""
+
+    stats: RunningStats
+    t_first: float
+    t_last: float
+
+    def __init__(self, n_channels: int) -> None:
+        self.stats = RunningStats(n_channels)
+        self.t_first = np.nan
+        self.t_last = np.nan
+
+    def append(self, columns: np.ndarray) -> None:
+        """Append `columns`, a `(n_rows, n)` array with the time first."""
+        if columns.shape[1] == 0:
+            return
+        if np.isnan(self.t_first):
+            self.t_first = float(columns[0, 0])
+        self.t_last = float(columns[0, -1])
+
+        self.stats.merge(RunningStats.from_batch(columns[1:]))
+
+    @property
+    def rates(self) -> np.ndarray:
+        """Return the samples per second of each channel."""
+        return get_rates(self.stats, self.t_first, self.t_last)
+
+
+class WindowStatistics:
+    """
+    Statistics of the channels over the last `duration` seconds.
+
+    The batches leave the window whole, when their last sample is older
+    than `duration`, so the window can hold up to a batch more.
+    The batches are kept in a queue made of two stacks, like in
+    `decimation.SlidingMinMax`: the batches entering are merged in running
+    statistics, and when the oldest one must leave, all of them are moved
+    to the other stack, computing the statistics of each suffix.
+    Each batch is thus merged a constant number of times.
+    """
+
+    n_channels: int
+    duration: float
+
+    # Batches entered since the last move, with their merged statistics
+    _back: list[tuple[float, float, RunningStats]]
+    _back_stats: RunningStats
+    # Oldest batches, with the statistics of each suffix, and their times
+    _front: list[tuple[float, float, RunningStats]]
+
+    def __init__(self, n_channels: int, duration: float) -> None:
+        self.n_channels = n_channels
+        self.duration = duration
+        self._front = []
+        self._reset_back()
+
+    def _reset_back(self) -> None:
+        self._back = []
+        self._back_stats = RunningStats(self.n_channels)
+
+    def append(self, columns: np.ndarray) -> None:
+        """
+        Append `columns`, a `(n_rows, n)` array with the time first.
+
+        The batches older than `duration` are then dropped.
+        """
+        if columns.shape[1] == 0:
+            return
+        batch_stats = RunningStats.from_batch(columns[1:])
+        self._back.append(
+            (float(columns[0, 0]), float(columns[0, -1]), batch_stats)
+        )
+        self._back_stats.merge(batch_stats)
+
+        self._pop_before(float(columns[0, -1]) - self.duration)
+
+    def _move_back_to_front(self) -> None:
+        """Move the entered batches to the stack of the oldest ones."""
+        suffix = RunningStats(self.n_channels)
+        front = []
+        for t_first, t_last, batch_stats in reversed(self._back):
+            suffix.merge(batch_stats)
+            front.append((t_first, t_last, suffix.copy()))
+
+        # The oldest batch at the end, to pop it
+        self._front = front
+        self._reset_back()
+
+    def _pop_before(self, t_start: float) -> None:
+        """Drop the batches whose last sample is before `t_start`."""
+        while True:
+            if not self._front:
+                if not self._back:
+                    return
+                self._move_back_to_front()
+            if self._front[-1][1] >= t_start:
+                return
+            self._front.pop()
+
+    @property
+    def t_first(self) -> float:
+        """Return the time of the oldest sample in the window."""
+        if self._front:
+            return self._front[-1][0]
+        if self._back:
+            return self._back[0][0]
+        return np.nan
+
+    @property
+    def t_last(self) -> float:
+        """Return the time of the last sample in the window."""
+        if self._back:
+            return self._back[-1][1]
+        if self._front:
+            return self._front[0][1]
+        return np.nan
+
+    @property
+    def stats(self) -> RunningStats:
+        """Return the statistics of the batches in the window."""
+        stats = self._back_stats.copy()
+        if self._front:
+            stats.merge(self._front[-1][2])
+        return stats
+
+    @property
+    def rates(self) -> np.ndarray:
+        """Return the samples per second of each channel."""
+        return get_rates(self.stats, self.t_first, self.t_last)
@@ -0,0 +1,178 @@
+"""
+Module with the checksums used to verify the saved data.
+
+The data is hashed in chunks of rows, one checksum per channel, so that a
+verification can tell which channel and which time range is corrupted.
+The checksums are CRC32 of the little endian `float64` samples, computed
+by the writers on each chunk as it is written.
+"""
+
+from __future__ import annotations
+
+import zlib
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+CHECKSUM_DTYPE = np.dtype('<f8')
+
+
+@dataclass
+class CorruptedRange:
+    """Time range of a channel whose saved data is corrupted."""
+
+    channel: str
+    t_start: float
+    t_end: float
+
+    def __str__(self) -> str:
+        return f'{self.channel}, from {self.t_start:g} s to {self.t_end:g} s'
+
+
+class SavedDataCorruptedError(RuntimeError):
+    """Raised when the saved data does not match the data to save."""
+
+    filepath: str
+    corrupted: list[CorruptedRange]
+
+    def __init__(self, filepath: str, corrupted: list[CorruptedRange]):
+        self.filepath = filepath
+        self.corrupted = corrupted
+        super().__init__(
+            f'The saved file {filepath} is corrupted:\n'
+            + format_corrupted_ranges(corrupted)
+        )
+
+
+def checksum(values) -> int:
+    """Return the CRC32 of `values`, as `float64` samples."""
+    return zlib.crc32(np.ascontiguousarray(values, dtype=CHECKSUM_DTYPE))
+
+
+def format_corrupted_ranges(corrupted: list[CorruptedRange]) -> str:
+    """Return a report of the corrupted ranges, one per line."""
+    return '\n'.join(str(c) for c in corrupted)
+
+
+def raise_if_corrupted(filepath: str, corrupted: list[CorruptedRange]) -> None:
+    """Raise `SavedDataCorruptedError` if any range is corrupted."""
+    if corrupted:
+        raise SavedDataCorruptedError(filepath, corrupted)
+
+
+def compare_channels(
+    names: list[str],
+    times,
+    expected: list,
+    actual: list,
+    chunk_rows: int,
+) -> list[CorruptedRange]:
+    """
+    Compare two sets of channels, `chunk_rows` samples at a time.
+
+    `times` is the time vector of the `expected` channels, used to report
+    the corrupted ranges.
+    A channel with a different length is corrupted from where the shorter
+    one ends.
+    """
+    corrupted = []
+
+    for name, exp, act in zip(names, expected, actual):
+        n_rows = min(len(exp), len(act))
+        for start in range(0, n_rows, chunk_rows):
+            end = min(start + chunk_rows, n_rows)
+            if checksum(exp[start:end]) != checksum(act[start:end]):
+                corrupted.append(
+                    CorruptedRange(name, times[start], times[end - 1])
+                )
+
+        if len(exp) != len(act):
+            if len(times) == 0:
+                corrupted.append(CorruptedRange(name, np.nan, np.nan))
+                continue
+            first_missing = min(n_rows, len(times) - 1)
+            corrupted.append(
+                CorruptedRange(name, times[first_missing], times[-1])
+            )
+
+    return corrupted
+
+
+def padded_rows(values, start: int, end: int) -> np.ndarray:
+    """Return the rows `[start, end)` of `values`, padded with NaN."""
+    rows = np.asarray(values[start:end], dtype=CHECKSUM_DTYPE)
+    if len(rows) < end - start:
+        rows = np.concatenate([rows, np.full(end - start - len(rows), np.nan)])
+    return rows
+
+
+def chunk_entry(times, crcs: list[int]) -> dict:
+    """Return the entry of the index of a chunk, with its `times`."""
+    return {
+        'n_rows': len(times),
+        't_min': float(times[0]),
+        't_max': float(times[-1]),
+        'crc32': crcs,
+    }
+
+
+def checksum_index(names: list[str], chunk_rows: int, chunks: list) -> dict:
+    """
+    Return the index of the checksums of the chunks.
+
+    The index has the same layout of the one of the session format, so it
+    can be stored as JSON alongside the data.
+    """
+    return {'chunk_rows': chunk_rows, 'columns': names, 'chunks': chunks}
+
+
+def verify_chunks(
+    index: dict,
+    read_chunk: Callable[[int], list],
+    progress: Callable[[float], None] | None = None,
+) -> list[CorruptedRange]:
+    """
+    Check the chunks read back from a file against `index`.
+
+    `read_chunk(chunk_idx)` returns the columns of a chunk, `None` for
+    the ones that cannot be read; if it raises, all of them are
+    considered corrupted.
+    The formats storing the entry of the index with each chunk have `None`
+    entries in `index`, that `read_chunk` replaces; the time range of the
+    chunks whose entry cannot be read is unknown.
+    Return the ranges of the columns that are corrupted.
+    """
+    corrupted = []
+    chunks = index['chunks']
+
+    for c_i in range(len(chunks)):
+        try:
+            crcs = [
+                None if column is None else checksum(column)
+                for column in read_chunk(c_i)
+            ]
+        except Exception:  # pylint: disable=broad-exception-caught
+            crcs = []
+        if len(crcs) != len(index['columns']):
+            crcs = [None] * len(index['columns'])
+
+        entry = chunks[c_i]
+        if entry is None:
+            entry = {
+                't_min': np.nan,
+                't_max': np.nan,
+                'crc32': [None] * len(index['columns']),
+            }
+
+        for name, crc, expected in zip(index['columns'], crcs, entry['crc32']):
+            if crc is None or crc != expected:
+                corrupted.append(
+                    CorruptedRange(name, entry['t_min'], entry['t_max'])
+                )
+
+        if progress is not None:
+            progress((c_i + 1) / len(chunks))
+
+    return corrupted
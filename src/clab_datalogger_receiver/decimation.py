@@ -0,0 +1,389 @@
+"""
+Module with the decimators used to plot long data vectors.
+
+The decimators reduce the data to a few points per pixel while preserving
+its envelope, so that spikes do not disappear when zoomed out.
+`minmax_decimate` reduces a whole range at once, while
+`StreamingMinMaxDecimator` keeps the envelope of the live data up to date,
+reducing every sample only once, and `MinMaxPyramid` does the same for
+the whole session, at multiple resolutions.
+They work on `(n_columns, n_samples)` arrays, with the time in the first
+row, like the ones of the session format.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .ring_buffer import RingBuffer
+
+
+def minmax_reduce(columns: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Reduce `columns` to the minimum and maximum of the buckets at `starts`.
+
+    Each bucket gives two points, the minimum at the time of its first
+    sample and the maximum at the time of its last one.
+    """
+    ends = np.append(starts[1:], columns.shape[1]) - 1
+
+    decimated = np.empty((columns.shape[0], 2 * len(starts)), columns.dtype)
+    decimated[0, 0::2] = columns[0, starts]
+    decimated[0, 1::2] = columns[0, ends]
+    decimated[1:, 0::2] = np.minimum.reduceat(columns[1:], starts, axis=1)
+    decimated[1:, 1::2] = np.maximum.reduceat(columns[1:], starts, axis=1)
+
+    return decimated
+
+
+def minmax_decimate(columns: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Reduce `columns` to the minimum and maximum of `n_buckets` buckets.
+
+    The buckets have the same number of samples, see `minmax_reduce`.
+    If the data is already small enough, it is returned as is.
+    """
+    n_samples = columns.shape[1]
+    if n_samples <= 2 * n_buckets:
+        return columns
+
+    bucket_size = -(-n_samples // n_buckets)
+    return minmax_reduce(columns, np.arange(0, n_samples, bucket_size))
+
+
+class SlidingMinMax:
+    """
+    Minimum and maximum of a sliding window of buckets, per column.
+
+    The buckets enter at the end and leave from the start, as in a queue
+    made of two stacks: the buckets entering are only merged in a running
+    minimum and maximum, and when the oldest one must leave, all of them
+    are moved at once to the other stack, computing the extremes of each
+    suffix.
+    Each bucket is thus handled a constant number of times, and the cost
+    of keeping the extremes follows the buckets entering, not the length
+    of the window.
+    The NaN values are ignored.
+    """
+
+    n_columns: int
+
+    # Buckets entered since the last move, with their running extremes
+    _back: list[tuple[np.ndarray, np.ndarray, np.ndarray]]
+    _n_back: int
+    _back_min: np.ndarray
+    _back_max: np.ndarray
+    # Oldest buckets, with the extremes of their suffixes, from `_front_pos`
+    _front_times: np.ndarray
+    _front_min: np.ndarray
+    _front_max: np.ndarray
+    _front_pos: int
+
+    def __init__(self, n_columns: int) -> None:
+        self.n_columns = n_columns
+        self._reset_back()
+        self._front_times = np.empty(0)
+        self._front_min = np.empty((n_columns, 0))
+        self._front_max = np.empty((n_columns, 0))
+        self._front_pos = 0
+
+    def _reset_back(self) -> None:
+        self._back = []
+        self._n_back = 0
+        self._back_min = np.full(self.n_columns, np.nan)
+        self._back_max = np.full(self.n_columns, np.nan)
+
+    def __len__(self) -> int:
+        """Return the number of buckets in the window."""
+        return len(self._front_times) - self._front_pos + self._n_back
+
+    def push(self, times: np.ndarray, mins: np.ndarray, maxs: np.ndarray):
+        """
+        Add buckets at the end of the window.
+
+        `times` are the last times of the buckets, and `mins` and `maxs`
+        their `(n_columns, n)` extremes.
+        """
+        if len(times) == 0:
+            return
+        self._back.append((times, mins, maxs))
+        self._n_back += len(times)
+        self._back_min = np.fmin(self._back_min, np.fmin.reduce(mins, axis=1))
+        self._back_max = np.fmax(self._back_max, np.fmax.reduce(maxs, axis=1))
+
+    def _move_back_to_front(self) -> None:
+        """Move the entered buckets to the stack of the oldest ones."""
+        times, mins, maxs = (
+            np.concatenate(parts, axis=-1) for parts in zip(*self._back)
+        )
+        self._front_times = times
+        self._front_min = np.fmin.accumulate(mins[:, ::-1], axis=1)[:, ::-1]
+        self._front_max = np.fmax.accumulate(maxs[:, ::-1], axis=1)[:, ::-1]
+        self._front_pos = 0
+        self._reset_back()
+
+    def pop(self, n_buckets: int) -> None:
+        """Remove the `n_buckets` oldest buckets."""
+        while n_buckets > 0 and len(self) > 0:
+            if self._front_pos == len(self._front_times):
+                self._move_back_to_front()
+            n_front = min(n_buckets, len(self._front_times) - self._front_pos)
+            self._front_pos += n_front
+            n_buckets -= n_front
+
+    def pop_before(self, t_start: float) -> None:
+        """Remove the oldest buckets that end before `t_start`."""
+        while len(self) > 0:
+            if self._front_pos == len(self._front_times):
+                self._move_back_to_front()
+            front_times = self._front_times[self._front_pos :]
+            n_before = int(np.searchsorted(front_times, t_start, side='left'))
+            self._front_pos += n_before
+            if n_before < len(front_times):
+                return
+
+    def extremes(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the minimum and the maximum of each column, NaN if none."""
+        if self._front_pos == len(self._front_times):
+            return self._back_min, self._back_max
+        return (
+            np.fmin(self._front_min[:, self._front_pos], self._back_min),
+            np.fmax(self._front_max[:, self._front_pos], self._back_max),
+        )
+
+
+class StreamingMinMaxDecimator:
+    """
+    Min/max decimator kept up to date as the samples arrive.
+
+    The samples are grouped in buckets lasting `bucket_width` seconds,
+    aligned to its multiples, so that a bucket never changes once a sample
+    of a later one arrived, and it is reduced only once.
+    The points of the complete buckets are kept in a ring buffer of
+    `capacity` buckets, while the samples of the last bucket are kept
+    apart and reduced when reading.
+    The extremes of the buckets in the ring buffer are kept up to date as
+    well, to find the range of the data shown.
+    """
+
+    bucket_width: float
+    points: RingBuffer
+    window: SlidingMinMax
+
+    # Samples of the last bucket, that is not complete yet
+    _pending: np.ndarray
+
+    def __init__(self, n_rows: int, bucket_width: float, capacity: int):
+        """Allocate the buffer of the decimated points."""
+        self.bucket_width = bucket_width
+        self.points = RingBuffer(n_rows, 2 * capacity)
+        self.window = SlidingMinMax(n_rows - 1)
+        self._pending = np.empty((n_rows, 0))
+
+    def _bucket_starts(self, times: np.ndarray) -> np.ndarray:
+        """Return the index of the first sample of each bucket."""
+        buckets = np.floor(times / self.bucket_width)
+        return np.flatnonzero(np.diff(buckets, prepend=-np.inf))
+
+    def append(self, columns: np.ndarray) -> None:
+        """Append `columns`, a `(n_rows, n)` array with the time first."""
+        if columns.shape[1] == 0:
+            return
+        if self._pending.shape[1] > 0:
+            columns = np.concatenate([self._pending, columns], axis=1)
+
+        starts = self._bucket_starts(columns[0])
+        last_start = starts[-1]
+        if len(starts) > 1:
+            points = minmax_reduce(columns[:, :last_start], starts[:-1])
+            self.points.append(points)
+
+            self.window.push(
+                points[0, 1::2], points[1:, 0::2], points[1:, 1::2]
+            )
+            # Follow the buckets that the ring buffer drops
+            self.window.pop(len(self.window) - self.points.capacity // 2)
+
+        self._pending = columns[:, last_start:].copy()
+
+    def view(self, t_start: float = -np.inf) -> np.ndarray:
+        """
+        Return the decimated points from `t_start` on.
+
+        The points of the last bucket, even if not complete, are included.
+        """
+        points = self.points.view()
+        first = int(np.searchsorted(points[0], t_start, side='left'))
+        # Keep one bucket before `t_start`, so the curves reach it
+        first = max(0, first - 2 + first % 2)
+
+        if self._pending.shape[1] == 0:
+            return points[:, first:]
+
+        pending = minmax_reduce(self._pending, np.array([0]))
+        return np.concatenate([points[:, first:], pending], axis=1)
+
+    def extremes(
+        self, t_start: float = -np.inf
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the minimum and the maximum of each column from `t_start` on.
+
+        The time is excluded, and the columns without data are NaN.
+        The buckets before `t_start` are dropped, so it must not decrease
+        between calls.
+        """
+        self.window.pop_before(t_start)
+        mins, maxs = self.window.extremes()
+        if self._pending.shape[1] == 0:
+            return mins, maxs
+
+        return (
+            np.fmin(mins, np.fmin.reduce(self._pending[1:], axis=1)),
+            np.fmax(maxs, np.fmax.reduce(self._pending[1:], axis=1)),
+        )
+
+
+class _PyramidLevel:
+    """Growable `(n_rows, 2 * n_buckets)` array of min/max points."""
+
+    data: np.ndarray
+    size: int
+
+    def __init__(self, n_rows: int, initial_capacity: int = 256) -> None:
+        self.data = np.empty((n_rows, 2 * initial_capacity))
+        self.size = 0
+
+    @property
+    def points(self) -> np.ndarray:
+        """Return a view of the points of the buckets."""
+        return self.data[:, : 2 * self.size]
+
+    def append(self, points: np.ndarray) -> None:
+        """Append the points of some buckets, growing the array if needed."""
+        end = 2 * self.size + points.shape[1]
+        if end > self.data.shape[1]:
+            data = np.empty(
+                (self.data.shape[0], max(end, 2 * self.data.shape[1]))
+            )
+            data[:, : 2 * self.size] = self.points
+            self.data = data
+
+        self.data[:, 2 * self.size : end] = points
+        self.size = end // 2
+
+
+class MinMaxPyramid:
+    """
+    Min/max envelope of a growing session, at multiple resolutions.
+
+    The first level reduces every `base_rows` samples to a bucket, like
+    `minmax_reduce`, and each other level reduces `factor` buckets of the
+    previous one.
+    The levels are updated as the samples arrive, reducing every sample
+    only once, so that the envelope of any time range can be read from the
+    finest level with few enough buckets in it, in a time that does not
+    depend on the session length.
+    """
+
+    n_rows: int
+    base_rows: int
+    factor: int
+    levels: list[_PyramidLevel]
+
+    # Samples of the last bucket of the first level, not complete yet
+    _pending: np.ndarray
+
+    def __init__(self, n_rows: int, base_rows: int = 64, factor: int = 4):
+        self.n_rows = n_rows
+        self.base_rows = base_rows
+        self.factor = factor
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all the levels."""
+        self.levels = []
+        self._pending = np.empty((self.n_rows, 0))
+
+    def append(self, columns: np.ndarray) -> None:
+        """Append `columns`, a `(n_rows, n)` array with the time first."""
+        if self._pending.shape[1] > 0:
+            columns = np.concatenate([self._pending, columns], axis=1)
+
+        n_complete = columns.shape[1] // self.base_rows * self.base_rows
+        if n_complete > 0:
+            self._append_points(
+                0,
+                minmax_reduce(
+                    columns[:, :n_complete],
+                    np.arange(0, n_complete, self.base_rows),
+                ),
+            )
+
+        self._pending = columns[:, n_complete:].copy()
+
+    def _n_reduced(self, level_i: int) -> int:
+        """Return the buckets of a level already reduced in the next one."""
+        if level_i + 1 >= len(self.levels):
+            return 0
+        return self.levels[level_i + 1].size * self.factor
+
+    def _append_points(self, level_i: int, points: np.ndarray) -> None:
+        """Append buckets to a level, reducing them in the next ones."""
+        if level_i == len(self.levels):
+            self.levels.append(_PyramidLevel(self.n_rows))
+        level = self.levels[level_i]
+        level.append(points)
+
+        first = self._n_reduced(level_i)
+        n_groups = (level.size - first) // self.factor
+        if n_groups == 0:
+            return
+
+        groups = level.data[
+            :, 2 * first : 2 * (first + n_groups * self.factor)
+        ].reshape(self.n_rows, n_groups, 2 * self.factor)
+
+        reduced = np.empty((self.n_rows, 2 * n_groups))
+        reduced[0, 0::2] = groups[0, :, 0]
+        reduced[0, 1::2] = groups[0, :, -1]
+        reduced[1:, 0::2] = groups[1:, :, 0::2].min(axis=2)
+        reduced[1:, 1::2] = groups[1:, :, 1::2].max(axis=2)
+
+        self._append_points(level_i + 1, reduced)
+
+    def envelope(
+        self, t_start: float, t_end: float, n_buckets: int
+    ) -> np.ndarray | None:
+        """
+        Return the envelope of `[t_start, t_end]`, in min/max points.
+
+        The points come from the finest level with at most `n_buckets`
+        buckets in the range, plus one bucket on each side, so the curves
+        reach its edges.
+        If the range reaches the last bucket of that level, the buckets of
+        the finer levels and the samples not reduced in it yet follow.
+        `None` if no level has few enough buckets.
+        """
+        for level_i, level in enumerate(self.levels):
+            # The times of the points are sorted, two per bucket
+            times = level.points[0]
+            first = int(np.searchsorted(times, t_start, side='left')) // 2
+            last = -(-int(np.searchsorted(times, t_end, side='right')) // 2)
+            if last - first <= n_buckets:
+                break
+        else:
+            return None
+
+        first = max(0, first - 1)
+        last = min(level.size, last + 1)
+        parts = [level.points[:, 2 * first : 2 * last]]
+
+        if last == level.size:
+            for finer_i in range(level_i - 1, -1, -1):
+                finer = self.levels[finer_i]
+                parts.append(finer.points[:, 2 * self._n_reduced(finer_i) :])
+            if self._pending.shape[1] > 0:
+                parts.append(minmax_reduce(self._pending, np.array([0])))
+
+        return np.concatenate(parts, axis=1)
@@ -0,0 +1,393 @@
+"""
+Module that computes the derived fields, declared in the configuration.
+
+A derived field has an expression in place of its type, for example
+
+    - accel_data: { a_x: float, a_y: float, a_z: float,
+                    a_norm: 'sqrt(a_x**2 + a_y**2 + a_z**2)' }
+
+and it is computed from the received fields, then plotted and saved
+like them.
+The expressions are parsed once, accepting only arithmetic, comparisons,
+the functions in `DERIVED_FUNCTIONS` and the constants in
+`DERIVED_CONSTANTS`, and are evaluated with NumPy over each batch.
+A bare name is a field of the same subplot, and `<subplot>.<field>` a
+field of any subplot. A derived field can use the ones before it.
+
+The filters of the `filters` module, like `lowpass(a_x, 20, 1000)`, can
+be used too: each call is a filter designed once, from the constant
+arguments after the filtered values, that keeps its state between the
+batches.
+"""
+from __future__ import annotations
+
+import ast
+
+from dataclasses import dataclass
+from types import CodeType
+from typing import Callable
+
+import numpy as np
+
+from .filters import FILTER_DESIGNS, StreamingFilter
+from .received_structure import PlottingStruct
+
+DERIVED_FUNCTIONS: dict[str, Callable] = {
+    name: getattr(np, name)
+    for name in [
+        'abs',
+        'sqrt',
+        'exp',
+        'log',
+        'log10',
+        'sin',
+        'cos',
+        'tan',
+        'arcsin',
+        'arccos',
+        'arctan',
+        'arctan2',
+        'hypot',
+        'sign',
+        'floor',
+        'ceil',
+        'minimum',
+        'maximum',
+        'clip',
+        'where',
+        'deg2rad',
+        'rad2deg',
+    ]
+}
+
+DERIVED_CONSTANTS: dict[str, float] = {'pi': np.pi, 'e': np.e}
+
+_ALLOWED_NODES: tuple[type, ...] = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Attribute,
+    ast.Constant,
+    ast.Load,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+)
+
+
+class DerivedExpressionError(ValueError):
+    """Raised when the expression of a derived field is not valid."""
+
+
+@dataclass
+class DerivedField:
+    """Expression of a derived field, compiled to be evaluated on arrays."""
+
+    subplot_index: int
+    field_index: int
+    expression: str
+    code: CodeType
+    # Fields used by the expression, as `(subplot_index, field_index)`,
+    #   passed to it as `_in0`, `_in1`, ...
+    inputs: list[tuple[int, int]]
+    # Filters called by the expression, as `_filter0`, `_filter1`, ...
+    filters: list[StreamingFilter]
+    # Value of the expressions without inputs, computed once
+    constant: float | None = None
+    # Received field, if the expression is only a filter of it
+    filtered_input: tuple[int, int] | None = None
+
+
+class _InputsResolver(ast.NodeTransformer):
+    """Replace the field names with the inputs of the expression."""
+
+    def __init__(self, resolve: Callable[[str | None, str], tuple[int, int]]):
+        self.resolve = resolve
+        self.inputs: list[tuple[int, int]] = []
+        self.filters: list[StreamingFilter] = []
+
+    def _input(self, node: ast.AST, subplot: str | None, field: str):
+        key = self.resolve(subplot, field)
+        if key not in self.inputs:
+            self.inputs.append(key)
+        return ast.copy_location(
+            ast.Name(id=f'_in{self.inputs.index(key)}', ctx=ast.Load()), node
+        )
+
+    # pylint: disable-next=invalid-name
+    def visit_Attribute(self, node: ast.Attribute):
+        if not isinstance(node.value, ast.Name):
+            raise DerivedExpressionError(
+                'Only `<subplot>.<field>` attributes are supported'
+            )
+        return self._input(node, node.value.id, node.attr)
+
+    # pylint: disable-next=invalid-name
+    def visit_Name(self, node: ast.Name):
+        if node.id in DERIVED_CONSTANTS or node.id in DERIVED_FUNCTIONS:
+            return node
+        return self._input(node, None, node.id)
+
+    # pylint: disable-next=invalid-name
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name) and node.func.id in FILTER_DESIGNS:
+            return self._filter(node, node.func.id)
+        if (
+            not isinstance(node.func, ast.Name)
+            or node.func.id not in DERIVED_FUNCTIONS
+        ):
+            raise DerivedExpressionError(
+                f'Unsupported function: {ast.unparse(node.func)}'
+            )
+        if node.keywords:
+            raise DerivedExpressionError('Keyword arguments not supported')
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def _filter(self, node: ast.Call, name: str):
+        """Replace the call of a filter with the one of its instance."""
+        if not node.args or node.keywords:
+            raise DerivedExpressionError(
+                f'Use {name}(<values>, <parameters>...)'
+            )
+
+        params = []
+        for arg in node.args[1:]:
+            if not isinstance(arg, ast.Constant):
+                raise DerivedExpressionError(
+                    f'The parameters of {name} must be numbers'
+                )
+            params.append(arg.value)
+        try:
+            b, a = FILTER_DESIGNS[name](*params)
+        except (TypeError, ValueError) as e:
+            raise DerivedExpressionError(f'Invalid {name} filter: {e}') from e
+
+        self.filters.append(StreamingFilter(b, a))
+        return ast.copy_location(
+            ast.Call(
+                func=ast.Name(
+                    id=f'_filter{len(self.filters) - 1}', ctx=ast.Load()
+                ),
+                args=[self.visit(node.args[0])],
+                keywords=[],
+            ),
+            node,
+        )
+
+
+def parse_expression(expression: str) -> ast.Expression:
+    """Parse `expression`, checking that it uses only allowed syntax."""
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise DerivedExpressionError(
+            f'Invalid expression "{expression}": {e.msg}'
+        ) from e
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise DerivedExpressionError(
+                f'Unsupported syntax in "{expression}": '
+                f'{type(node).__name__}'
+            )
+        if isinstance(node, ast.Compare) and len(node.ops) > 1:
+            raise DerivedExpressionError(
+                f'Chained comparisons are not supported in "{expression}"'
+            )
+        if isinstance(node, ast.Constant) and not isinstance(
+            node.value, (int, float, bool)
+        ):
+            raise DerivedExpressionError(
+                f'Unsupported constant in "{expression}": {node.value!r}'
+            )
+
+    return tree
+
+
+def _evaluate(
+    code: CodeType,
+    inputs: list[np.ndarray],
+    filters: list[StreamingFilter],
+):
+    """Evaluate a compiled expression on its `inputs`."""
+    namespace = {f'_in{i}': values for i, values in enumerate(inputs)}
+    namespace.update({f'_filter{i}': f for i, f in enumerate(filters)})
+    with np.errstate(all='ignore'):
+        return eval(  # pylint: disable=eval-used
+            code,
+            {'__builtins__': {}, **DERIVED_FUNCTIONS, **DERIVED_CONSTANTS},
+            namespace,
+        )
+
+
+class DerivedChannels:
+    """
+    Computes the derived fields of a `PlottingStruct`.
+
+    The expressions are compiled once, and `evaluate()` completes the data
+    of each batch, so the derived fields are then handled like the other
+    ones.
+    """
+
+    data_struct: PlottingStruct
+    fields: list[DerivedField]
+
+    # Filters of received fields with the same coefficients, applied
+    #   together to all their inputs, before the other fields
+    _filter_banks: list[tuple[StreamingFilter, list[DerivedField]]]
+    # Other fields, evaluated one by one in order
+    _other_fields: list[DerivedField]
+    # Rows of the received fields, for the subplots with derived ones
+    _received_rows: dict[int, list[int]]
+
+    def __init__(self, data_struct: PlottingStruct) -> None:
+        """Compile the expressions, in the order they are evaluated."""
+        self.data_struct = data_struct
+        self.fields = []
+
+        names = [sp.name for sp in data_struct.subplots]
+        # Fields received, or derived and computed before
+        available = {
+            (sp_i, f_i)
+            for sp_i, sp in enumerate(data_struct.subplots)
+            for f_i, field in enumerate(sp.fields)
+            if not field.derived
+        }
+        for sp_i, sp in enumerate(data_struct.subplots):
+            for f_i, field in enumerate(sp.fields):
+                if field.expression is not None:
+                    derived = self._compile(sp_i, f_i, field.expression, names)
+                    for key in derived.inputs:
+                        if key not in available:
+                            raise DerivedExpressionError(
+                                f'"{field.name}" uses '
+                                f'"{self._field_name(key)}" before it is '
+                                'computed'
+                            )
+                    self.fields.append(derived)
+                available.add((sp_i, f_i))
+
+        self._received_rows = {
+            f.subplot_index: [
+                f_i
+                for f_i, field in enumerate(
+                    data_struct.subplots[f.subplot_index].fields
+                )
+                if not field.derived
+            ]
+            for f in self.fields
+        }
+
+        banks: dict[bytes, list[DerivedField]] = {}
+        self._other_fields = []
+        for derived in self.fields:
+            if derived.filtered_input is None:
+                self._other_fields.append(derived)
+                continue
+            filt = derived.filters[0]
+            banks.setdefault(
+                filt.b.tobytes() + b'/' + filt.a.tobytes(), []
+            ).append(derived)
+
+        self._filter_banks = []
+        for group in banks.values():
+            filt = group[0].filters[0]
+            self._filter_banks.append((StreamingFilter(filt.b, filt.a), group))
+
+    def __len__(self) -> int:
+        """Return the number of derived fields."""
+        return len(self.fields)
+
+    def _field_name(self, key: tuple[int, int]) -> str:
+        sp = self.data_struct.subplots[key[0]]
+        return f'{sp.name}.{sp.fields[key[1]].name}'
+
+    def _compile(
+        self, sp_i: int, f_i: int, expression: str, names: list[str | None]
+    ) -> DerivedField:
+        """Compile the expression of the field `f_i` of subplot `sp_i`."""
+
+        def resolve(subplot: str | None, field: str) -> tuple[int, int]:
+            ref_sp_i = sp_i if subplot is None else None
+            if subplot is not None and subplot in names:
+                ref_sp_i = names.index(subplot)
+            if ref_sp_i is not None:
+                fields = self.data_struct.subplots[ref_sp_i].fields
+                for ref_f_i, ref_field in enumerate(fields):
+                    if ref_field.name == field:
+                        return ref_sp_i, ref_f_i
+
+            name = field if subplot is None else f'{subplot}.{field}'
+            raise DerivedExpressionError(
+                f'Unknown field "{name}" in "{expression}"'
+            )
+
+        resolver = _InputsResolver(resolve)
+        tree = ast.fix_missing_locations(
+            resolver.visit(parse_expression(expression))
+        )
+        code = compile(tree, f'<{self._field_name((sp_i, f_i))}>', 'eval')
+
+        derived = DerivedField(
+            sp_i, f_i, expression, code, resolver.inputs, resolver.filters
+        )
+        if not derived.inputs and not derived.filters:
+            derived.constant = float(_evaluate(code, [], derived.filters))
+
+        body = tree.body
+        if (
+            isinstance(body, ast.Call)
+            and isinstance(body.func, ast.Name)
+            and body.func.id == '_filter0'
+            and isinstance(body.args[0], ast.Name)
+        ):
+            in_sp_i, in_f_i = derived.inputs[0]
+            if not self.data_struct.subplots[in_sp_i].fields[in_f_i].derived:
+                derived.filtered_input = derived.inputs[0]
+        return derived
+
+    def evaluate(self, y_data: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Complete the received data with the derived fields.
+
+        `y_data` has a `(n_received_fields, n_samples)` array per subplot,
+        and the result a `(n_fields, n_samples)` one, with the fields in
+        the configured order.
+        The subplots without derived fields are returned as they are.
+        """
+        if not self.fields:
+            return y_data
+
+        y_full = list(y_data)
+        for sp_i, received in self._received_rows.items():
+            values = np.empty(
+                (len(self.data_struct.subplots[sp_i]), y_data[sp_i].shape[1]),
+                dtype=np.float64,
+            )
+            values[received] = y_data[sp_i]
+            y_full[sp_i] = values
+
+        for bank, fields in self._filter_banks:
+            inputs = [f.filtered_input for f in fields]
+            filtered = bank(
+                np.array([y_full[sp_i][f_i] for sp_i, f_i in inputs])
+            )
+            for field, row in zip(fields, filtered):
+                y_full[field.subplot_index][field.field_index] = row
+
+        for field in self._other_fields:
+            row = y_full[field.subplot_index][field.field_index]
+            if field.constant is not None:
+                row[:] = field.constant
+            else:
+                row[:] = _evaluate(
+                    field.code,
+                    [y_full[sp_i][f_i] for sp_i, f_i in field.inputs],
+                    field.filters,
+                )
+
+        return y_full
@@ -0,0 +1,123 @@
+"""
+Module that implements the streaming filters of the derived fields.
+
+A filter is designed once, from constant arguments, and then applied to
+each batch with `scipy.signal.lfilter`, keeping its state between the
+batches, so the result is the same as filtering the whole stream.
+The filters are used in the expressions of the derived fields, like
+`lowpass(a_x, 20, 1000)`, see the `derived_channels` module.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+
+from scipy.signal import butter, iirnotch, lfilter, lfilter_zi
+
+# Order of the Butterworth filters, if not given
+DEFAULT_FILTER_ORDER: int = 2
+# Quality factor of the notch filters, if not given
+DEFAULT_NOTCH_QUALITY: float = 30
+
+
+def design_lowpass(
+    cutoff: float, fs: float, order: int = DEFAULT_FILTER_ORDER
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the coefficients of a Butterworth low-pass filter."""
+    return butter(int(order), cutoff, btype='lowpass', fs=fs)
+
+
+def design_highpass(
+    cutoff: float, fs: float, order: int = DEFAULT_FILTER_ORDER
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the coefficients of a Butterworth high-pass filter."""
+    return butter(int(order), cutoff, btype='highpass', fs=fs)
+
+
+def design_bandpass(
+    low: float, high: float, fs: float, order: int = DEFAULT_FILTER_ORDER
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the coefficients of a Butterworth band-pass filter."""
+    return butter(int(order), [low, high], btype='bandpass', fs=fs)
+
+
+def design_notch(
+    frequency: float, fs: float, quality: float = DEFAULT_NOTCH_QUALITY
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the coefficients of a notch filter, removing `frequency`."""
+    return iirnotch(frequency, quality, fs=fs)
+
+
+def design_moving_average(n_samples: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return the coefficients of the mean of the last `n_samples`."""
+    n_samples = int(n_samples)
+    if n_samples < 1:
+        raise ValueError('The moving average needs at least a sample')
+    return np.full(n_samples, 1 / n_samples), np.ones(1)
+
+
+# Filters usable in the expressions, with the function designing them
+#   from the arguments following the filtered values
+FILTER_DESIGNS: dict[str, Callable[..., tuple[np.ndarray, np.ndarray]]] = {
+    'lowpass': design_lowpass,
+    'highpass': design_highpass,
+    'bandpass': design_bandpass,
+    'notch': design_notch,
+    'moving_average': design_moving_average,
+}
+
+
+class StreamingFilter:
+    """
+    Filter applied batch by batch, keeping its state between the batches.
+
+    The state starts as the steady state for the first value, so there is
+    no transient from zero.
+    The state of a channel that is not finite anymore, for example after
+    a NaN value, is started again in the same way at the next batch,
+    without affecting the other channels.
+    """
+
+    b: np.ndarray
+    a: np.ndarray
+
+    # State of `lfilter`, `None` before the first batch
+    zi: np.ndarray | None
+    # Steady state for an input of 1
+    _zi_unit: np.ndarray
+
+    def __init__(self, b: np.ndarray, a: np.ndarray) -> None:
+        self.b = np.atleast_1d(np.asarray(b, dtype=np.float64))
+        self.a = np.atleast_1d(np.asarray(a, dtype=np.float64))
+        self.zi = None
+        self._zi_unit = (
+            lfilter_zi(self.b, self.a)
+            if max(len(self.a), len(self.b)) > 1
+            else np.zeros(0)
+        )
+
+    def reset(self) -> None:
+        """Forget the past values."""
+        self.zi = None
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        """
+        Filter the next `values`, along their last axis.
+
+        The other axes are independent channels, that must be the same in
+        all the batches.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if values.shape[-1] == 0:
+            return values.copy()
+
+        if self.zi is None:
+            self.zi = self._zi_unit * values[..., :1]
+        elif not np.all(np.isfinite(self.zi)):
+            # Start again only the channels with a state not finite
+            reset = ~np.all(np.isfinite(self.zi), axis=-1, keepdims=True)
+            self.zi = np.where(reset, self._zi_unit * values[..., :1], self.zi)
+
+        filtered, self.zi = lfilter(self.b, self.a, values, zi=self.zi)
+        return filtered
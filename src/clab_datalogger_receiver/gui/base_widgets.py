@@ -6,6 +6,8 @@ from PySide6.QtWidgets import QHBoxLayout, QPushButton, QVBoxLayout, QWidget
 class BoxButtonsWidget(QWidget):
     """Wrapper to instantiate a series of buttons in a QBoxLayout widget."""
 
+    buttons: dict[str, QPushButton]
+
     def __init__(
         self,
         names: list[str],
@@ -22,9 +24,11 @@ class BoxButtonsWidget(QWidget):
         layout = layout_type()
         # layout = QHBoxLayout()
 
+        self.buttons = {}
         for name, func in zip(names, fcns):
             btn = QPushButton(name)
             btn.clicked.connect(func)
             layout.addWidget(btn)
+            self.buttons[name] = btn
 
         self.setLayout(layout)
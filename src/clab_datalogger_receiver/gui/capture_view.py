@@ -0,0 +1,143 @@
+"""Window showing the triggered captures, overlaid."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from pyqtgraph import (
+    GraphicsLayoutWidget,
+    InfiniteLine,
+    PlotDataItem,
+    PlotItem,
+    mkPen,
+)
+
+from PySide6.QtCore import Signal as pyqtSignal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QLabel, QVBoxLayout, QWidget
+
+from ..received_structure import PlottingStruct
+from ..session_format import split_columns
+from ..trigger import TriggerSettings
+from .colors import GRAPHS_COLORS, GRAPHS_WIDTH, get_background_brush
+
+# Captures overlaid, the older ones are removed
+MAX_OVERLAID_CAPTURES: int = 8
+# Opacity of the captures before the last one, in [0, 255]
+OLD_CAPTURES_ALPHA: int = 70
+
+
+class CaptureView(QWidget):
+    """
+    Subplots with the last captures, at full resolution.
+
+    The time is relative to the trigger, and the last capture is drawn
+    over the previous ones, that are faded.
+    """
+
+    closed = pyqtSignal()
+
+    data_struct: PlottingStruct
+    graph_widget: GraphicsLayoutWidget
+    axes: list[PlotItem]
+    info_label: QLabel
+
+    # Curves of each capture, with their axis, the last one at the end
+    captures: list[list[tuple[PlotItem, PlotDataItem]]]
+    n_captures: int
+
+    def __init__(
+        self, data_struct: PlottingStruct, settings: TriggerSettings
+    ) -> None:
+        super().__init__()
+
+        self.setWindowTitle('Triggered captures')
+        self.data_struct = data_struct
+        self.captures = []
+        self.n_captures = 0
+
+        self.info_label = QLabel()
+        self.graph_widget = GraphicsLayoutWidget()
+
+        # Session column of the first field of each subplot
+        trigger_col = 1
+        self.axes = []
+        for sp_i, sp in enumerate(data_struct.subplots):
+            axis = self.graph_widget.addPlot(row=sp_i, col=0, title=sp.name)
+            axis.showGrid(True, True)
+            axis.addLegend(offset=(-10, 10), brush=get_background_brush())
+            axis.addItem(InfiniteLine(pos=0, angle=90, movable=False))
+            if trigger_col <= settings.column < trigger_col + len(sp):
+                axis.addItem(
+                    InfiniteLine(pos=settings.level, angle=0, movable=False)
+                )
+            if self.axes:
+                axis.setXLink(self.axes[0])
+            trigger_col += len(sp)
+            self.axes.append(axis)
+        self.axes[-1].setLabel('bottom', 'Time from trigger', units='s')
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.info_label)
+        layout.addWidget(self.graph_widget)
+        self.setLayout(layout)
+        self.show_info()
+
+    def show_info(self) -> None:
+        """Show the number of captures."""
+        self.info_label.setText(f'Captures: {self.n_captures}')
+
+    def add_capture(self, capture: np.ndarray) -> None:
+        """
+        Draw `capture`, session columns with the times from the trigger.
+
+        The previous capture is faded, and the oldest removed.
+        """
+        if self.captures:
+            for (_, curve), color in zip(
+                self.captures[-1], self.curve_colors()
+            ):
+                faded = QColor(color)
+                faded.setAlpha(OLD_CAPTURES_ALPHA)
+                curve.setPen(mkPen(color=faded, width=1))
+
+        if len(self.captures) >= MAX_OVERLAID_CAPTURES:
+            for axis, curve in self.captures.pop(0):
+                axis.removeItem(curve)
+
+        # Only the last capture is in the legend
+        for axis in self.axes:
+            axis.legend.clear()
+
+        times, y_data = split_columns(self.data_struct, capture)
+        curves = []
+        for axis, sp, sp_data in zip(
+            self.axes, self.data_struct.subplots, y_data
+        ):
+            for f_i, (field, values) in enumerate(zip(sp.fields, sp_data)):
+                curve = axis.plot(
+                    times,
+                    values,
+                    pen=mkPen(
+                        color=GRAPHS_COLORS[f_i % len(GRAPHS_COLORS)],
+                        width=GRAPHS_WIDTH,
+                    ),
+                    name=field.name,
+                )
+                curves.append((axis, curve))
+        self.captures.append(curves)
+
+        self.n_captures += 1
+        self.show_info()
+
+    def curve_colors(self) -> list[str]:
+        """Return the color of each curve of a capture."""
+        return [
+            GRAPHS_COLORS[f_i % len(GRAPHS_COLORS)]
+            for sp in self.data_struct.subplots
+            for f_i in range(len(sp))
+        ]
+
+    def closeEvent(self, event):
+        self.closed.emit()
+        super().closeEvent(event)
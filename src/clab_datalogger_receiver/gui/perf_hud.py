@@ -0,0 +1,41 @@
+"""Overlay showing the performance of the acquisition pipeline."""
+
+from __future__ import annotations
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtWidgets import QLabel, QWidget
+
+from ..perf_counters import PipelineRates
+
+# Distance of the overlay from the top left corner of its parent
+HUD_MARGIN: int = 8
+
+
+class PerfHud(QLabel):
+    """
+    Text drawn over the top left corner of `parent`.
+
+    It lets the mouse events through, so the plots below it can still be
+    used.
+    """
+
+    def __init__(self, parent: QWidget) -> None:
+        super().__init__(parent)
+
+        self.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+        self.setStyleSheet(
+            'background-color: rgba(0, 0, 0, 160); color: white; '
+            'padding: 4px; border-radius: 4px;'
+        )
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.move(HUD_MARGIN, HUD_MARGIN)
+        self.hide()
+
+    def show_rates(self, rates: PipelineRates) -> None:
+        """Show `rates`, above the other children of the parent."""
+        self.setText(rates.format())
+        self.adjustSize()
+        self.raise_()
@@ -0,0 +1,54 @@
+"""Window showing the live spectrum of the fields of a subplot."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from pyqtgraph import PlotWidget
+
+from PySide6.QtCore import Signal as pyqtSignal
+from PySide6.QtWidgets import QVBoxLayout, QWidget
+
+from .colors import get_background_brush, get_graphs_pens
+
+
+class SpectrumView(QWidget):
+    """Power spectral density of each field, in a logarithmic scale."""
+
+    closed = pyqtSignal()
+
+    plot_widget: PlotWidget
+
+    def __init__(self, title: str, field_names: list[str]) -> None:
+        super().__init__()
+
+        self.setWindowTitle(f'Spectrum - {title}')
+
+        self.plot_widget = PlotWidget()
+        plot_item = self.plot_widget.getPlotItem()
+        plot_item.showGrid(True, True)
+        plot_item.setLogMode(y=True)
+        plot_item.setLabel('bottom', 'Frequency', units='Hz')
+        plot_item.setLabel('left', 'PSD')
+        plot_item.addLegend(offset=(-10, 10), brush=get_background_brush())
+
+        pens = get_graphs_pens()
+        self.curves = [
+            plot_item.plot(pen=pens[f_i % len(pens)], name=name)
+            for f_i, name in enumerate(field_names)
+        ]
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.plot_widget)
+        self.setLayout(layout)
+
+    def show_spectrum(self, frequencies: np.ndarray, psd: np.ndarray) -> None:
+        """Draw `psd`, a `(n_fields, n_frequencies)` array."""
+        # The zeros can not be drawn in a logarithmic scale
+        psd = np.maximum(psd, np.finfo(psd.dtype).tiny)
+        for curve, field_psd in zip(self.curves, psd):
+            curve.setData(frequencies, field_psd)
+
+    def closeEvent(self, event):
+        self.closed.emit()
+        super().closeEvent(event)
@@ -0,0 +1,84 @@
+"""Panel showing the statistics of the channels, while acquiring."""
+from __future__ import annotations
+
+import numpy as np
+
+from PySide6.QtWidgets import (
+    QComboBox,
+    QHeaderView,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..channel_statistics import RunningStats
+
+STATISTICS_HEADERS: list[str] = [
+    'Rate [Hz]',
+    'Mean',
+    'RMS',
+    'Min',
+    'Max',
+    'Std',
+]
+
+STATISTICS_SCOPES: list[str] = ['Visible window', 'Whole session']
+
+
+class StatisticsPanel(QWidget):
+    """Table of the statistics of each channel, over a selectable scope."""
+
+    scope_combo: QComboBox
+    table: QTableWidget
+
+    def __init__(self, channel_names: list[str]) -> None:
+        super().__init__()
+
+        layout = QVBoxLayout()
+
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItems(STATISTICS_SCOPES)
+        layout.addWidget(self.scope_combo)
+
+        self.table = QTableWidget(0, len(STATISTICS_HEADERS))
+        self.table.setHorizontalHeaderLabels(STATISTICS_HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.ResizeToContents
+        )
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
+        self.set_channels(channel_names)
+
+    @property
+    def whole_session(self) -> bool:
+        """Return whether the statistics of the whole session are shown."""
+        return self.scope_combo.currentIndex() == 1
+
+    def set_channels(self, channel_names: list[str]) -> None:
+        """Show a row for each channel, named like `<subplot>.<field>`."""
+        self.table.setRowCount(len(channel_names))
+        self.table.setVerticalHeaderLabels(channel_names)
+        for row in range(len(channel_names)):
+            for col in range(len(STATISTICS_HEADERS)):
+                self.table.setItem(row, col, QTableWidgetItem('-'))
+
+    def show_statistics(self, stats: RunningStats, rates: np.ndarray) -> None:
+        """Fill the table with `stats` and the sample `rates`."""
+        values = np.vstack(
+            [
+                rates,
+                stats.get_mean(),
+                stats.rms,
+                stats.min,
+                stats.max,
+                stats.std,
+            ]
+        ).T
+
+        for row, row_values in enumerate(values):
+            for col, value in enumerate(row_values):
+                text = '-' if np.isnan(value) else f'{value:.6g}'
+                self.table.item(row, col).setText(text)
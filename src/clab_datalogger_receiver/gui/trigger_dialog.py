@@ -0,0 +1,122 @@
+"""Dialog to set the trigger of the captures."""
+
+from __future__ import annotations
+
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QDoubleSpinBox,
+    QFormLayout,
+    QMessageBox,
+)
+
+from ..trigger import TRIGGER_CONDITIONS, TRIGGER_MODES, TriggerSettings
+
+# Maximum absolute trigger level
+MAX_TRIGGER_LEVEL: float = 1e12
+
+
+class TriggerDialog(QDialog):
+    """
+    Form with the settings of the trigger.
+
+    The pre and post trigger durations together can not exceed
+    `max_duration`, the data held by the buffer of the plots.
+    """
+
+    max_duration: float
+
+    channel_combo: QComboBox
+    condition_combo: QComboBox
+    level_spin: QDoubleSpinBox
+    pre_spin: QDoubleSpinBox
+    post_spin: QDoubleSpinBox
+    mode_combo: QComboBox
+
+    def __init__(
+        self,
+        channel_names: list[str],
+        max_duration: float,
+        settings: TriggerSettings | None = None,
+        parent=None,
+    ) -> None:
+        super().__init__(parent)
+
+        self.setWindowTitle('Trigger')
+        self.max_duration = max_duration
+
+        self.channel_combo = QComboBox()
+        self.channel_combo.addItems(channel_names)
+
+        self.condition_combo = QComboBox()
+        self.condition_combo.addItems(TRIGGER_CONDITIONS)
+
+        self.level_spin = QDoubleSpinBox()
+        self.level_spin.setRange(-MAX_TRIGGER_LEVEL, MAX_TRIGGER_LEVEL)
+        self.level_spin.setDecimals(6)
+
+        self.pre_spin = self.create_duration_spin()
+        self.post_spin = self.create_duration_spin()
+
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(TRIGGER_MODES)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok
+            | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout(self)
+        layout.addRow('Channel:', self.channel_combo)
+        layout.addRow('Condition:', self.condition_combo)
+        layout.addRow('Level:', self.level_spin)
+        layout.addRow('Pre-trigger:', self.pre_spin)
+        layout.addRow('Post-trigger:', self.post_spin)
+        layout.addRow('Mode:', self.mode_combo)
+        layout.addRow(buttons)
+
+        if settings is not None and settings.column <= len(channel_names):
+            self.channel_combo.setCurrentIndex(settings.column - 1)
+            self.condition_combo.setCurrentText(settings.condition)
+            self.level_spin.setValue(settings.level)
+            self.pre_spin.setValue(settings.pre)
+            self.post_spin.setValue(settings.post)
+            self.mode_combo.setCurrentText(settings.mode)
+        else:
+            self.pre_spin.setValue(0.1 * max_duration)
+            self.post_spin.setValue(0.1 * max_duration)
+
+    def create_duration_spin(self) -> QDoubleSpinBox:
+        """Create a spin box of a duration, in seconds."""
+        spin = QDoubleSpinBox()
+        spin.setRange(0, self.max_duration)
+        spin.setDecimals(3)
+        spin.setSuffix(' s')
+        return spin
+
+    @property
+    def settings(self) -> TriggerSettings:
+        """Return the settings in the form."""
+        return TriggerSettings(
+            column=self.channel_combo.currentIndex() + 1,
+            level=self.level_spin.value(),
+            condition=self.condition_combo.currentText(),
+            pre=self.pre_spin.value(),
+            post=self.post_spin.value(),
+            mode=self.mode_combo.currentText(),
+        )
+
+    def accept(self) -> None:
+        """Accept the settings, if the capture fits in the buffer."""
+        if self.pre_spin.value() + self.post_spin.value() > self.max_duration:
+            QMessageBox.warning(
+                self,
+                'Trigger',
+                'The pre and post trigger durations can be at most '
+                f'{self.max_duration:g} s together',
+            )
+            return
+        super().accept()
@@ -0,0 +1,267 @@
+"""
+Module that implements the crash-safe journal of an acquisition session.
+
+Every batch of received data is also appended to a journal file inside the
+session directory, using the chunk layout of the session format.
+The file is written by a background thread, that syncs it to disk
+periodically, so the thread receiving the data only enqueues the batch.
+
+The journal is removed when the session is closed properly, so a journal
+found in the sessions folder belongs to a session that was interrupted,
+and its data can be recovered to a session file.
+While journaling, the process holds a lock on a file of the session
+directory, released by the OS also if the process crashes, so that the
+sessions of other running instances are not taken as interrupted.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+
+from queue import Empty, SimpleQueue
+
+import numpy as np
+
+from .received_structure import PlottingStruct
+from .session_format import (
+    SESSION_CHUNK_ROWS,
+    SessionWriter,
+    columns_from_data,
+    iter_chunk_records,
+    read_session_header,
+    write_chunk_record,
+    write_session_header,
+)
+
+JOURNAL_FILENAME: str = 'journal.clabj'
+# File locked by the process writing the journal, holding its PID
+LOCK_FILENAME: str = 'owner.lock'
+
+# Seconds between the syncs of the journal to disk, thus the maximum amount
+#   of data that can be lost in a crash.
+JOURNAL_SYNC_INTERVAL: float = 1.0
+
+_STOP = object()
+
+
+def _try_lock(file) -> bool:
+    """Lock the open `file` without waiting, return whether it worked."""
+    try:
+        if os.name == 'nt':
+            # pylint: disable-next=import-outside-toplevel
+            import msvcrt
+
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            # pylint: disable-next=import-outside-toplevel
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def lock_session(session_dir: str):
+    """
+    Lock `session_dir` for this process, returning the open lock file.
+
+    The lock lasts until the file is closed, or the process ends.
+    """
+    lock_path = os.path.join(session_dir, LOCK_FILENAME)
+    # pylint: disable-next=consider-using-with
+    file = open(lock_path, 'a+', encoding='utf-8')
+    if not _try_lock(file):
+        file.close()
+        raise RuntimeError(f'The session {session_dir} is already in use')
+
+    file.truncate(0)
+    file.write(str(os.getpid()))
+    file.flush()
+    return file
+
+
+def is_session_locked(session_dir: str) -> bool:
+    """Return whether a running process holds the lock of `session_dir`."""
+    lock_path = os.path.join(session_dir, LOCK_FILENAME)
+    if not os.path.isfile(lock_path):
+        return False
+
+    try:
+        # pylint: disable-next=consider-using-with
+        file = open(lock_path, 'a+', encoding='utf-8')
+    except OSError:
+        # Also on Windows, if opened by its owner
+        return True
+    with file:
+        # The lock is released when the file is closed
+        return not _try_lock(file)
+
+
+class SessionJournal(threading.Thread):
+    """
+    Thread appending the batches of a session to its journal file.
+
+    The batches are accumulated in memory and written as a single chunk
+    every `sync_interval` seconds, followed by a sync of the file.
+    """
+
+    filepath: str
+    sync_interval: float
+    # Exception that stopped the journaling, if any
+    error: Exception | None
+
+    _queue: SimpleQueue
+
+    def __init__(
+        self,
+        filepath: str,
+        data_struct: PlottingStruct,
+        sync_interval: float = JOURNAL_SYNC_INTERVAL,
+    ) -> None:
+        """Create the journal file, starting the thread writing it."""
+        super().__init__(name='Journal thread', daemon=True)
+
+        self.filepath = filepath
+        self.sync_interval = sync_interval
+        self.error = None
+
+        self._queue = SimpleQueue()
+        self._lock_file = lock_session(os.path.dirname(filepath))
+
+        # pylint: disable-next=consider-using-with
+        self._file = open(filepath, 'wb')
+        write_session_header(self._file, data_struct)
+        self._sync()
+
+        self.start()
+
+    def append(self, x_new, y_new) -> None:
+        """
+        Enqueue a batch of samples to be journaled.
+
+        The arrays must not be modified afterwards.
+        """
+        if self.error is None:
+            self._queue.put((x_new, y_new))
+
+    def _sync(self) -> None:
+        """Make sure that the data written is on disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _write(self, batches: list) -> None:
+        """Write `batches` as a single chunk, then sync the file."""
+        if batches:
+            columns = np.concatenate(
+                [columns_from_data(x, y) for x, y in batches], axis=1
+            )
+            if columns.shape[1] > 0:
+                write_chunk_record(self._file, columns)
+
+        self._sync()
+
+    def run(self) -> None:
+        """Write the enqueued batches until `close()` is called."""
+        batches = []
+        next_sync = time.monotonic() + self.sync_interval
+
+        try:
+            while True:
+                try:
+                    batch = self._queue.get(
+                        timeout=max(0.0, next_sync - time.monotonic())
+                    )
+                except Empty:
+                    batch = None
+
+                if batch is _STOP:
+                    break
+                if batch is not None:
+                    batches.append(batch)
+
+                if time.monotonic() >= next_sync:
+                    self._write(batches)
+                    batches = []
+                    next_sync = time.monotonic() + self.sync_interval
+
+            self._write(batches)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Losing the journal must not stop the acquisition
+            print(f'Journaling stopped: {type(e).__name__}: {e}')
+            self.error = e
+        finally:
+            self._file.close()
+
+    def close(self, remove: bool = True) -> None:
+        """Write the pending batches and stop the thread."""
+        self._queue.put(_STOP)
+        self.join()
+
+        if remove and os.path.isfile(self.filepath):
+            os.remove(self.filepath)
+
+        self._lock_file.close()
+        os.remove(self._lock_file.name)
+
+
+def find_unfinished_sessions(
+    sessions_folder: str, exclude: list[str] | None = None
+) -> list[str]:
+    """
+    Return the session directories with a journal left by a crash.
+
+    The directories in `exclude`, like the one of the running session,
+    are skipped, and so are the ones locked by a running process.
+    """
+    exclude = [os.path.abspath(d) for d in exclude or []]
+
+    sessions = []
+    for name in sorted(os.listdir(sessions_folder)):
+        session_dir = os.path.abspath(os.path.join(sessions_folder, name))
+        if session_dir in exclude:
+            continue
+        if os.path.isfile(
+            os.path.join(session_dir, JOURNAL_FILENAME)
+        ) and not is_session_locked(session_dir):
+            sessions.append(session_dir)
+
+    return sessions
+
+
+def recover_journal(
+    journal_path: str,
+    filepath: str,
+    chunk_rows: int = SESSION_CHUNK_ROWS,
+) -> int:
+    """
+    Write the data found in a journal to the session file `filepath`.
+
+    The journal is mapped, not loaded in memory, and the chunks that were
+    not completely written are dropped.
+    Return the number of samples recovered.
+    """
+    if os.path.getsize(journal_path) == 0:
+        raise ValueError(f'{journal_path} is empty')
+
+    buffer = np.memmap(journal_path, dtype=np.uint8, mode='r')
+    try:
+        header, pos = read_session_header(buffer, journal_path)
+        data_struct = PlottingStruct.from_config_list(header['schema'])
+
+        with SessionWriter(filepath, data_struct, chunk_rows) as writer:
+            for _, columns in iter_chunk_records(buffer, pos):
+                writer.append_columns(columns)
+
+            return writer.n_rows
+    finally:
+        # Release the mapping, so that the session can be removed
+        del buffer
+
+
+def discard_session(session_dir: str) -> None:
+    """Remove a session directory, with its journal."""
+    shutil.rmtree(session_dir, ignore_errors=True)
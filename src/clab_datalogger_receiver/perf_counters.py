@@ -0,0 +1,105 @@
+"""
+Module with the counters of the performance of the acquisition pipeline.
+
+The reader thread, the dequeuing worker and the GUI thread increase the
+counters of their own stage, and the GUI periodically samples them, to
+show the rates over the last period.
+Each counter is increased by a single thread, so no lock is needed, and
+a sample can only miss the increments of the batch in progress.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+
+@dataclass
+class PipelineCounters:
+    """Cumulative counters of the stages of the pipeline."""
+
+    # Reader thread: packets decoded and discarded, and the times the
+    #   queue was full, blocking the reader
+    received_packets: int = 0
+    dropped_packets: int = 0
+    queue_stalls: int = 0
+
+    # Dequeuing worker: batches turned in arrays, and the time spent
+    batches: int = 0
+    decode_time: float = 0.0
+
+    # GUI thread: frames drawn, and the time spent in `update_axis`
+    frames: int = 0
+    update_axis_time: float = 0.0
+
+    def snapshot(self) -> PipelineCounters:
+        """Return a copy of the counters."""
+        return replace(self)
+
+
+def _mean_ms(total_time: float, count: int) -> float:
+    """Return the mean of `count` durations in ms, NaN if there are none."""
+    return total_time * 1e3 / count if count > 0 else np.nan
+
+
+@dataclass
+class PipelineRates:
+    """Performance of the pipeline over a period, between two samples."""
+
+    packet_rate: float
+    dropped_packets: int
+    drop_rate: float
+    queue_stalls: int
+    queue_depth: int
+    # Mean milliseconds per batch
+    decode_ms: float
+    render_fps: float
+    # Mean milliseconds per frame
+    update_axis_ms: float
+
+    @classmethod
+    def from_counters(
+        cls,
+        previous: PipelineCounters,
+        current: PipelineCounters,
+        elapsed: float,
+        queue_depth: int,
+    ) -> PipelineRates:
+        """Compute the rates between two samples, `elapsed` seconds apart."""
+        batches = current.batches - previous.batches
+        frames = current.frames - previous.frames
+        received = current.received_packets - previous.received_packets
+        dropped = current.dropped_packets - previous.dropped_packets
+        decode_time = current.decode_time - previous.decode_time
+        update_axis_time = current.update_axis_time - previous.update_axis_time
+
+        return cls(
+            packet_rate=received / elapsed,
+            dropped_packets=current.dropped_packets,
+            drop_rate=dropped / elapsed,
+            queue_stalls=current.queue_stalls,
+            queue_depth=queue_depth,
+            decode_ms=_mean_ms(decode_time, batches),
+            render_fps=frames / elapsed,
+            update_axis_ms=_mean_ms(update_axis_time, frames),
+        )
+
+    def format(self) -> str:
+        """Return the rates as text, a line per stage."""
+
+        def ms(value: float) -> str:
+            return '-' if np.isnan(value) else f'{value:.2f} ms'
+
+        return '\n'.join(
+            [
+                f'Link:   {self.packet_rate:8.1f} frames/s, '
+                f'dropped {self.dropped_packets} '
+                f'({self.drop_rate:.1f}/s)',
+                f'Queue:  {self.queue_depth:8d} waiting, '
+                f'full {self.queue_stalls} times',
+                f'Decode: {ms(self.decode_ms):>8} per batch',
+                f'Render: {self.render_fps:8.1f} FPS, '
+                f'update_axis {ms(self.update_axis_ms)}',
+            ]
+        )
@@ -5,7 +5,9 @@ from __future__ import annotations
 
 import os
 
+from functools import partial
 from queue import Queue
+from time import perf_counter
 from typing import Callable, Type
 
 from datetime import datetime
@@ -13,45 +15,103 @@ import qdarktheme
 
 from pyqtgraph import (
     GraphicsLayoutWidget as pg_GraphicsLayoutWidget,
+    PlotDataItem,
     PlotItem,
     ViewBox,
 )
-from numpy import array as np_array
-from numpy import concatenate as np_concatenate
+from numpy import fmax, fmin, isnan
 from numpy import ndarray as np_ndarray
+from numpy import searchsorted as np_searchsorted
 
-from PySide6.QtCore import QThread
+from PySide6.QtCore import QThread, QTimer, Qt
 from PySide6.QtCore import Signal as pyqtSignal
 from PySide6.QtGui import QIcon, QPen
 from PySide6.QtWidgets import (
     QApplication,
+    QDockWidget,
     QMainWindow,
     QVBoxLayout,
     QWidget,
     QMessageBox,
     QFileDialog,
+    QInputDialog,
+    QProgressDialog,
+    QScrollArea,
 )
 from serial import Serial
 from serial.tools.list_ports_common import ListPortInfo
 
 
 from .base.common import resource_path
+from .channel_statistics import SessionStatistics, WindowStatistics
+from .checksums import SavedDataCorruptedError, format_corrupted_ranges
+from .decimation import MinMaxPyramid, StreamingMinMaxDecimator
 from .gui.base_widgets import BoxButtonsWidget
+from .gui.capture_view import CaptureView
 from .gui.colors import get_background_brush, get_graphs_pens
+from .gui.perf_hud import PerfHud
+from .gui.spectrum_view import SpectrumView
+from .gui.statistics_panel import StatisticsPanel
+from .gui.trigger_dialog import TriggerDialog
+from .journal import (
+    JOURNAL_FILENAME,
+    discard_session,
+    find_unfinished_sessions,
+    recover_journal,
+)
+from .perf_counters import PipelineCounters, PipelineRates
 from .received_structure import PlottingStruct
-from .saver import save_as_mat, save_as_pandas_dataframe
+from .saver import (
+    PARQUET_ROW_GROUP_SIZE,
+    SAVE_FORMATS,
+    get_save_function,
+)
 from .serial_communication.communication import (
     ManualPortTurtlebotSerialConnector,
 )
 from .serial_communication.packets import TimedPacketBase
+from .ring_buffer import RingBuffer
+from .rotation import SegmentRecorder, get_manifest_path
+from .session_format import (
+    columns_from_data,
+    get_session_column_names,
+    split_columns,
+)
+from .session_sources import (
+    SESSION_FILE_FILTERS,
+    LiveSessionSource,
+    SessionSource,
+    open_session_source,
+)
+from .session_store import SessionStore, get_sessions_folder
 from .simple_console_main_classes import (
     SubplotsReferences,
 )
 from .udp_communication.types import UDPData
 from .widgets import TopMenuWidget
-from .workers import DequeueAndPlotterWorker
+from .workers import DequeueAndPlotterWorker, SaveWorker, SpectrumWorker
 
 from .struct_editor import StructConfigEditor
+from .trigger import Trigger, TriggerSettings, extract_capture
+
+# Time windows of data held by the plot buffer
+PLOT_BUFFER_HEADROOM: float = 2
+# Minimum and maximum number of samples of the plot buffer
+MIN_PLOT_BUFFER_CAPACITY: int = 1 << 12
+MAX_PLOT_BUFFER_CAPACITY: int = 1 << 20
+# The plot buffer is shrunk when this many times bigger than needed
+PLOT_BUFFER_SHRINK_RATIO: int = 4
+# Minimum number of envelope buckets per time window, that are at least
+#   one per pixel of the plots
+PLOT_MIN_BUCKETS: int = 100
+# Maximum frames per second of the live plots
+PLOT_FPS: int = 30
+# Below this height per subplot, the plots are scrolled instead of shrunk
+MIN_SUBPLOT_HEIGHT: int = 120
+# Milliseconds between the updates of the statistics panel
+STATISTICS_REFRESH_INTERVAL: int = 500
+# Milliseconds between the updates of the performance overlay
+HUD_REFRESH_INTERVAL: int = 500
 
 
 class MainWindow(QMainWindow):
@@ -73,18 +133,82 @@ class MainWindow(QMainWindow):
     rx_thread: QThread
 
     subplots_reference: SubplotsReferences
-    serial_connection: ManualPortTurtlebotSerialConnector | None
+    serial_connection: ManualPortTurtlebotSerialConnector | None = None
 
     data_saved: bool = True
-    # Vectors containing the data seen in the plots
-    x_data: np_ndarray
-    y_data: list[list[np_ndarray]]
-    # y_data: list[list[Any]]
-
-    # Vectors used to cache the entire data, later saved in the .mat file
-    x_data_vectors: np_ndarray
-    y_data_vectors: list[list[np_ndarray]]
-    # y_data_vectors: list[list[Any]]
+    # Ring buffer of the plotted data, with the time in the first row
+    plot_buffer: RingBuffer
+    # Envelope of the plotted data, that is what is actually drawn
+    plot_decimator: StreamingMinMaxDecimator
+
+    # Disk backed store of the entire data, later saved to file
+    session_store: SessionStore | None = None
+    # Store replaced while a save was reading it, closed after the save
+    retired_session_store: SessionStore | None = None
+    # Envelope of the entire data, to review it while acquiring
+    history: MinMaxPyramid
+    # Statistics of the channels, over the session and the time window
+    session_statistics: SessionStatistics
+    window_statistics: WindowStatistics
+    statistics_dock: QDockWidget
+    statistics_panel: StatisticsPanel
+    statistics_timer: QTimer
+
+    # Counters of the reader, the dequeuing worker and the frames, and the
+    #   overlay showing their rates, with the time of the last sample
+    pipeline_counters: PipelineCounters
+    perf_hud: PerfHud
+    hud_timer: QTimer
+    hud_sample: tuple[float, PipelineCounters]
+
+    # Open spectrum views, by subplot index, with their worker and thread
+    spectrum_views: dict[int, tuple[SpectrumView, SpectrumWorker, QThread]]
+    # Closed spectra, kept until their thread is finished, since
+    #   destroying a running QThread, or an object living in it, crashes
+    stopped_spectra: list[tuple[SpectrumView, SpectrumWorker, QThread]]
+
+    # Trigger of the captures, if armed, and the window showing them
+    trigger: Trigger | None = None
+    trigger_settings: TriggerSettings | None = None
+    capture_view: CaptureView | None = None
+
+    # Worker saving the data in background, if a save is in progress
+    save_worker: SaveWorker | None = None
+    save_thread: QThread | None = None
+    save_progress_dialog: QProgressDialog | None = None
+    # Samples of the session in the save, `None` if they are not all saved
+    saved_samples: int | None = 0
+    close_after_save: bool = False
+
+    # Options of the Arrow based writers.
+    # The compression is per format, `None` uses the `saver` default.
+    export_compression: dict[str, str | None] = {
+        'parquet': None,
+        'feather': None,
+    }
+    export_row_group_size: int = PARQUET_ROW_GROUP_SIZE
+    # Verify the saved file against the checksums written with it, when
+    #   the format supports it. It reads the whole file back.
+    check_saved_files: bool = False
+
+    # Recorder saving the incoming data in segments, if recording
+    recorder: SegmentRecorder | None = None
+    # Limits of the recorded segments, `None` to disable one of them
+    segment_duration: float | None = 15 * 60
+    max_segment_bytes: int | None = 1 << 30
+
+    # Saved session shown instead of the live data, if any
+    review_source: SessionSource | None = None
+    review_subplots: SubplotsReferences
+    review_timer: QTimer
+    # Last time of the reviewed session, that grows if it is the live one
+    review_t_end: float = 0
+
+    # Frame clock redrawing the live plots, if new data arrived
+    render_timer: QTimer
+    plot_dirty: bool = False
+    # The live plots stop following the data, that is still acquired
+    display_frozen: bool = False
 
     # Time of connection interruption
     t_interruption: float | datetime | None = None
@@ -96,24 +220,49 @@ class MainWindow(QMainWindow):
         data_struct: PlottingStruct,
         time_window: float,
         app: QApplication,
-        min_plot_points: int = 2000,
-        max_plot_points: int = 3000,
+        fps: int = PLOT_FPS,
     ) -> None:
         super().__init__()
 
         self.data_struct = data_struct
-        self.max_plot_points = max_plot_points
-        self.min_plot_points = min_plot_points
 
         self.time_window = time_window
         self.app = app
 
+        self.spectrum_views = {}
+        self.stopped_spectra = []
+        self.pipeline_counters = PipelineCounters()
+        self.hud_sample = (perf_counter(), self.pipeline_counters.snapshot())
+
         self.init_data_cache()
         self.init_data_vectors()
 
         self.create_window()
         self.create_subplots()
 
+        # Coalesce the view changes of the review mode in a single update
+        self.review_timer = QTimer(self)
+        self.review_timer.setSingleShot(True)
+        self.review_timer.setInterval(30)
+        self.review_timer.timeout.connect(self.update_review_plots)
+
+        # Redraw at most once per frame, however fast the data arrives
+        self.render_timer = QTimer(self)
+        self.render_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.render_timer.timeout.connect(self.render_frame)
+        self.fps = fps
+        self.render_timer.start()
+
+        self.statistics_timer = QTimer(self)
+        self.statistics_timer.setInterval(STATISTICS_REFRESH_INTERVAL)
+        self.statistics_timer.timeout.connect(self.refresh_statistics)
+        self.statistics_timer.start()
+
+        # Only sampled while the overlay is shown
+        self.hud_timer = QTimer(self)
+        self.hud_timer.setInterval(HUD_REFRESH_INTERVAL)
+        self.hud_timer.timeout.connect(self.refresh_hud)
+
         # Put a size to the queue, so an error is risen if the dequeuing
         #   is not fast enough
         self.rx_queue = Queue(maxsize=100)
@@ -121,7 +270,9 @@ class MainWindow(QMainWindow):
         self.rx_thread = QThread()
 
         self.rx_worker = DequeueAndPlotterWorker(
-            self.rx_queue, self.subplots_reference
+            self.rx_queue,
+            self.subplots_reference,
+            counters=self.pipeline_counters,
         )
 
         self.rx_thread.setObjectName('Dequeuer thread')
@@ -138,13 +289,61 @@ class MainWindow(QMainWindow):
         # Start the dequeuing thread.
         self.rx_thread.start()
 
+        # Once the window is shown, offer to recover the crashed sessions
+        QTimer.singleShot(0, self.recover_unfinished_sessions)
+
     def closeEvent(self, event):
+        if self.recorder is not None and not self.save_in_progress:
+            # The window is closed once the last segment is saved
+            self.stop_recording()
+            self.close_after_save = True
+
+        if self.save_in_progress:
+            # The data being saved lives in the session store
+            event.ignore()
+            return
+
+        self.close_spectra()
+        for _, _, thread in self.stopped_spectra:
+            thread.wait()
+
+        if self.capture_view is not None:
+            self.capture_view.close()
+
         # Stop the worker and the thread
-        self.rx_worker.working = False
+        self.rx_worker.stop()
         self.rx_thread.exit()
 
+        if self.session_store is not None:
+            self.session_store.close()
+
+        if self.review_source is not None:
+            self.review_source.close()
+
         super().closeEvent(event)
 
+    @property
+    def x_data_vectors(self) -> np_ndarray:
+        """Return the time vector of the whole session."""
+        assert self.session_store is not None
+        return self.session_store.x_data
+
+    @property
+    def y_data_vectors(self) -> list[list[np_ndarray]]:
+        """Return the data vectors of the whole session."""
+        assert self.session_store is not None
+        return self.session_store.y_data
+
+    @property
+    def x_data(self) -> np_ndarray:
+        """Return the time vector of the plotted data."""
+        return self.get_plot_columns()[0]
+
+    @property
+    def y_data(self) -> list[list[np_ndarray]]:
+        """Return the data vectors of the plotted data."""
+        return split_columns(self.data_struct, self.get_plot_columns())[1]
+
     def append_data(self, x_new: np_ndarray, y_new: list[list[np_ndarray]]):
         """
         Append new data to the plotted vectors.
@@ -152,80 +351,229 @@ class MainWindow(QMainWindow):
         Used when new data arrives from the communication channel.
         """
         self.data_saved = False
-        self.x_data = np_concatenate((self.x_data, x_new))
 
-        for y_i, (y_s, y_n) in enumerate(zip(self.y_data, y_new)):
-            for y_ii, (y_s_i, y_n_i) in enumerate(zip(y_s, y_n)):
-                self.y_data[y_i][y_ii] = np_concatenate((y_s_i, y_n_i))
+        assert self.session_store is not None
+        self.session_store.append(x_new, y_new)
+
+        if self.recorder is not None:
+            self.update_recording()
+
+        columns = columns_from_data(x_new, y_new)
+        self.reserve_plot_buffer(x_new)
+        self.plot_buffer.append(columns)
+        self.trim_plot_buffer()
+        if self.trigger is not None:
+            self.update_trigger(columns)
+        self.plot_decimator.append(columns)
+        self.history.append(columns)
+        self.session_statistics.append(columns)
+        self.window_statistics.append(columns)
+
+        self.plot_dirty = True
+
+    @property
+    def fps(self) -> float:
+        """Return the maximum frames per second of the live plots."""
+        return 1000 / self.render_timer.interval()
+
+    @fps.setter
+    def fps(self, fps: float) -> None:
+        """Set the maximum frames per second of the live plots."""
+        assert fps > 0, 'The frames per second must be positive'
+        self.render_timer.setInterval(max(1, round(1000 / fps)))
+
+    def render_frame(self):
+        """Redraw the live plots, if data arrived since the last frame."""
+        if not self.plot_dirty:
+            return
 
-        self.update_axis()
+        if self.review_source is None:
+            if self.display_frozen:
+                return
+            self.plot_dirty = False
+            t_start = perf_counter()
+            self.update_axis()
+            self.pipeline_counters.update_axis_time += perf_counter() - t_start
+            self.pipeline_counters.frames += 1
+        elif isinstance(self.review_source, LiveSessionSource):
+            self.plot_dirty = False
+            self.follow_live_review()
+
+    def reserve_plot_buffer(self, x_new: np_ndarray):
+        """
+        Grow the plot buffer, if needed to hold the time window.
 
-        self.do_cache_if_needed()
+        The capacity is doubled until it holds `PLOT_BUFFER_HEADROOM` time
+        windows at the current data rate, so that the plotted views are
+        not overwritten while pyqtgraph still uses them.
+        """
+        buffer = self.plot_buffer
+        n_total = len(buffer) + len(x_new)
+        if len(x_new) == 0 or n_total <= buffer.capacity:
+            return
 
-    def do_cache_if_needed(self):
-        """Cache the data vectors, if needed."""
+        t_oldest = buffer.view()[0, 0] if len(buffer) > 0 else x_new[0]
+        span = x_new[-1] - t_oldest
+        target_span = PLOT_BUFFER_HEADROOM * self.time_window
+        if span >= target_span:
+            return
 
-        if self.x_data.size > self.max_plot_points:
-            self.do_cache()
+        capacity = 2 * buffer.capacity
+        if span > 0:
+            capacity = max(capacity, int(n_total * target_span / span))
+        buffer.resize(min(capacity, MAX_PLOT_BUFFER_CAPACITY))
 
-    def do_cache(self):
+    def trim_plot_buffer(self):
         """
-        Cache the plotted data to a larger vector.
+        Shrink the plot buffer, if it is much bigger than needed.
 
-        Used to keep the plotted data smaller, thus lighter
+        This happens when the data rate drops, once the samples received
+        before are older than `PLOT_BUFFER_HEADROOM` time windows, so that
+        the memory follows the data rate.
         """
-        self.x_data_vectors = np_concatenate(
-            (self.x_data_vectors, self.x_data[: self.min_plot_points])
+        buffer = self.plot_buffer
+        if buffer.capacity <= MIN_PLOT_BUFFER_CAPACITY or len(buffer) == 0:
+            return
+
+        times = buffer.view()[0]
+        t_oldest = times[-1] - PLOT_BUFFER_HEADROOM * self.time_window
+        n_needed = len(times) - int(
+            np_searchsorted(times, t_oldest, side='left')
         )
-        self.x_data = self.x_data[-self.min_plot_points :]
+        if PLOT_BUFFER_SHRINK_RATIO * n_needed < buffer.capacity:
+            buffer.resize(max(2 * n_needed, MIN_PLOT_BUFFER_CAPACITY))
 
-        for y_i, y_s in enumerate(self.y_data):
-            for y_ii, y_s_i in enumerate(y_s):
-                self.y_data_vectors[y_i][y_ii] = np_concatenate(
-                    (
-                        self.y_data_vectors[y_i][y_ii],
-                        y_s_i[: self.min_plot_points],
-                    )
-                )
-                self.y_data[y_i][y_ii] = self.y_data[y_i][y_ii][
-                    -self.min_plot_points :
-                ]
+    def get_plot_columns(self) -> np_ndarray:
+        """
+        Return the buffered samples in the time window, without copies.
+
+        The result is a `(n_columns, n_samples)` view, with the time in
+        the first row.
+        """
+        columns = self.plot_buffer.view()
+        if columns.shape[1] == 0:
+            return columns
+
+        # Keep one sample before the window, so the curves reach its edge
+        first = int(
+            np_searchsorted(
+                columns[0], columns[0, -1] - self.time_window, side='right'
+            )
+        )
+        return columns[:, max(0, first - 1) :]
 
     def init_data_cache(self) -> None:
-        """Initialize `self.y_data_vector` according to `self.data_struct`."""
-        self.x_data_vectors = np_array([])
+        """Initialize `self.session_store` according to `self.data_struct`."""
+        if self.session_store is not None:
+            if self.save_in_progress:
+                # The save reads the data of this store
+                self.retired_session_store = self.session_store
+                self.saved_samples = None
+            else:
+                self.session_store.close()
 
-        self.y_data_vectors = [
-            [np_array([]) for _ in range(len(sp))]
-            for sp in self.data_struct.subplots
-        ]
+        self.session_store = SessionStore(self.data_struct, journal=True)
+        n_columns = len(get_session_column_names(self.data_struct))
+        self.history = MinMaxPyramid(n_columns)
+        self.session_statistics = SessionStatistics(n_columns - 1)
 
     def init_data_vectors(self) -> None:
-        """Initialize `self.y_data_vector` according to `self.data_struct`."""
-        self.x_data = np_array([])
+        """Initialize `self.plot_buffer` according to `self.data_struct`."""
+        self.plot_buffer = RingBuffer(
+            len(get_session_column_names(self.data_struct)),
+            MIN_PLOT_BUFFER_CAPACITY,
+        )
+        self.init_plot_decimator(PLOT_MIN_BUCKETS)
+        self.window_statistics = WindowStatistics(
+            self.plot_buffer.n_rows - 1, self.time_window
+        )
 
-        self.y_data = [
-            [np_array([]) for _ in range(len(sp))]
-            for sp in self.data_struct.subplots
-        ]
+    def init_plot_decimator(self, n_buckets: int) -> None:
+        """
+        Create the decimator of the plotted data, with `n_buckets` buckets
+        per time window, filling it with the buffered data.
+        """
+        self.plot_decimator = StreamingMinMaxDecimator(
+            self.plot_buffer.n_rows,
+            self.time_window / n_buckets,
+            int(PLOT_BUFFER_HEADROOM * n_buckets) + 1,
+        )
+        self.plot_decimator.append(self.get_plot_columns())
 
-    def update_axis(self):
-        """Update all the axis according to `self.x_data` and `self.y_data`."""
+    def get_plot_buckets(self) -> int:
+        """Return the buckets per time window, one per pixel of the plots."""
+        view_box = self.subplots_reference.axes[0].getViewBox()
+        return max(PLOT_MIN_BUCKETS, int(view_box.width()))
+
+    def update_axis(self, copy: bool = False):
+        """
+        Update all the axis according to `self.plot_buffer`.
+
+        The curves are given the min/max envelope of the data, with two
+        points per pixel, so their cost does not depend on the data rate.
+        The envelope is a view of the decimator buffer, unless `copy` is
+        `True`, for the curves that must not change with the new data.
+        The y ranges are set from the extremes kept by the decimator, so
+        that pyqtgraph does not scan the curves to find them.
+        """
         axes = self.subplots_reference.axes
         curves = self.subplots_reference.curves
 
+        # The plots were resized
+        n_buckets = self.get_plot_buckets()
+        if self.plot_decimator.bucket_width != self.time_window / n_buckets:
+            self.init_plot_decimator(n_buckets)
+
+        x_last = self.plot_buffer.view(1)[0]
+        t_start = x_last[-1] - self.time_window if len(x_last) else 0
+        envelope = self.plot_decimator.view(t_start)
+        if copy:
+            envelope = envelope.copy()
+        x_data, y_data = split_columns(self.data_struct, envelope)
+        y_mins, y_maxs = self.plot_decimator.extremes(t_start)
+
+        first_field = 0
         for ax_i, axis in enumerate(axes):
+            fields = slice(first_field, first_field + len(curves[ax_i]))
+            first_field = fields.stop
+
+            # The plots not looked at are updated when shown, but the
+            #   copies must be complete
+            if not copy and not self.is_plot_on_screen(axis):
+                continue
             for l_i, curve_i in enumerate(curves[ax_i]):
-                curve_i.setData(x=self.x_data, y=self.y_data[ax_i][l_i])
-            if len(self.x_data) == 0:
+                if copy or curve_i.isVisible():
+                    curve_i.setData(x=x_data, y=y_data[ax_i][l_i])
+
+            self.set_y_range(
+                axis, curves[ax_i], y_mins[fields], y_maxs[fields]
+            )
+            if len(x_data) == 0:
                 # If no data, set the x range to 0
                 axis.setXRange(0, self.time_window)
             else:
                 axis.setXRange(
-                    max(0, self.x_data[-1] - self.time_window),
-                    max(self.time_window, self.x_data[-1]),
+                    max(0, x_data[-1] - self.time_window),
+                    max(self.time_window, x_data[-1]),
                 )
 
+    def set_y_range(
+        self,
+        axis: PlotItem,
+        curves: list[PlotDataItem],
+        y_mins: np_ndarray,
+        y_maxs: np_ndarray,
+    ):
+        """Fit the y range of `axis` to the extremes of its visible curves."""
+        visible = [curve.isVisible() for curve in curves]
+        if not any(visible):
+            return
+
+        y_min = fmin.reduce(y_mins[visible])
+        y_max = fmax.reduce(y_maxs[visible])
+        if not isnan(y_min):
+            axis.setYRange(y_min, y_max)
+
     def get_time_after_reconnection(self):
         """
         Get the time after a reconnection occurs.
@@ -263,6 +611,7 @@ class MainWindow(QMainWindow):
             connection=connection,
             existing_queue=self.rx_queue,
             t_0=self.get_time_after_reconnection(),
+            counters=self.pipeline_counters,
         )
 
         self.serial_connection.connect()
@@ -308,42 +657,114 @@ class MainWindow(QMainWindow):
             )
         )
 
-        layout.addWidget(self.graph_widget)
-        layout.addWidget(
-            BoxButtonsWidget(
-                names=['Edit Config', 'Save', 'Exit'],
-                fcns=[self.open_struct_editor, self.save, self.close]
-            )
+        # Many subplots are scrolled, so only the ones shown are drawn
+        self.graph_scroll_area = QScrollArea()
+        self.graph_scroll_area.setWidgetResizable(True)
+        self.graph_scroll_area.setWidget(self.graph_widget)
+        self.graph_scroll_area.verticalScrollBar().valueChanged.connect(
+            self.on_plots_shown
+        )
+        layout.addWidget(self.graph_scroll_area)
+        self.perf_hud = PerfHud(self.graph_scroll_area)
+        self.buttons_widget = BoxButtonsWidget(
+            names=[
+                'Edit Config',
+                'Open',
+                'History',
+                'Back to Live',
+                'Freeze',
+                'Statistics',
+                'Spectrum',
+                'Trigger',
+                'HUD',
+                'Record',
+                'Save',
+                'Verify Saves',
+                'Exit',
+            ],
+            fcns=[
+                self.open_struct_editor,
+                self.open_session,
+                self.review_history,
+                self.exit_review_mode,
+                self.toggle_freeze,
+                self.toggle_statistics,
+                self.open_spectrum,
+                self.toggle_trigger,
+                self.toggle_hud,
+                self.toggle_recording,
+                self.save,
+                self.set_check_saved_files,
+                self.close,
+            ]
         )
+        self.buttons_widget.buttons['Back to Live'].setEnabled(False)
+        verify_btn = self.buttons_widget.buttons['Verify Saves']
+        verify_btn.setCheckable(True)
+        verify_btn.setChecked(self.check_saved_files)
+        verify_btn.setToolTip(
+            'Read the saved files back and check them against their '
+            'checksums'
+        )
+        layout.addWidget(self.buttons_widget)
 
         self.main_widget = QWidget()
         self.main_widget.setLayout(layout)
 
         self.setCentralWidget(self.main_widget)
 
+        self.statistics_panel = StatisticsPanel(
+            get_session_column_names(self.data_struct)[1:]
+        )
+        self.statistics_dock = QDockWidget('Statistics', self)
+        self.statistics_dock.setWidget(self.statistics_panel)
+        self.addDockWidget(
+            Qt.DockWidgetArea.RightDockWidgetArea, self.statistics_dock
+        )
+        self.statistics_dock.hide()
+
     def create_subplots(self):
         """Create the subplots and data items based on the data struct \
               given as parameter."""
-        rx_data_format = self.data_struct
+        self.subplots_reference = self.build_subplots(self.data_struct)
+
+    def build_subplots(
+        self, rx_data_format: PlottingStruct, review: bool = False
+    ) -> SubplotsReferences:
+        """
+        Create the subplots and data items for `rx_data_format`.
+
+        In review mode the x axis can be panned and zoomed with the mouse,
+        and it is shared among the subplots.
+        """
         axes = []
         datas = []
 
+        self.graph_widget.setMinimumHeight(
+            MIN_SUBPLOT_HEIGHT * len(rx_data_format.subplots)
+        )
+
         for i, dat_format in enumerate(rx_data_format.subplots):
             axis: PlotItem = self.graph_widget.addPlot(
                 row=i,
                 col=0,
                 title=dat_format.name,
-                enableMouse=False,
+                enableMouse=review,
             )
 
             axis.showGrid(True)
             # axis.enableAutoRange(x=False, y=True)
             vb = axis.getViewBox()
             assert isinstance(vb, ViewBox)
-            vb.setMouseEnabled(x=False, y=False)
-            vb.enableAutoRange(x=False, y=True)
+            vb.setMouseEnabled(x=review, y=False)
+            # The live y range is set with the data
+            vb.enableAutoRange(x=False, y=review)
             vb.setXRange(0, self.time_window)
-            axis.setDownsampling(True, auto=True)
+            if review:
+                # The data is already decimated to the visible range
+                vb.setAutoVisible(y=True)
+                if axes:
+                    axis.setXLink(axes[0])
             axis.addLegend(
                 offset=(-10, 10),
                 brush=self.legend_background_brush,
@@ -353,14 +774,29 @@ class MainWindow(QMainWindow):
                 axis.plot(pen=self.pens[f_i], name=n.name)
                 for f_i, n in enumerate(dat_format.fields)
             ]
+            # The curves are hidden and shown clicking on the legend
+            for curve in data_plots:
+                curve.visibleChanged.connect(self.on_plots_shown)
 
             axes.append(axis)
             datas.append(data_plots)
 
-        self.subplots_reference = SubplotsReferences(
-            self.data_struct, axes, datas
+        return SubplotsReferences(rx_data_format, axes, datas)
+
+    def is_plot_on_screen(self, axis: PlotItem) -> bool:
+        """Return whether any part of `axis` is shown on screen."""
+        rect = self.graph_widget.mapFromScene(axis.sceneBoundingRect())
+        return self.graph_widget.visibleRegion().intersects(
+            rect.boundingRect()
         )
 
+    def on_plots_shown(self, *_):
+        """Redraw the plots, since some plots or curves were shown."""
+        if self.review_source is None:
+            self.plot_dirty = True
+        else:
+            self.review_timer.start()
+
     def sel_changed(self, selected_port: ListPortInfo):
         print(selected_port)
         # TODO: Why was this function here?
@@ -387,6 +823,14 @@ class MainWindow(QMainWindow):
         self.connect(connection)
 
     def close(self, force: bool = False) -> bool:
+        if self.save_in_progress:
+            QMessageBox.information(
+                self,
+                "Saving in progress",
+                "Wait for the data to be saved before closing.",
+            )
+            return False
+
         if self.data_saved or force:
             return super().close()
 
@@ -406,25 +850,32 @@ class MainWindow(QMainWindow):
         )
 
         if ret == save_btn:
+            # The window is closed once the data is saved
+            self.close_after_save = True
             self.save()
-            return self.close(True)
+            return False
         if ret == close_btn:
             return self.close(True)
 
         return False
 
-    def save(self):
-        """Save all the captured data to a file."""
-        self.do_cache()
+    @property
+    def save_in_progress(self) -> bool:
+        """Return `True` if a save is running in the background."""
+        return self.save_worker is not None or self.save_thread is not None
 
-        if self.x_data_vectors.size == 0:
-            QMessageBox.information(
-                self, "No Data", "There is no data to save.")
-            return
+    def ask_save_path(
+        self, title: str = "Save Data"
+    ) -> tuple[str, str] | None:
+        """
+        Ask where to save the data, with one of the `SAVE_FORMATS`.
 
+        Return the path, with its extension, and the selected format, or
+        `None` if the user cancelled the dialog.
+        """
         file_dialog = QFileDialog(self)
         file_dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
-        file_dialog.setWindowTitle("Save Data")
+        file_dialog.setWindowTitle(title)
 
         # Suggest initial directory (User's Documents or Home folder)
         docs_dir = os.path.join(os.path.expanduser("~"), "Documents")
@@ -435,102 +886,724 @@ class MainWindow(QMainWindow):
         default_filename = f"sparcs_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         file_dialog.selectFile(default_filename)
 
-        filters = [
-            # ( desc, extension, format)
-            ("MAT files", "mat", "mat"),
-            ("CSV files", "csv", "csv"),
-            ("Pandas Parquet files", "parquet", "parquet"),
-            ("Pandas Pickle files", "pkl", "pickle"),
-        ]
-
         file_dialog.setNameFilters(
-            [f'{f[0]} (*.{f[1]})' for f in filters]
+            [f'{f[0]} (*.{f[1]})' for f in SAVE_FORMATS]
         )
 
         # file_dialog.setDefaultSuffix("mat") # Default for typing name without extension
 
-        if file_dialog.exec():
-            selected_file_path = file_dialog.selectedFiles()[0]
-            selected_filter = file_dialog.selectedNameFilter()
+        if not file_dialog.exec():
+            # User cancelled the dialog
+            return None
 
-            try:
-                print(
-                    f"Saving data to {selected_file_path} with filter {selected_filter}")
-
-                extension = selected_file_path.split('.')[-1]
-                assert extension in [
-                    f[1] for f in filters], f"Extension not supported (.{extension})"
-
-                format_found = False
-                for filter_desc, filter_ext, filter_format in filters:
-                    if filter_desc in selected_filter:
-                        format_found = True
-                        # Add extension if not already present
-                        if not selected_file_path.endswith(filter_ext):
-                            selected_file_path += f'.{filter_ext}'
-
-                        if filter_ext == 'mat':
-                            save_as_mat(
-                                self.data_struct,
-                                self.x_data_vectors,
-                                self.y_data_vectors,
-                                mat_filename=selected_file_path,
-                            )
-                        else:
-                            save_as_pandas_dataframe(
-                                self.data_struct,
-                                self.x_data_vectors,
-                                self.y_data_vectors,
-                                filepath=selected_file_path,
-                                file_format=filter_format
-                            )
-
-                if not format_found:  # Should not happen with defined filters
-                    QMessageBox.warning(
-                        self,
-                        "Unknown Filter",
-                        "Selected file type filter is not recognized."
-                    )
-                    self.data_saved = False
-                    return
-
-                self.data_saved = True
-                QMessageBox.information(
-                    self, "Success", f"Data saved to {selected_file_path}")
-            except ImportError as e:
-                self.data_saved = False
-                QMessageBox.critical(
-                    self, "Error Saving File",
-                    f"Could not save file '{selected_file_path}':\n{type(e).__name__}: {e}"
+        selected_file_path = file_dialog.selectedFiles()[0]
+        selected_filter = file_dialog.selectedNameFilter()
+
+        for filter_desc, filter_ext, filter_format in SAVE_FORMATS:
+            if filter_desc in selected_filter:
+                # Add extension if not already present
+                if not selected_file_path.endswith(filter_ext):
+                    selected_file_path += f'.{filter_ext}'
+                return selected_file_path, filter_format
+
+        # Should not happen with defined filters
+        QMessageBox.warning(
+            self,
+            "Unknown Filter",
+            "Selected file type filter is not recognized."
+        )
+        return None
+
+    def get_save_function(
+        self, file_format: str, x_data, y_data, filepath: str
+    ) -> Callable:
+        """Return the function saving the data, with the window options."""
+        return get_save_function(
+            file_format,
+            self.data_struct,
+            x_data,
+            y_data,
+            filepath,
+            compression=self.export_compression.get(file_format),
+            row_group_size=self.export_row_group_size,
+            check_data=self.check_saved_files,
+        )
+
+    def save(self):
+        """Save all the captured data to a file."""
+        if self.save_in_progress:
+            return
+
+        if self.x_data_vectors.size == 0:
+            QMessageBox.information(
+                self, "No Data", "There is no data to save.")
+            self.close_after_save = False
+            return
+
+        selection = self.ask_save_path()
+        if selection is None:
+            print("Save operation cancelled by user.")
+            # self.data_saved status remains unchanged from before save attempt
+            self.close_after_save = False
+            return
+        selected_file_path, file_format = selection
+
+        # Snapshot of the data: the store only appends after the current
+        #   end, so these views are not modified while saving.
+        x_data = self.x_data_vectors
+        y_data = self.y_data_vectors
+
+        try:
+            print(
+                f"Saving data to {selected_file_path} as {file_format}")
+
+            save_fcn = self.get_save_function(
+                file_format, x_data, y_data, selected_file_path
+            )
+        except Exception as e:
+            self.on_save_failed(e, selected_file_path)
+            return
+
+        self.start_save_worker(save_fcn, selected_file_path, x_data.size)
+
+    def set_check_saved_files(self, checked: bool):
+        """Set whether the next saves and recordings are verified."""
+        self.check_saved_files = checked
+
+    def toggle_freeze(self):
+        """
+        Freeze the live plots, or make them follow the data again.
+
+        The data is still acquired while frozen, and on resume the plots
+        jump to the last time window.
+        """
+        self.display_frozen = not self.display_frozen
+
+        if self.display_frozen:
+            # Show the data up to now, in a copy that is not overwritten
+            if self.review_source is None:
+                self.update_axis(copy=True)
+            self.buttons_widget.buttons['Freeze'].setText('Resume')
+        else:
+            self.plot_dirty = True
+            self.buttons_widget.buttons['Freeze'].setText('Freeze')
+
+    def toggle_statistics(self):
+        """Show or hide the statistics panel."""
+        self.statistics_dock.setVisible(not self.statistics_dock.isVisible())
+        self.refresh_statistics()
+
+    def refresh_statistics(self):
+        """Show the statistics in the panel, if visible."""
+        if not self.statistics_dock.isVisible():
+            return
+
+        if self.statistics_panel.whole_session:
+            statistics = self.session_statistics
+        else:
+            statistics = self.window_statistics
+        self.statistics_panel.show_statistics(
+            statistics.stats, statistics.rates
+        )
+
+    def toggle_hud(self):
+        """Show or hide the overlay with the performance of the pipeline."""
+        if self.perf_hud.isVisible():
+            self.hud_timer.stop()
+            self.perf_hud.hide()
+            return
+
+        self.hud_sample = (perf_counter(), self.pipeline_counters.snapshot())
+        self.perf_hud.setText('Sampling...')
+        self.perf_hud.adjustSize()
+        self.perf_hud.show()
+        self.perf_hud.raise_()
+        self.hud_timer.start()
+
+    def refresh_hud(self):
+        """Show the rates of the pipeline since the last sample."""
+        t_now = perf_counter()
+        counters = self.pipeline_counters.snapshot()
+        t_last, last_counters = self.hud_sample
+        self.hud_sample = (t_now, counters)
+
+        self.perf_hud.show_rates(
+            PipelineRates.from_counters(
+                last_counters,
+                counters,
+                t_now - t_last,
+                self.rx_queue.qsize(),
+            )
+        )
+
+    def open_spectrum(self):
+        """
+        Show the live spectrum of the fields of a subplot.
+
+        The spectrum is estimated by a worker in its own thread, from the
+        data arriving after the view is opened.
+        """
+        names = [
+            sp.name or f'Subplot {sp_i}'
+            for sp_i, sp in enumerate(self.data_struct.subplots)
+        ]
+        name, ok = QInputDialog.getItem(
+            self, 'Spectrum', 'Subplot:', names, editable=False
+        )
+        if not ok:
+            return
+        sp_i = names.index(name)
+
+        if sp_i in self.spectrum_views:
+            self.spectrum_views[sp_i][0].activateWindow()
+            return
+
+        fields = self.data_struct.subplots[sp_i].fields
+        view = SpectrumView(name, [f.name for f in fields])
+        spectrum_thread = QThread()
+        spectrum_thread.setObjectName('Spectrum thread')
+        spectrum_worker = SpectrumWorker(sp_i, len(fields))
+
+        spectrum_thread.finished.connect(self.on_spectrum_thread_finished)
+
+        # The data goes from the dequeuing thread to the spectrum one, and
+        #   the estimate back to the GUI thread
+        self.rx_worker.got_new_data.connect(spectrum_worker.append)
+        spectrum_worker.updated.connect(view.show_spectrum)
+        view.closed.connect(partial(self.stop_spectrum, sp_i))
+
+        spectrum_worker.moveToThread(spectrum_thread)
+
+        self.spectrum_views[sp_i] = (view, spectrum_worker, spectrum_thread)
+
+        # The thread runs its event loop, waiting for the data
+        spectrum_thread.start()
+        view.resize(600, 400)
+        view.show()
+
+    def stop_spectrum(self, sp_i: int):
+        """Stop the spectrum of the subplot `sp_i`, whose view was closed."""
+        spectrum = self.spectrum_views.pop(sp_i)
+        _, spectrum_worker, spectrum_thread = spectrum
+
+        self.rx_worker.got_new_data.disconnect(spectrum_worker.append)
+        spectrum_thread.quit()
+        self.stopped_spectra.append(spectrum)
+
+    def close_spectra(self):
+        """Close all the spectrum views, stopping their workers."""
+        for view, _, _ in list(self.spectrum_views.values()):
+            view.close()
+
+    def on_spectrum_thread_finished(self):
+        """Release the stopped spectra whose thread is finished."""
+        # The signal is emitted just before the thread finishes, so a
+        #   spectrum may be released at the next one instead
+        self.stopped_spectra = [
+            spectrum
+            for spectrum in self.stopped_spectra
+            if not spectrum[2].isFinished()
+        ]
+
+    def toggle_trigger(self):
+        """Arm the trigger of the captures, or stop it."""
+        if self.trigger is not None:
+            self.stop_trigger()
+            return
+
+        # The buffer of the plots holds at least a time window
+        dialog = TriggerDialog(
+            get_session_column_names(self.data_struct)[1:],
+            self.time_window,
+            self.trigger_settings,
+            self,
+        )
+        if not dialog.exec():
+            return
+        self.start_trigger(dialog.settings)
+
+    def start_trigger(self, settings: TriggerSettings):
+        """Arm the trigger, showing its captures in a new window."""
+        if self.capture_view is not None:
+            self.capture_view.close()
+
+        self.trigger_settings = settings
+        self.trigger = Trigger(settings)
+
+        self.capture_view = CaptureView(self.data_struct, settings)
+        self.capture_view.closed.connect(self.stop_trigger)
+        self.capture_view.resize(800, 600)
+        self.capture_view.show()
+        self.buttons_widget.buttons['Trigger'].setText('Stop Trigger')
+
+    def update_trigger(self, columns: np_ndarray):
+        """
+        Look for the trigger in the new `columns`, showing the captures.
+
+        The captures are taken at full resolution from the plot buffer,
+        that already holds `columns`.
+        """
+        assert self.trigger is not None and self.capture_view is not None
+        settings = self.trigger.settings
+        for t_trigger in self.trigger.append(columns):
+            self.capture_view.add_capture(
+                extract_capture(
+                    self.plot_buffer.view(),
+                    t_trigger,
+                    settings.pre,
+                    settings.post,
                 )
-            except Exception as e:
-                self.data_saved = False
-                message_text = (
-                    f"Could not save file '{selected_file_path}':<br><br>"
-                    + "<span style='color:orange; font-weight:bold;'>Please"
-                    + ' <a href="https://github.com/sparcs-unipd/CLAB-datalogger-receiver/issues/new/choose">file an issue</a>'
-                    + 'on github with this message!</span><br><br>'
-                    + f" {type(e).__name__}: {e}")
+            )
+
+        if self.trigger.stopped:
+            self.stop_trigger()
+
+    def stop_trigger(self):
+        """Stop the trigger, keeping the captures shown."""
+        self.trigger = None
+        self.buttons_widget.buttons['Trigger'].setText('Trigger')
+
+    def toggle_recording(self):
+        """Start or stop recording the incoming data in segments."""
+        if self.save_in_progress:
+            return
+        if self.recorder is None:
+            self.start_recording()
+        else:
+            self.stop_recording()
+
+    def start_recording(self):
+        """
+        Start saving the incoming data in segment files.
+
+        A new segment is started every `self.segment_duration` seconds, or
+        when it would exceed `self.max_segment_bytes`.
+        """
+        selection = self.ask_save_path("Record Data")
+        if selection is None:
+            return
+        file_path, file_format = selection
+
+        assert self.session_store is not None
+        self.recorder = SegmentRecorder(
+            os.path.splitext(file_path)[0],
+            file_format,
+            self.data_struct,
+            segment_duration=self.segment_duration,
+            max_segment_bytes=self.max_segment_bytes,
+            save_options={
+                'compression': self.export_compression.get(file_format),
+                'row_group_size': self.export_row_group_size,
+                'check_data': self.check_saved_files,
+            },
+            start_index=len(self.session_store),
+        )
+        self.buttons_widget.buttons['Record'].setText('Stop Recording')
+
+    def update_recording(self):
+        """Save the completed segments, stopping if saving fails."""
+        assert self.recorder is not None
+        self.recorder.update(self.x_data_vectors, self.y_data_vectors)
+
+        # Stopped once the running save, if any, is over
+        if self.recorder.errors:
+            self.stop_recording()
+
+    def stop_recording(self):
+        """
+        Stop recording, saving the last segment in the background.
+
+        The segments still enqueued are waited for by a `SaveWorker`, so
+        the GUI is not blocked, and nothing is done if another save is
+        in progress.
+        """
+        if self.recorder is None or self.save_in_progress:
+            return
+        recorder = self.recorder
+        self.recorder = None
+
+        recorder.update(self.x_data_vectors, self.y_data_vectors, final=True)
+        self.buttons_widget.buttons['Record'].setText('Record')
+
+        self.start_save_worker(
+            recorder.finish,
+            get_manifest_path(recorder.base_path),
+            # Only a recording of the whole session saves all the data
+            recorder.next_start if recorder.start_index == 0 else None,
+            cancellable=False,
+        )
+
+    def start_save_worker(
+        self,
+        save_fcn: Callable,
+        filepath: str,
+        n_samples: int | None,
+        cancellable: bool = True,
+    ):
+        """
+        Run `save_fcn` on a worker thread, showing its progress.
+
+        `n_samples` is the number of samples in the saved snapshot,
+        used to know if new data arrived while saving, `None` if not all
+        the session is saved.
+        """
+        self.saved_samples = n_samples
+
+        progress_dialog = QProgressDialog(
+            f"Saving data to {filepath}...", "Cancel", 0, 1000, self
+        )
+        progress_dialog.setWindowTitle("Saving Data")
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.setValue(0)
+        if not cancellable:
+            progress_dialog.setCancelButton(None)
+        self.save_progress_dialog = progress_dialog
+
+        save_thread = QThread()
+        save_thread.setObjectName('Save thread')
+        save_worker = SaveWorker(save_fcn, filepath)
+
+        save_thread.started.connect(save_worker.run)
+        save_worker.finished.connect(save_thread.quit)
+        save_worker.finished.connect(save_worker.deleteLater)
+        save_thread.finished.connect(save_thread.deleteLater)
+
+        # Connected to methods of the window, so that they are queued
+        #   and run in the GUI thread.
+        save_worker.progress.connect(self.on_save_progress)
+        save_worker.saved.connect(self.on_saved)
+        save_worker.failed.connect(self.on_save_worker_failed)
+        save_worker.cancelled.connect(self.on_save_cancelled)
+        save_worker.finished.connect(self.on_save_finished)
+        save_thread.finished.connect(self.on_save_thread_finished)
+        # Called in the GUI thread, since the worker thread is busy saving
+        if cancellable:
+            progress_dialog.canceled.connect(
+                save_worker.cancel, Qt.ConnectionType.DirectConnection
+            )
+
+        save_worker.moveToThread(save_thread)
+
+        self.save_worker = save_worker
+        self.save_thread = save_thread
+
+        save_thread.start()
+
+    def on_save_progress(self, fraction: float):
+        """Show the progress of the save in progress."""
+        if self.save_progress_dialog is not None:
+            self.save_progress_dialog.setValue(int(fraction * 1000))
+
+    def on_saved(self, saved_path: str):
+        """Notify the user that the data was saved."""
+        # New data could have arrived while saving
+        if self.saved_samples is not None:
+            self.data_saved = self.x_data_vectors.size == self.saved_samples
+        QMessageBox.information(
+            self, "Success", f"Data saved to {saved_path}")
+
+    def on_save_cancelled(self):
+        """Abort the pending actions when the save is cancelled."""
+        print("Save operation cancelled by user.")
+        self.close_after_save = False
+
+    def on_save_worker_failed(self, e: Exception):
+        """Notify the user that the save worker failed."""
+        assert self.save_worker is not None
+        self.on_save_failed(e, self.save_worker.filepath)
+
+    def on_save_finished(self):
+        """Clean up after the save worker."""
+        if self.save_progress_dialog is not None:
+            self.save_progress_dialog.close()
+            self.save_progress_dialog = None
+
+        self.save_worker = None
+
+    def on_save_thread_finished(self):
+        """Release the save thread, closing the window if needed."""
+        # Keep the reference until here, since destroying a running QThread
+        #   aborts the application.
+        self.save_thread = None
+
+        if self.retired_session_store is not None:
+            self.retired_session_store.close()
+            self.retired_session_store = None
+
+        if self.close_after_save:
+            self.close_after_save = False
+            self.close(True)
+
+    def on_save_failed(self, e: Exception, selected_file_path: str):
+        """Notify the user that the data could not be saved."""
+        self.data_saved = False
+        self.close_after_save = False
+
+        if isinstance(e, SavedDataCorruptedError):
+            QMessageBox.critical(
+                self, "Saved File Corrupted",
+                f"The data saved to '{selected_file_path}' does not match "
+                f"the acquired one, in:\n{format_corrupted_ranges(e.corrupted)}"
+            )
+            return
+
+        if isinstance(e, ImportError):
+            QMessageBox.critical(
+                self, "Error Saving File",
+                f"Could not save file '{selected_file_path}':\n{type(e).__name__}: {e}"
+            )
+            return
+
+        message_text = (
+            f"Could not save file '{selected_file_path}':<br><br>"
+            + "<span style='color:orange; font-weight:bold;'>Please"
+            + ' <a href="https://github.com/sparcs-unipd/CLAB-datalogger-receiver/issues/new/choose">file an issue</a>'
+            + 'on github with this message!</span><br><br>'
+            + f" {type(e).__name__}: {e}")
+
+        QMessageBox.critical(
+            self,
+            "Error Saving File with new exception",
+            message_text
+        )
+
+    def open_session(self):
+        """Open a saved session, showing it in review mode."""
+        if self.serial_connection is not None:
+            QMessageBox.information(
+                self,
+                "Connected",
+                "Disconnect before opening a saved session.",
+            )
+            return
+
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Open Session",
+            os.path.expanduser("~"),
+            ';;'.join(
+                [f'{desc} (*.{ext})' for desc, ext in SESSION_FILE_FILTERS]
+                + ['All files (*)']
+            ),
+        )
+        if not file_path:
+            return
+
+        try:
+            source = open_session_source(file_path)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            QMessageBox.critical(
+                self,
+                "Error Opening File",
+                f"Could not open file '{file_path}':\n{type(e).__name__}: {e}",
+            )
+            return
+
+        self.enter_review_mode(source)
+
+    def review_history(self):
+        """Review the whole session acquired so far, while it goes on."""
+        assert self.session_store is not None
+        self.enter_review_mode(
+            LiveSessionSource(self.session_store, self.history)
+        )
+
+    def enter_review_mode(self, source: SessionSource):
+        """
+        Show `source` in place of the live plots.
+
+        Only the visible range is loaded, decimated to the plot width,
+        every time the view changes.
+        """
+        if self.review_source is not None:
+            self.review_source.close()
+        self.review_source = source
+
+        self.graph_widget.clear()
+        self.review_subplots = self.build_subplots(
+            source.data_struct, review=True
+        )
+
+        t_start, t_end = source.t_range
+        self.review_t_end = t_end
+        first_vb = self.review_subplots.axes[0].getViewBox()
+        first_vb.setLimits(xMin=t_start, xMax=max(t_end, t_start + 1e-9))
+        first_vb.setXRange(t_start, t_end, padding=0)
+        first_vb.sigXRangeChanged.connect(self.on_review_range_changed)
+
+        self.setWindowTitle(
+            f"SPARCS datalogger receiver - {os.path.basename(source.filepath)}"
+        )
+        self.buttons_widget.buttons['Back to Live'].setEnabled(True)
+
+        self.update_review_plots()
+
+    def on_review_range_changed(self, *_):
+        """Schedule the update of the reviewed session plots."""
+        self.review_timer.start()
+
+    def update_review_plots(self):
+        """Render the visible range of the reviewed session."""
+        if self.review_source is None:
+            return
+
+        first_vb = self.review_subplots.axes[0].getViewBox()
+        t_start, t_end = first_vb.viewRange()[0]
+        # Load also some data around the view, to pan without gaps.
+        #   A bucket is two points, so the view has one per two pixels.
+        margin = (t_end - t_start) / 2
+        n_buckets = max(100, int(first_vb.width()) // 2)
+
+        envelope = self.review_source.read_envelope(
+            t_start - margin, t_end + margin, 2 * n_buckets
+        )
+        x_data, y_data = split_columns(
+            self.review_source.data_struct, envelope
+        )
+
+        for ax_i, curves in enumerate(self.review_subplots.curves):
+            if not self.is_plot_on_screen(self.review_subplots.axes[ax_i]):
+                continue
+            for l_i, curve_i in enumerate(curves):
+                if curve_i.isVisible():
+                    curve_i.setData(x=x_data, y=y_data[ax_i][l_i])
+
+    def follow_live_review(self):
+        """
+        Extend the reviewed live session to the data arrived.
+
+        If the view reached the last data, it follows the new one, growing
+        if it also shows the first data, scrolling otherwise.
+        """
+        assert self.review_source is not None
+        t_start, t_end = self.review_source.t_range
+        first_vb = self.review_subplots.axes[0].getViewBox()
+        first_vb.setLimits(xMin=t_start, xMax=max(t_end, t_start + 1e-9))
+
+        view_start, view_end = first_vb.viewRange()[0]
+        if view_end >= self.review_t_end:
+            if view_start > t_start:
+                view_start += t_end - self.review_t_end
+            first_vb.setXRange(view_start, t_end, padding=0)
+        self.review_t_end = t_end
+
+        self.review_timer.start()
+
+    def exit_review_mode(self):
+        """Close the reviewed session, going back to the live plots."""
+        if self.review_source is None:
+            return
 
+        self.review_timer.stop()
+        self.review_source.close()
+        self.review_source = None
+
+        self.graph_widget.clear()
+        self.create_subplots()
+        self.update_axis(copy=self.display_frozen)
+        self.rx_worker.update_plot_structs(self.subplots_reference)
+
+        self.setWindowTitle("SPARCS datalogger receiver")
+        self.buttons_widget.buttons['Back to Live'].setEnabled(False)
+
+    def recover_unfinished_sessions(self):
+        """
+        Offer to recover the sessions that were not closed properly.
+
+        Each recovered session is written to a session file chosen by the
+        user, and the last one is then opened in review mode.
+        """
+        assert self.session_store is not None
+        sessions = find_unfinished_sessions(
+            get_sessions_folder(), exclude=[self.session_store.session_dir]
+        )
+        if not sessions:
+            return
+
+        recover_btn = QMessageBox.StandardButton.Yes
+        discard_btn = QMessageBox.StandardButton.Discard
+        later_btn = QMessageBox.StandardButton.Cancel
+        ret = QMessageBox.question(
+            self,
+            "Unfinished session found",
+            f"{len(sessions)} session(s) were not closed properly, "
+            "probably because of a crash.\n"
+            "Do you want to recover their data?",
+            recover_btn | discard_btn | later_btn,
+            recover_btn,
+        )
+        if ret == later_btn:
+            return
+
+        docs_dir = os.path.join(os.path.expanduser("~"), "Documents")
+        default_save_dir = docs_dir if os.path.isdir(
+            docs_dir) else os.path.expanduser("~")
+
+        recovered_path = None
+        for session_dir in sessions:
+            if ret == discard_btn:
+                discard_session(session_dir)
+                continue
+
+            default_filename = os.path.join(
+                default_save_dir,
+                f"recovered_{os.path.basename(session_dir)}.clabs",
+            )
+            file_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Save Recovered Session",
+                default_filename,
+                "CLAB session files (*.clabs)",
+            )
+            if not file_path:
+                # Keep the journal, to ask again on the next start
+                continue
+
+            try:
+                n_samples = recover_journal(
+                    os.path.join(session_dir, JOURNAL_FILENAME), file_path
+                )
+            except Exception as e:  # pylint: disable=broad-exception-caught
                 QMessageBox.critical(
                     self,
-                    "Error Saving File with new exception",
-                    message_text
+                    "Error Recovering Session",
+                    f"Could not recover session '{session_dir}':\n"
+                    f"{type(e).__name__}: {e}",
                 )
-        else:
-            # User cancelled the dialog
-            print("Save operation cancelled by user.")
-            # self.data_saved status remains unchanged from before save attempt
+                continue
+
+            print(f'Recovered {n_samples} samples to {file_path}')
+            discard_session(session_dir)
+            recovered_path = file_path
+
+        if recovered_path is not None and self.serial_connection is None:
+            self.enter_review_mode(open_session_source(recovered_path))
 
     def open_struct_editor(self):
+        if self.save_in_progress:
+            return
         yaml_path = "struct_cfg.yaml"  # FIXME: Make this configurable or use a default path
         dlg = StructConfigEditor(yaml_path, self)
         dlg.yaml_saved.connect(self.on_struct_yaml_saved)  # Connect signal
         dlg.exec()
 
     def on_struct_yaml_saved(self):
-        # Reload YAML and update UI
-        self.data_struct = PlottingStruct.from_yaml_file("struct_cfg.yaml")
+        # Read before changing anything, in case it fails
+        data_struct = PlottingStruct.from_yaml_file("struct_cfg.yaml")
+
+        self.exit_review_mode()
+        self.stop_recording()
+        # The spectra and the captures are of the fields of the old subplots
+        self.close_spectra()
+        if self.capture_view is not None:
+            self.capture_view.close()
+        self.trigger_settings = None
+
+        # Update UI with the reloaded YAML
+        self.data_struct = data_struct
         self.init_data_cache()
         self.init_data_vectors()
 
@@ -541,6 +1614,9 @@ class MainWindow(QMainWindow):
 
         self.create_subplots()  # Re-creates plots and updates self.subplots_reference
         self.update_axis()
+        self.statistics_panel.set_channels(
+            get_session_column_names(self.data_struct)[1:]
+        )
         self.rx_worker.update_plot_structs(self.subplots_reference)
 
 
@@ -548,6 +1624,7 @@ def get_app_and_window(
     data_struct,
     time_window=10,
     sys_argv=None,
+    fps=PLOT_FPS,
 ):
     """
     Create the QApplication and QMainWindow for the application.
@@ -558,6 +1635,6 @@ def get_app_and_window(
         app = QApplication(sys_argv)
     else:
         app = QApplication()
-    window = MainWindow(data_struct, time_window, app)
+    window = MainWindow(data_struct, time_window, app, fps=fps)
 
     return app, window
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import os
+import re
 import struct
 import sys
 from dataclasses import dataclass
@@ -55,6 +56,10 @@ types_dict = {
 
 template_file_path: str = 'templates/struct_cfg_template.yaml'
 
+# Values made only of words, like `float` or `unsigned long long`, are
+#   taken as types, unless they use the name of a field
+_TYPE_NAME_REGEX = re.compile(r'[A-Za-z_]\w*( +[A-Za-z_]\w*)*')
+
 
 @dataclass
 class StructField:
@@ -62,10 +67,18 @@ class StructField:
     Basic class to keep the type of a single field.
 
     This can be or not be named.
+    A derived field is not received, but computed from the other fields
+    with its `expression`, see the `derived_channels` module.
     """
 
     data_type: str
     name: str | None = None
+    expression: str | None = None
+
+    @property
+    def derived(self) -> bool:
+        """Return whether the field is computed from the other ones."""
+        return self.expression is not None
 
 
 @dataclass
@@ -89,16 +102,39 @@ class DataStruct:
         data_dict: Dict[str, str],
         name: str | None = None,
     ):
-        """Build the class from a dict of field names and types."""
-        for field_type in data_dict.values():
-            assert field_type in types_dict, (
-                f'Type "{field_type}"' 'not supported'
-            )
+        """
+        Build the class from a dict of field names and types.
 
-        fields = [
-            StructField(data_type=types_dict[field_type], name=field_name)
-            for field_name, field_type in data_dict.items()
-        ]
+        A value that is not a type is the expression of a derived field,
+        like `sqrt(a_x**2 + a_y**2)`.
+        A `ValueError` is raised for the values that look like a type, but
+        are not one, like `flaot`.
+        """
+        fields = []
+        for field_name, field_type in data_dict.items():
+            if (
+                field_type not in types_dict
+                and _TYPE_NAME_REGEX.fullmatch(str(field_type))
+                and not set(str(field_type).split()) & data_dict.keys()
+            ):
+                raise ValueError(
+                    f'Unknown type "{field_type}" of field "{field_name}"'
+                )
+
+            if field_type in types_dict:
+                fields.append(
+                    StructField(
+                        data_type=types_dict[field_type], name=field_name
+                    )
+                )
+            else:
+                fields.append(
+                    StructField(
+                        data_type='d',
+                        name=field_name,
+                        expression=str(field_type),
+                    )
+                )
 
         return cls(fields, name=name)
 
@@ -148,7 +184,9 @@ class DataStruct:
 
         This format is compliant with the `struct.unwrap` method
         """
-        return ''.join([types_dict[f.data_type] for f in self.fields])
+        return ''.join(
+            [types_dict[f.data_type] for f in self.fields if not f.derived]
+        )
 
     @property
     def struct_byte_size(self) -> int:
@@ -192,6 +230,16 @@ class PlottingStruct:
         with open(filename, 'rt', encoding='utf-8') as file:
             data_s = load_yaml(file)
 
+        return cls.from_config_list(data_s)
+
+    @classmethod
+    def from_config_list(cls, data_s: List[Dict[str, Dict[str, str]]]):
+        """
+        Create class from the parsed configuration.
+
+        The configuration is a list of single key dicts, mapping the name of
+        the subplot to its fields, as in the yaml configuration file.
+        """
         assert len(data_s) > 0, 'No data in file'
         # assert len(data_s) == 1, 'More than one plot is not yet supported'
 
@@ -220,6 +268,21 @@ class PlottingStruct:
             [DataStruct.from_data_string(p_s) for p_s in packets_strings]
         )
 
+    def to_config_list(self) -> List[Dict[str, Dict[str, str]]]:
+        """Return the configuration, as accepted by `from_config_list`."""
+        config = []
+        for idx, sp in enumerate(self.subplots):
+            name = sp.name if sp.name is not None else f'data_struct_{idx}'
+            fields = {
+                f.name if f.name is not None else f'field_{f_i}': (
+                    f.expression if f.derived else f.data_type
+                )
+                for f_i, f in enumerate(sp.fields)
+            }
+            config.append({name: fields})
+
+        return config
+
     def __getitem__(self, index: int):
         """Get the i-th subplot."""
         return self.subplots[index]
@@ -256,7 +319,8 @@ class PlottingStruct:
             result += ":\n"
             for j, field in enumerate(subplot.fields):
                 field_name = field.name if field.name else f"field_{j}"
-                result += f"    {field_name}: {field.data_type}\n"
+                field_type = field.expression or field.data_type
+                result += f"    {field_name}: {field_type}\n"
         return result
 
 
@@ -0,0 +1,96 @@
+"""
+Module that implements the ring buffer holding the plotted data.
+
+The buffer is preallocated, so appending a batch costs only the copy of
+the batch, and the last samples are always available as contiguous views,
+that can be given to pyqtgraph without copying them.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Ring buffer of `n_rows` channels, holding the last `capacity` samples.
+
+    The data is stored in a `(n_rows, 2 * capacity)` array, and every
+    sample is written twice, at its position and `capacity` after it.
+    This way the last `n` samples are always a contiguous slice of each
+    row, and a view of them is not overwritten until other
+    `capacity - n` samples are appended.
+    """
+
+    n_rows: int
+    capacity: int
+    size: int
+
+    _buffer: np.ndarray
+    # Position of the next sample to write, in `[0, capacity)`
+    _pos: int
+
+    def __init__(self, n_rows: int, capacity: int, dtype=np.float64) -> None:
+        """Allocate the buffer."""
+        self.n_rows = n_rows
+        self.capacity = max(1, capacity)
+        self.size = 0
+
+        self._buffer = np.empty((n_rows, 2 * self.capacity), dtype=dtype)
+        self._pos = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return self.size
+
+    def _write(self, start: int, data: np.ndarray) -> None:
+        """Write `data` from position `start`, and its copy."""
+        end = start + data.shape[1]
+        self._buffer[:, start:end] = data
+        self._buffer[:, start + self.capacity : end + self.capacity] = data
+
+    def append(self, data: np.ndarray) -> None:
+        """
+        Append `data`, a `(n_rows, n)` array, dropping the oldest samples.
+
+        If `n` is more than the capacity, only the last samples are kept.
+        """
+        data = data[:, -self.capacity :]
+        n_new = data.shape[1]
+
+        first = min(n_new, self.capacity - self._pos)
+        self._write(self._pos, data[:, :first])
+        if first < n_new:
+            self._write(0, data[:, first:])
+
+        self._pos = (self._pos + n_new) % self.capacity
+        self.size = min(self.size + n_new, self.capacity)
+
+    def view(self, n_samples: int | None = None) -> np.ndarray:
+        """
+        Return the last `n_samples` samples (all if `None`), without copy.
+
+        The result is a `(n_rows, n_samples)` view, with contiguous rows.
+        """
+        if n_samples is None or n_samples > self.size:
+            n_samples = self.size
+
+        end = self._pos + self.capacity
+        return self._buffer[:, end - n_samples : end]
+
+    def resize(self, capacity: int) -> None:
+        """Change the capacity, keeping the last samples that fit."""
+        data = self.view(min(self.size, capacity)).copy()
+
+        self.capacity = max(1, capacity)
+        self._buffer = np.empty(
+            (self.n_rows, 2 * self.capacity), dtype=self._buffer.dtype
+        )
+        self._pos = 0
+        self.size = 0
+        self.append(data)
+
+    def clear(self) -> None:
+        """Drop all the samples, keeping the allocated buffer."""
+        self._pos = 0
+        self.size = 0
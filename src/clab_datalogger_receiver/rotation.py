@@ -0,0 +1,363 @@
+"""
+Module that implements the rotation of the saved data in segment files.
+
+For long acquisitions the data is split in segments of bounded duration
+and size, each one saved to its own file, named `<base>_<index>.<ext>`,
+with the save functions of the `saver` module.
+Segments are split at sample indices, so that every sample is saved in
+exactly one segment, and the duration boundaries are aligned to the time
+of the first sample.
+
+A manifest, `<base>.manifest.json`, lists the segments with their time
+ranges, so that the segment holding a given time can be found without
+opening them.
+"""
+from __future__ import annotations
+
+import json
+import os
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from .received_structure import PlottingStruct
+from .saver import (
+    SAVE_FORMATS,
+    ProgressCallback,
+    get_save_function,
+    report_progress,
+)
+from .session_format import get_session_column_names, slice_data
+
+MANIFEST_SUFFIX: str = '.manifest.json'
+MANIFEST_VERSION: int = 1
+
+# Bytes of a saved value, used to turn the size limit in rows.
+# They are upper bounds for the binary formats, since they can only be
+#   smaller when compressed, and an estimate for the text ones.
+BYTES_PER_VALUE: dict[str, int] = {'csv': 24}
+DEFAULT_BYTES_PER_VALUE: int = 8
+
+
+def get_format_extension(file_format: str) -> str:
+    """Return the file extension used for `file_format`."""
+    for _, extension, save_format in SAVE_FORMATS:
+        if save_format == file_format:
+            return extension
+
+    raise ValueError(f'Unsupported file format: {file_format}')
+
+
+def get_segment_path(base_path: str, file_format: str, index: int) -> str:
+    """Return the path of the segment `index`."""
+    return f'{base_path}_{index:04d}.{get_format_extension(file_format)}'
+
+
+def get_manifest_path(base_path: str) -> str:
+    """Return the path of the manifest of the segments."""
+    return base_path + MANIFEST_SUFFIX
+
+
+def get_segment_max_rows(
+    file_format: str, n_columns: int, max_segment_bytes: int
+) -> int:
+    """Return the rows that fit in `max_segment_bytes` for `file_format`."""
+    bytes_per_row = n_columns * BYTES_PER_VALUE.get(
+        file_format, DEFAULT_BYTES_PER_VALUE
+    )
+    return max(1, max_segment_bytes // bytes_per_row)
+
+
+def find_segment_end(
+    x_data: np.ndarray,
+    start: int,
+    t_origin: float,
+    segment_duration: float | None,
+    max_rows: int | None,
+    final: bool = False,
+) -> int | None:
+    """
+    Return the end index of the segment starting at `start`.
+
+    A segment ends at the first sample after its duration boundary, or
+    after `max_rows` samples, whichever comes first.
+    If neither is reached yet, the segment is not complete and `None` is
+    returned, unless `final` is `True`, meaning that no more data will
+    arrive.
+    """
+    n_samples = len(x_data)
+    if start >= n_samples:
+        return None
+
+    ends = []
+    if max_rows is not None and start + max_rows <= n_samples:
+        ends.append(start + max_rows)
+
+    if segment_duration is not None:
+        boundary = t_origin + segment_duration * (
+            np.floor((x_data[start] - t_origin) / segment_duration) + 1
+        )
+        boundary_idx = start + int(
+            np.searchsorted(x_data[start:], boundary, side='left')
+        )
+        if boundary_idx < n_samples:
+            ends.append(boundary_idx)
+
+    if ends:
+        return min(ends)
+    return n_samples if final else None
+
+
+def split_segments(
+    x_data: np.ndarray,
+    segment_duration: float | None,
+    max_rows: int | None,
+) -> list[tuple[int, int]]:
+    """Return the `(start, end)` indices of the segments of `x_data`."""
+    bounds = []
+    start = 0
+    while start < len(x_data):
+        end = find_segment_end(
+            x_data, start, x_data[0], segment_duration, max_rows, final=True
+        )
+        assert end is not None
+        bounds.append((start, end))
+        start = end
+
+    return bounds
+
+
+def read_manifest(base_path: str) -> dict:
+    """Read the manifest of the segments saved with `base_path`."""
+    with open(get_manifest_path(base_path), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def find_segments(manifest: dict, t_start: float, t_end: float) -> list[dict]:
+    """Return the segments of `manifest` overlapping `[t_start, t_end]`."""
+    return [
+        segment
+        for segment in manifest['segments']
+        if segment['t_end'] >= t_start and segment['t_start'] <= t_end
+    ]
+
+
+class SegmentRecorder:
+    """
+    Save a growing session in segments, as soon as they are complete.
+
+    The segments are saved in order by a background thread, so `update()`
+    only finds the completed segments and enqueues them.
+    The data given to `update()` must be views that are not modified
+    afterwards, like the ones of the session store.
+    """
+
+    base_path: str
+    file_format: str
+    data_struct: PlottingStruct
+    segment_duration: float | None
+    max_rows: int | None
+    save_options: dict
+
+    # Index of the first sample saved, and of the first not yet enqueued
+    start_index: int
+    next_start: int
+    t_origin: float | None
+
+    segments: list[dict]
+    errors: list[Exception]
+    # Saves of the enqueued segments, in order
+    _futures: list[Future]
+
+    def __init__(
+        self,
+        base_path: str,
+        file_format: str,
+        data_struct: PlottingStruct,
+        segment_duration: float | None = None,
+        max_segment_bytes: int | None = None,
+        save_options: dict | None = None,
+        start_index: int = 0,
+    ) -> None:
+        """
+        Prepare the recording, writing an empty manifest.
+
+        `save_options` are forwarded to `get_save_function`, and
+        `start_index` is the first sample of the session to save.
+        """
+        assert (
+            segment_duration is not None or max_segment_bytes is not None
+        ), 'Set a segment duration or size'
+
+        self.base_path = base_path
+        self.file_format = file_format
+        self.data_struct = data_struct
+        self.segment_duration = segment_duration
+        self.save_options = save_options or {}
+
+        self.max_rows = None
+        if max_segment_bytes is not None:
+            self.max_rows = get_segment_max_rows(
+                file_format,
+                len(get_session_column_names(data_struct)),
+                max_segment_bytes,
+            )
+
+        self.start_index = start_index
+        self.next_start = start_index
+        self.t_origin = None
+        self.segments = []
+        self.errors = []
+        self._futures = []
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='Segments saver'
+        )
+
+        self.write_manifest(complete=False)
+
+    def write_manifest(self, complete: bool) -> None:
+        """Write the manifest, replacing the previous one atomically."""
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'format': self.file_format,
+            'columns': get_session_column_names(self.data_struct),
+            'schema': self.data_struct.to_config_list(),
+            'complete': complete,
+            'segments': self.segments,
+        }
+
+        path = get_manifest_path(self.base_path)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def save_segment(self, index: int, x_data, y_data) -> None:
+        """Save a segment, adding it to the manifest."""
+        filepath = get_segment_path(self.base_path, self.file_format, index)
+
+        try:
+            get_save_function(
+                self.file_format,
+                self.data_struct,
+                x_data,
+                y_data,
+                filepath,
+                **self.save_options,
+            )()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f'Could not save segment {filepath}: {e}')
+            self.errors.append(e)
+            return
+
+        self.segments.append(
+            {
+                'index': index,
+                'file': os.path.basename(filepath),
+                't_start': float(x_data[0]),
+                't_end': float(x_data[-1]),
+                'n_rows': len(x_data),
+            }
+        )
+        self.write_manifest(complete=False)
+
+    def update(self, x_data, y_data, final: bool = False) -> int:
+        """
+        Enqueue the segments completed in the session data.
+
+        If `final` is `True` the last segment is enqueued even if not
+        complete. Return the number of segments enqueued.
+        """
+        n_enqueued = 0
+        while True:
+            if self.t_origin is None and self.next_start < len(x_data):
+                self.t_origin = float(x_data[self.next_start])
+
+            end = find_segment_end(
+                x_data,
+                self.next_start,
+                self.t_origin or 0,
+                self.segment_duration,
+                self.max_rows,
+                final,
+            )
+            if end is None:
+                return n_enqueued
+
+            start, self.next_start = self.next_start, end
+            self._futures.append(
+                self._executor.submit(
+                    self.save_segment,
+                    len(self._futures),
+                    x_data[start:end],
+                    slice_data(y_data, start, end),
+                )
+            )
+            n_enqueued += 1
+
+    def finish(self, progress: ProgressCallback | None = None) -> None:
+        """
+        Wait for the enqueued segments to be saved, like `close()`.
+
+        `progress` is called as the segments are saved, so this can run
+        in a `SaveWorker`. Raise the first error occurred while saving.
+        """
+        for i, future in enumerate(self._futures):
+            future.result()
+            report_progress(progress, (i + 1) / len(self._futures))
+
+        if self.close():
+            raise self.errors[0]
+
+    def close(self) -> list[Exception]:
+        """
+        Wait for the enqueued segments to be saved.
+
+        Call `update()` with `final=True` before, to save also the data
+        of the last segment. Return the errors occurred while saving.
+        """
+        self._executor.shutdown(wait=True)
+        self.write_manifest(complete=True)
+        return self.errors
+
+
+def save_segmented(
+    data_struct: PlottingStruct,
+    x_data,
+    y_data,
+    base_path: str,
+    file_format: str,
+    segment_duration: float | None = None,
+    max_segment_bytes: int | None = None,
+    save_options: dict | None = None,
+    progress: Callable[[float], None] | None = None,
+) -> list[dict]:
+    """
+    Save the data in segments, like `SegmentRecorder`, but in this thread.
+
+    Return the segments listed in the manifest.
+    """
+    recorder = SegmentRecorder(
+        base_path,
+        file_format,
+        data_struct,
+        segment_duration,
+        max_segment_bytes,
+        save_options,
+    )
+
+    bounds = split_segments(x_data, segment_duration, recorder.max_rows)
+    for index, (start, end) in enumerate(bounds):
+        recorder.save_segment(
+            index,
+            x_data[start:end],
+            slice_data(y_data, start, end),
+        )
+        if recorder.errors:
+            raise recorder.errors[0]
+        report_progress(progress, (index + 1) / len(bounds))
+
+    recorder.close()
+    return recorder.segments
@@ -6,16 +6,136 @@ Author:
 
 """
 
+import json
 import sys
+from datetime import datetime
+from functools import partial
+from typing import Callable
+
 from scipy.io import savemat, loadmat
 import pandas as pd
 import numpy
 
+from .checksums import (
+    CorruptedRange,
+    checksum,
+    checksum_index,
+    chunk_entry,
+    compare_channels,
+    padded_rows,
+    raise_if_corrupted,
+    verify_chunks,
+)
+from .session_format import (
+    SESSION_CHUNK_ROWS,
+    SessionReader,
+    SessionWriter,
+    columns_from_data,
+    get_session_column_names,
+    slice_data,
+)
 from .simple_console_main_classes import ClabDataLoggerReceiver
 
+# Number of rows written at once by the chunked writers
+CSV_CHUNK_ROWS: int = 100_000
+
+# Key of the Arrow schema metadata holding the `PlottingStruct` configuration
+ARROW_SCHEMA_METADATA_KEY: str = 'clab_schema'
+# Key of the Arrow schema metadata (and name of the MAT v7.3 attribute)
+#   holding the checksums of the data, used to verify the file
+CHECKSUMS_METADATA_KEY: str = 'clab_checksums'
+
+# Rows hashed together when comparing the data of a MAT v5 file
+CHECK_CHUNK_ROWS: int = 1 << 16
+
+# Default options of the Arrow based writers
+PARQUET_COMPRESSION: str = 'zstd'
+PARQUET_ROW_GROUP_SIZE: int = 1 << 20
+FEATHER_COMPRESSION: str = 'lz4'
+
+# Default options of the MAT v7.3 (HDF5) writer
+MAT73_CHUNK_ROWS: int = 1 << 18
+MAT73_COMPRESSION_LEVEL: int | None = 4
+# The MAT v7.3 header lives in the userblock of the HDF5 file
+MAT73_USERBLOCK_SIZE: int = 512
+
+# Formats the data can be saved to, as (description, extension, format)
+SAVE_FORMATS: list[tuple[str, str, str]] = [
+    ('CLAB session files', 'clabs', 'session'),
+    ('MAT files', 'mat', 'mat'),
+    ('MAT v7.3 files, for large sessions', 'mat', 'mat73'),
+    ('CSV files', 'csv', 'csv'),
+    ('Parquet files', 'parquet', 'parquet'),
+    ('Arrow IPC/Feather files', 'feather', 'feather'),
+    ('Pandas Pickle files', 'pkl', 'pickle'),
+]
+
+ProgressCallback = Callable[[float], None]
+
+
+class SaveCancelledError(Exception):
+    """
+    Raised to interrupt a save in progress.
+
+    It is meant to be raised by the `progress` callback given to the save
+    functions.
+    """
+
+
+def report_progress(progress: ProgressCallback | None, fraction: float):
+    """Call `progress` with the completed fraction, if given."""
+    if progress is not None:
+        progress(fraction)
+
+
+def scaled_progress(
+    progress: ProgressCallback | None, start: float, end: float
+) -> ProgressCallback | None:
+    """Return a callback reporting to `progress` in `[start, end]`."""
+    if progress is None:
+        return None
+    return lambda fraction: progress(start + (end - start) * fraction)
+
+
+def compare_mat_data(test_data, loaded_data) -> list[CorruptedRange]:
+    """
+    Compare the dict saved to a MAT v5 file with the one loaded back.
+
+    The data is compared one chunk of `CHECK_CHUNK_ROWS` samples at a time.
+    Return the ranges of the channels that are corrupted.
+    """
+    saved = test_data['turtlebot_data']
+    # `loadmat` returns the structs as (1, 1) record arrays
+    loaded = loaded_data['turtlebot_data'][0, 0]
+
+    times = numpy.ravel(saved['time'])
+    names = ['time']
+    expected = [times]
+    actual = [numpy.ravel(loaded['time'])]
+
+    for name, field_names in saved['field_names'].items():
+        loaded_sp = numpy.atleast_2d(loaded[name])
+        for f_i, f_name in enumerate(field_names):
+            names.append(f'{name}.{f_name}')
+            expected.append(numpy.ravel(saved[name][f_i]))
+            actual.append(
+                loaded_sp[f_i] if f_i < len(loaded_sp) else numpy.array([])
+            )
+
+    return compare_channels(names, times, expected, actual, CHECK_CHUNK_ROWS)
+
 
 def check_saved_data(test_data, loaded_data) -> bool:
-    raise NotImplementedError
+    """
+    Return `True` if the data loaded from a MAT file is the one saved.
+
+    The corrupted channels and time ranges, if any, are printed.
+    """
+    corrupted = compare_mat_data(test_data, loaded_data)
+    for corrupted_range in corrupted:
+        print(f'Corrupted data in {corrupted_range}')
+
+    return not corrupted
 
 
 def save_data_clab_datalogger(
@@ -77,11 +197,20 @@ def save_as_mat(
     y_data,
     mat_filename: str = 'out_data.mat',
     check_data: bool = False,
+    progress: ProgressCallback | None = None,
 ):
+    """
+    Save the data as a MATLAB v5 `.mat` file.
+
+    `savemat` writes the whole file in one go, so only a coarse `progress`
+    is reported.
+    """
+    report_progress(progress, 0)
     file_dict = {'turtlebot_data': {'time': x_data, 'field_names': {}}}
 
     print('x_data:', x_data.shape)
     for idx, (sp, y_data) in enumerate(zip(data_struct.subplots, y_data)):
+        report_progress(progress, 0.1 * idx / len(data_struct.subplots))
         name = sp.name
 
         if name is None:
@@ -94,37 +223,58 @@ def save_as_mat(
         ]
     print('turtlebot_data:', file_dict['turtlebot_data'])
 
+    report_progress(progress, 0.1)
     savemat(mat_filename, mdict=file_dict)
+    report_progress(progress, 1)
 
     print('Data saved.')
 
     if check_data:
         print('Checking data...')
 
+        # MAT v5 files have no checksums, the whole file has to be loaded
         loaded_data = loadmat(mat_filename)
+        raise_if_corrupted(
+            mat_filename, compare_mat_data(file_dict, loaded_data)
+        )
+        print('Data is ok')
 
-        if check_saved_data(file_dict, loaded_data):
-            print('Data is ok')
-        else:
-            raise RuntimeError('The saved file is corrupted')
-        
 
-def prepare_dataframe_dict(data_struct, x_data, y_data) -> dict:
-    df_dict = {'time': x_data}
-    reference_length = len(x_data)
+def get_column_names(data_struct) -> list[str]:
+    """
+    Return the table column names of the fields in `data_struct`.
 
-    for i, subplot_struct in enumerate(data_struct.subplots):
+    The first column is always `time`, followed by the fields in order,
+    named as `<subplot>_<field>`.
+    """
+    col_names = ['time']
+
+    for subplot_struct in data_struct.subplots:
         subplot_prefix = subplot_struct.name.replace(" ", "_").replace("-", "_")
-        for j, field_struct in enumerate(subplot_struct.fields):
+        for field_struct in subplot_struct.fields:
             field_suffix = field_struct.name.replace(" ", "_").replace("-", "_")
             col_name = f"{subplot_prefix}_{field_suffix}"
-            
+
             k = 1
             base_col_name = col_name
-            while col_name in df_dict:  # Handle potential column name collisions
+            while col_name in col_names:  # Handle potential column name collisions
                 col_name = f"{base_col_name}_{k}"
                 k += 1
 
+            col_names.append(col_name)
+    return col_names
+
+
+def prepare_dataframe_dict(data_struct, x_data, y_data) -> dict:
+    df_dict = {'time': x_data}
+    reference_length = len(x_data)
+
+    col_names = iter(get_column_names(data_struct)[1:])
+
+    for i, subplot_struct in enumerate(data_struct.subplots):
+        for j, _ in enumerate(subplot_struct.fields):
+            col_name = next(col_names)
+
             signal_data = y_data[i][j]
             if len(signal_data) != reference_length:
                 print(f"Warning: Data length mismatch for column '{col_name}'. "
@@ -137,9 +287,72 @@ def prepare_dataframe_dict(data_struct, x_data, y_data) -> dict:
                 df_dict[col_name] = signal_data
     return df_dict
 
-def save_as_pandas_dataframe(data_struct, x_data, y_data, filepath: str, file_format: str = 'parquet'):
+
+def build_arrow_table(data_struct, x_data, y_data):
+    """
+    Build a `pyarrow.Table` wrapping the data vectors.
+
+    The contiguous numeric vectors (like the ones of the session store) are
+    wrapped without copying them.
+    Columns shorter than `x_data` are padded with nulls, instead of
+    allocating a NaN filled copy.
+    The `data_struct` configuration is stored in the schema metadata, so
+    that the subplots can be rebuilt when the file is opened.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+
+    # pylint: enable=import-outside-toplevel
+
+    reference_length = len(x_data)
+    col_names = get_column_names(data_struct)
+    columns = [pa.array(x_data)]
+
+    for y_sp in y_data:
+        for signal_data in y_sp:
+            col_name = col_names[len(columns)]
+            column = pa.array(signal_data[:reference_length])
+
+            if len(column) != reference_length:
+                print(f"Warning: Data length mismatch for column '{col_name}'. "
+                      f"Expected {reference_length}, got {len(signal_data)}. Padding with nulls.")
+                column = pa.chunked_array(
+                    [
+                        column,
+                        pa.nulls(reference_length - len(column), column.type),
+                    ]
+                )
+            columns.append(column)
+
+    return pa.Table.from_arrays(
+        columns,
+        names=col_names,
+        metadata={
+            ARROW_SCHEMA_METADATA_KEY: json.dumps(
+                data_struct.to_config_list()
+            )
+        },
+    )
+
+
+def save_as_pandas_dataframe(
+    data_struct,
+    x_data,
+    y_data,
+    filepath: str,
+    file_format: str = 'parquet',
+    progress: ProgressCallback | None = None,
+):
+    """
+    Save the data as a table, in one of the formats supported by pandas.
+
+    The csv is written in chunks of `CSV_CHUNK_ROWS` rows, reporting the
+    `progress` after each of them.
+    """
+    report_progress(progress, 0)
     df_dict = prepare_dataframe_dict(data_struct, x_data, y_data)
     df = pd.DataFrame(df_dict)
+    report_progress(progress, 0.1)
     if file_format == 'parquet':
         try:
             df.to_parquet(filepath, index=False, engine='pyarrow')
@@ -147,8 +360,596 @@ def save_as_pandas_dataframe(data_struct, x_data, y_data, filepath: str, file_fo
             print("Warning: pyarrow not installed. Trying with default engine for Parquet.")
             df.to_parquet(filepath, index=False)
     elif file_format == 'csv':
-        df.to_csv(filepath, index=False)
+        n_rows = len(df)
+        for start in range(0, n_rows, CSV_CHUNK_ROWS):
+            df.iloc[start : start + CSV_CHUNK_ROWS].to_csv(
+                filepath,
+                index=False,
+                header=start == 0,
+                mode='w' if start == 0 else 'a',
+            )
+            report_progress(
+                progress, 0.1 + 0.9 * min(1, (start + CSV_CHUNK_ROWS) / n_rows)
+            )
     elif file_format == 'pickle':
         df.to_pickle(filepath)
     else:
         raise ValueError(f"Unsupported file format: {file_format}. Supported formats are 'parquet', 'csv', and 'pickle'.")
+    report_progress(progress, 1)
+
+
+def save_as_arrow(
+    data_struct,
+    x_data,
+    y_data,
+    filepath: str,
+    file_format: str = 'parquet',
+    compression: str | None = None,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+    check_data: bool = False,
+    progress: ProgressCallback | None = None,
+):
+    """
+    Save the data as a Parquet or Arrow IPC (Feather v2) file via `pyarrow`.
+
+    The table is built directly on the data vectors, without the
+    intermediate copies of the pandas path, and it is written
+    `row_group_size` rows at a time, reporting the `progress` after each.
+
+    `compression` is the codec name understood by `pyarrow`
+    ('zstd', 'snappy', 'lz4', ..., or 'none'), and it defaults to
+    `PARQUET_COMPRESSION` and `FEATHER_COMPRESSION` respectively.
+
+    The checksums of each row group are computed as it is written, and
+    stored in the Parquet metadata once all of them are written, or with
+    each record batch of the Feather file. The file can be verified by
+    `verify_arrow_file`, that is done right after saving if `check_data`
+    is `True`.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    # pylint: enable=import-outside-toplevel
+
+    verify_progress = None
+    if check_data:
+        # Half of the progress is the verification
+        verify_progress = scaled_progress(progress, 0.5, 1)
+        progress = scaled_progress(progress, 0, 0.5)
+
+    report_progress(progress, 0)
+    table = build_arrow_table(data_struct, x_data, y_data)
+    names = get_session_column_names(data_struct)
+
+    if file_format == 'parquet':
+        if compression is None:
+            compression = PARQUET_COMPRESSION
+        writer = pq.ParquetWriter(
+            filepath, table.schema, compression=compression
+        )
+    elif file_format == 'feather':
+        if compression is None:
+            compression = FEATHER_COMPRESSION
+        # The entries of the chunks are stored with them, so this tells
+        #   the layout of the checksums
+        schema = table.schema.with_metadata(
+            {
+                **table.schema.metadata,
+                CHECKSUMS_METADATA_KEY: json.dumps(
+                    checksum_index(names, row_group_size, [])
+                ),
+            }
+        )
+        writer = pa_ipc.new_file(
+            filepath,
+            schema,
+            options=pa_ipc.IpcWriteOptions(
+                compression=None if compression == 'none' else compression
+            ),
+        )
+    else:
+        raise ValueError(
+            f"Unsupported file format: {file_format}. "
+            "Supported formats are 'parquet' and 'feather'."
+        )
+
+    n_rows = table.num_rows
+    chunks = []
+    with writer:
+        for start in range(0, n_rows, row_group_size):
+            # Combined, so that each row group is a single record batch
+            batch = (
+                table.slice(start, row_group_size)
+                .combine_chunks()
+                .to_batches()[0]
+            )
+            columns = [
+                column.to_numpy(zero_copy_only=False)
+                for column in batch.columns
+            ]
+            entry = chunk_entry(
+                columns[0], [checksum(column) for column in columns]
+            )
+
+            if file_format == 'parquet':
+                writer.write_batch(batch, row_group_size)
+                chunks.append(entry)
+            else:
+                writer.write_batch(
+                    batch,
+                    custom_metadata={
+                        CHECKSUMS_METADATA_KEY: json.dumps(entry)
+                    },
+                )
+            report_progress(progress, min(1, (start + row_group_size) / n_rows))
+
+        if file_format == 'parquet':
+            writer.add_key_value_metadata(
+                {
+                    CHECKSUMS_METADATA_KEY: json.dumps(
+                        checksum_index(names, row_group_size, chunks)
+                    )
+                }
+            )
+
+    report_progress(progress, 1)
+
+    if check_data:
+        raise_if_corrupted(
+            filepath, verify_arrow_file(filepath, progress=verify_progress)
+        )
+
+
+def verify_arrow_file(
+    filepath: str, progress: ProgressCallback | None = None
+) -> list[CorruptedRange]:
+    """
+    Check a Parquet or Feather file against the checksums it stores.
+
+    Each row group (or record batch) is read and hashed, one at a time.
+    Return the ranges of the columns that are corrupted.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    # pylint: enable=import-outside-toplevel
+
+    key = CHECKSUMS_METADATA_KEY.encode()
+
+    if filepath.endswith('.feather'):
+        reader = pa_ipc.open_file(filepath)
+        metadata = reader.schema.metadata or {}
+        names = reader.schema.names
+
+        def read_columns(chunk_idx: int) -> list:
+            batch, batch_metadata = reader.get_batch_with_custom_metadata(
+                chunk_idx
+            )
+            index['chunks'][chunk_idx] = json.loads(batch_metadata[key])
+            return batch.columns
+
+    else:
+        reader = pq.ParquetFile(filepath)
+        metadata = reader.metadata.metadata or {}
+        names = reader.schema_arrow.names
+
+        def read_columns(chunk_idx: int) -> list:
+            # Column by column, so that a damaged page (that cannot be
+            #   decompressed) only affects its column
+            columns = []
+            for name in names:
+                try:
+                    columns.append(
+                        reader.read_row_group(chunk_idx, columns=[name])
+                        .column(0)
+                    )
+                except Exception:  # pylint: disable=broad-exception-caught
+                    columns.append(None)
+            return columns
+
+    if key not in metadata:
+        raise ValueError(f'{filepath} has no checksums to verify')
+    index = json.loads(metadata[key])
+    if filepath.endswith('.feather'):
+        # Read with the record batches
+        index['chunks'] = [None] * reader.num_record_batches
+
+    def read_chunk(chunk_idx: int) -> list:
+        columns = read_columns(chunk_idx)
+        n_rows = index['chunks'][chunk_idx]['n_rows']
+        return [
+            None
+            if column is None or len(column) != n_rows
+            else column.to_numpy(zero_copy_only=False)
+            for column in columns
+        ]
+
+    return verify_chunks(index, read_chunk, progress)
+
+
+def _write_mat73_header(mat_filename: str):
+    """Write the MAT v7.3 header in the userblock of the HDF5 file."""
+    header = (
+        'MATLAB 7.3 MAT-file, Platform: CPython, '
+        f'Created on: {datetime.now().strftime("%a %b %d %H:%M:%S %Y")} '
+        'HDF5 schema 1.00 .'
+    ).encode('ascii')
+    # 116 bytes of text, 8 of subsystem data offset, version and endianness
+    header = header.ljust(116, b' ') + b'\x00' * 8 + b'\x00\x02' + b'IM'
+
+    with open(mat_filename, 'r+b') as file:
+        file.write(header)
+
+
+def _set_mat73_class(h5_obj, matlab_class: str):
+    """Set the attribute MATLAB uses to know the type of a variable."""
+    h5_obj.attrs['MATLAB_class'] = numpy.bytes_(matlab_class)
+
+
+def _create_mat73_char_matrix(group, name: str, strings: list[str]):
+    """Store `strings` as a char matrix, like `savemat` does."""
+    max_len = max((len(s) for s in strings), default=0)
+    chars = numpy.array(
+        [[ord(c) for c in s.ljust(max_len)] for s in strings],
+        dtype=numpy.uint16,
+    ).reshape(len(strings), max_len)
+
+    # MATLAB reads the HDF5 dimensions reversed
+    dset = group.create_dataset(name, data=chars.T)
+    _set_mat73_class(dset, 'char')
+    dset.attrs['MATLAB_int_decode'] = numpy.int32(2)
+
+
+def mat73_fields_order(group) -> list[str]:
+    """Return the fields of a MAT v7.3 struct, in the MATLAB order."""
+    if 'MATLAB_fields' not in group.attrs:
+        return list(group.keys())
+
+    return [
+        b''.join(field).decode('ascii')
+        for field in group.attrs['MATLAB_fields']
+    ]
+
+
+def save_as_mat_v73(
+    data_struct,
+    x_data,
+    y_data,
+    mat_filename: str = 'out_data.mat',
+    compression_level: int | None = MAT73_COMPRESSION_LEVEL,
+    chunk_rows: int = MAT73_CHUNK_ROWS,
+    check_data: bool = False,
+    progress: ProgressCallback | None = None,
+):
+    """
+    Save the data as a MATLAB v7.3 `.mat` file, that is an HDF5 file.
+
+    Differently from `save_as_mat`, there is no limit on the size of the
+    variables, and every channel is streamed to the file `chunk_rows`
+    samples at a time, so the data is never copied in memory as a whole.
+
+    The `turtlebot_data` struct has the same layout produced by
+    `save_as_mat`, and it can be loaded in MATLAB with `load`.
+    `compression_level` is the deflate level (0-9), or `None` to disable
+    the compression.
+
+    The checksums of the chunks, computed as they are written, are stored
+    in an attribute of the struct, that MATLAB ignores, so that the file
+    can be verified by
+    `verify_mat_v73`, that is done right after saving if `check_data` is
+    `True`.
+    """
+    # pylint: disable=import-outside-toplevel
+    import h5py
+
+    # pylint: enable=import-outside-toplevel
+
+    verify_progress = None
+    if check_data:
+        # Half of the progress is the verification
+        verify_progress = scaled_progress(progress, 0.5, 1)
+        progress = scaled_progress(progress, 0, 0.5)
+
+    report_progress(progress, 0)
+
+    n_samples = len(x_data)
+    chunk_rows = max(1, min(chunk_rows, n_samples))
+    compression_kwargs = {}
+    if compression_level is not None:
+        compression_kwargs = {
+            'compression': 'gzip',
+            'compression_opts': compression_level,
+        }
+
+    names = [
+        sp.name if sp.name is not None else f'data_struct_{idx}'
+        for idx, sp in enumerate(data_struct.subplots)
+    ]
+    # Number of channels, time included, used for the progress
+    n_channels = 1 + sum(len(sp) for sp in data_struct.subplots)
+    channels_done = 0
+    # Checksums of each chunk, by channel
+    chunks_crcs = [[] for _ in range(0, n_samples, chunk_rows)]
+
+    def write_channel(dset, column: int, data):
+        nonlocal channels_done
+        n_rows = min(len(data), n_samples)
+        for c_i, start in enumerate(range(0, n_samples, chunk_rows)):
+            end = min(start + chunk_rows, n_samples)
+            # Missing samples of shorter channels are left as NaN
+            rows = padded_rows(data, start, min(end, n_rows))
+            if len(rows) > 0:
+                dset[start : start + len(rows), column] = rows
+            chunks_crcs[c_i].append(checksum(padded_rows(rows, 0, end - start)))
+            report_progress(
+                progress, (channels_done + end / n_samples) / n_channels
+            )
+        channels_done += 1
+
+    with h5py.File(
+        mat_filename, 'w', userblock_size=MAT73_USERBLOCK_SIZE
+    ) as file:
+        group = file.create_group('turtlebot_data')
+        _set_mat73_class(group, 'struct')
+
+        # MATLAB reads the HDF5 dimensions reversed, so a (n, 1) dataset
+        #   is a row vector, as for `savemat`.
+        dset = group.create_dataset(
+            'time',
+            shape=(n_samples, 1),
+            dtype=numpy.float64,
+            chunks=(chunk_rows, 1),
+            **compression_kwargs,
+        )
+        _set_mat73_class(dset, 'double')
+        write_channel(dset, 0, x_data)
+
+        for name, y_sp in zip(names, y_data):
+            dset = group.create_dataset(
+                name,
+                shape=(n_samples, len(y_sp)),
+                dtype=numpy.float64,
+                chunks=(chunk_rows, 1),
+                fillvalue=numpy.nan,
+                **compression_kwargs,
+            )
+            _set_mat73_class(dset, 'double')
+            for column, y_f in enumerate(y_sp):
+                write_channel(dset, column, y_f)
+
+        field_names_group = group.create_group('field_names')
+        _set_mat73_class(field_names_group, 'struct')
+        for name, sp in zip(names, data_struct.subplots):
+            _create_mat73_char_matrix(
+                field_names_group, name, [f.name for f in sp.fields]
+            )
+
+        # Keep the fields in the same order of `save_as_mat`
+        for h5_group, fields in [
+            (group, ['time', 'field_names', *names]),
+            (field_names_group, names),
+        ]:
+            fields_attr = numpy.empty(len(fields), dtype=object)
+            for f_i, field in enumerate(fields):
+                fields_attr[f_i] = numpy.array(list(field), dtype='S1')
+
+            h5_group.attrs.create(
+                'MATLAB_fields',
+                data=fields_attr,
+                dtype=h5py.vlen_dtype(numpy.dtype('S1')),
+            )
+
+        group.attrs[CHECKSUMS_METADATA_KEY] = json.dumps(
+            checksum_index(
+                get_session_column_names(data_struct),
+                chunk_rows,
+                [
+                    chunk_entry(x_data[start : start + chunk_rows], crcs)
+                    for start, crcs in zip(
+                        range(0, n_samples, chunk_rows), chunks_crcs
+                    )
+                ],
+            )
+        )
+
+    _write_mat73_header(mat_filename)
+
+    report_progress(progress, 1)
+
+    if check_data:
+        raise_if_corrupted(
+            mat_filename, verify_mat_v73(mat_filename, progress=verify_progress)
+        )
+
+
+def verify_mat_v73(
+    mat_filename: str, progress: ProgressCallback | None = None
+) -> list[CorruptedRange]:
+    """
+    Check a MAT v7.3 file written by `save_as_mat_v73` against its checksums.
+
+    The channels are read back one chunk at a time.
+    Return the ranges of the channels that are corrupted.
+    """
+    # pylint: disable=import-outside-toplevel
+    import h5py
+
+    # pylint: enable=import-outside-toplevel
+
+    with h5py.File(mat_filename, 'r') as file:
+        group = file['turtlebot_data']
+        if CHECKSUMS_METADATA_KEY not in group.attrs:
+            raise ValueError(f'{mat_filename} has no checksums to verify')
+        index = json.loads(group.attrs[CHECKSUMS_METADATA_KEY])
+
+        # The columns of the index follow the order of the struct fields
+        datasets = [
+            group[name]
+            for name in mat73_fields_order(group)
+            if name != 'field_names'
+        ]
+        chunk_rows = index['chunk_rows']
+
+        def read_chunk(chunk_idx: int) -> list:
+            start = chunk_idx * chunk_rows
+            end = start + index['chunks'][chunk_idx]['n_rows']
+            return [
+                column
+                for dset in datasets
+                for column in dset[start:end].T
+            ]
+
+        return verify_chunks(index, read_chunk, progress)
+
+
+def save_as_session(
+    data_struct,
+    x_data,
+    y_data,
+    filepath: str,
+    chunk_rows: int = SESSION_CHUNK_ROWS,
+    check_data: bool = False,
+    progress: ProgressCallback | None = None,
+):
+    """
+    Save the data in the native chunked session format.
+
+    See the `session_format` module for the details of the format.
+    Each chunk is written directly from the data vectors, reporting the
+    `progress` after it.
+    If `check_data` is `True`, the file is then verified against the
+    checksums stored in its index.
+    """
+    verify_progress = None
+    if check_data:
+        # Half of the progress is the verification
+        verify_progress = scaled_progress(progress, 0.5, 1)
+        progress = scaled_progress(progress, 0, 0.5)
+
+    report_progress(progress, 0)
+
+    n_rows = len(x_data)
+    with SessionWriter(filepath, data_struct, chunk_rows=chunk_rows) as writer:
+        for start in range(0, n_rows, chunk_rows):
+            end = min(start + chunk_rows, n_rows)
+            writer.write_chunk(
+                columns_from_data(
+                    x_data[start:end],
+                    slice_data(y_data, start, end),
+                )
+            )
+            report_progress(progress, end / n_rows)
+
+    report_progress(progress, 1)
+
+    if check_data:
+        raise_if_corrupted(
+            filepath, verify_session_file(filepath, progress=verify_progress)
+        )
+
+
+def verify_session_file(
+    filepath: str, progress: ProgressCallback | None = None
+) -> list[CorruptedRange]:
+    """Check a session file against the checksums in its index."""
+    reader = SessionReader(filepath)
+    try:
+        return reader.verify(progress)
+    finally:
+        reader.close()
+
+
+def verify_saved_file(
+    filepath: str, progress: ProgressCallback | None = None
+) -> list[CorruptedRange]:
+    """
+    Check a file saved with checksums, streaming through it once.
+
+    Supported are the session, MAT v7.3, Parquet and Feather files.
+    Return the ranges of the channels that are corrupted.
+    """
+    extension = filepath.split('.')[-1]
+    if extension == 'clabs':
+        return verify_session_file(filepath, progress)
+    if extension == 'mat':
+        # pylint: disable-next=import-outside-toplevel
+        import h5py
+
+        if not h5py.is_hdf5(filepath):
+            raise ValueError('MAT v5 files have no checksums to verify')
+        return verify_mat_v73(filepath, progress)
+    if extension in ('parquet', 'feather'):
+        return verify_arrow_file(filepath, progress)
+
+    raise ValueError(f'Files .{extension} have no checksums to verify')
+
+
+def get_save_function(
+    file_format: str,
+    data_struct,
+    x_data,
+    y_data,
+    filepath: str,
+    compression: str | None = None,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+    check_data: bool = False,
+) -> Callable:
+    """
+    Return the function saving the data to `filepath` in `file_format`.
+
+    `file_format` is one of the formats of `SAVE_FORMATS`, and the options
+    are forwarded to the save functions supporting them.
+    The returned function only takes the `progress` argument.
+    """
+    if file_format == 'mat73':
+        return partial(
+            save_as_mat_v73,
+            data_struct,
+            x_data,
+            y_data,
+            mat_filename=filepath,
+            check_data=check_data,
+        )
+    if file_format == 'mat':
+        return partial(
+            save_as_mat,
+            data_struct,
+            x_data,
+            y_data,
+            mat_filename=filepath,
+            check_data=check_data,
+        )
+    if file_format == 'session':
+        return partial(
+            save_as_session,
+            data_struct,
+            x_data,
+            y_data,
+            filepath=filepath,
+            check_data=check_data,
+        )
+    if file_format in ('parquet', 'feather'):
+        return partial(
+            save_as_arrow,
+            data_struct,
+            x_data,
+            y_data,
+            filepath=filepath,
+            file_format=file_format,
+            compression=compression,
+            row_group_size=row_group_size,
+            check_data=check_data,
+        )
+    if file_format in ('csv', 'pickle'):
+        return partial(
+            save_as_pandas_dataframe,
+            data_struct,
+            x_data,
+            y_data,
+            filepath=filepath,
+            file_format=file_format,
+        )
+
+    raise ValueError(f'Unsupported file format: {file_format}')
@@ -19,12 +19,20 @@ from cobs import cobs
 from serial.threaded import Packetizer
 
 from .packets import TimedPacket, TimedPacketBase
+from ..perf_counters import PipelineCounters
 from ..received_structure import PlottingStruct
 
 
 class SerialThreadedRecv(Packetizer):
     """Threaded receiver class."""
 
+    # Counts the received and dropped packets
+    counters: PipelineCounters
+
+    def __init__(self, counters: PipelineCounters | None = None) -> None:
+        super().__init__()
+        self.counters = counters if counters is not None else PipelineCounters()
+
     def _validate_package(self, packet: bytes) -> Tuple[bool, bytes | None]:
         """
         Validate the packet given.
@@ -52,13 +60,17 @@ class SerialThreadedRecv(Packetizer):
         except ValueError as err:
             valid = False
             print(err)
+            self.counters.dropped_packets += 1
             return
 
         if not valid:
+            self.counters.dropped_packets += 1
             return
 
         assert data, '`data` is None even if it should not be as such'
 
+        self.counters.received_packets += 1
+
         self.handle_valid_data(data)
 
     def handle_valid_data(self, data: bytes):
@@ -116,11 +128,12 @@ class TurtlebotThreadedConnection(SerialThreadedRecvTx):
         packet_spec: PlottingStruct,
         rx_queue: Queue,
         packet_type: Type[TimedPacketBase] = TimedPacket,
-        t_0: float | datetime | None = None
+        t_0: float | datetime | None = None,
+        counters: PipelineCounters | None = None,
         # packet_type: Type[Packet] = DateTimedPacket
     ) -> None:
         """Init the class to communicate with the turtlebot."""
-        super().__init__()
+        super().__init__(counters)
 
         assert packet_spec, 'packet_spec is mandatory'
 
@@ -161,6 +174,9 @@ class TurtlebotThreadedConnection(SerialThreadedRecvTx):
 
     def handle_valid_data(self, data: bytes) -> None:
         """Overload `handle_valid_data` to put in the queue the parsed data."""
+        if self.queue.full():
+            # The reader blocks until the GUI dequeues
+            self.counters.queue_stalls += 1
         self.queue.put(self.parse_data(data))
 
     def parse_data(self, data: bytes):
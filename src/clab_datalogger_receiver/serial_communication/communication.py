@@ -25,6 +25,7 @@ from serial.threaded import ReaderThread
 from ._packetizers import TurtlebotThreadedConnection
 from ._utils import get_serial, get_serial_port_from_console_if_needed
 from .packets import TimedPacket, TimedPacketBase
+from ..perf_counters import PipelineCounters
 from ..received_structure import PlottingStruct
 
 
@@ -63,11 +64,13 @@ class TurtlebotReaderThread(UDPOrSerialReaderThread):
         rx_queue: Queue,
         t_0: float | datetime | None = None,
         packet_type: Type[TimedPacketBase] = TimedPacket,
+        counters: PipelineCounters | None = None,
     ) -> None:
         """
         Create a thread to connect to the turtlebot in a separate thread.
 
-        It uses the `TurtlebotThreadedConnection` as a base protocol
+        It uses the `TurtlebotThreadedConnection` as a base protocol, that
+        counts the received packets in `counters`, if given
         """
 
         self.packet_type = packet_type
@@ -78,6 +81,7 @@ class TurtlebotReaderThread(UDPOrSerialReaderThread):
                 rx_queue,
                 packet_type=packet_type,
                 t_0=t_0,
+                counters=counters,
             )
 
         super().__init__(connection_instance, __get_tbot_protocol)
@@ -114,6 +118,7 @@ class ManualPortTurtlebotSerialConnector:
         connection: UDPData | Serial,
         existing_queue: Queue | None,
         t_0: float | datetime | None = None,
+        counters: PipelineCounters | None = None,
     ) -> None:
         """Init the connection class to manage the connection to the STM."""
 
@@ -129,7 +134,11 @@ class ManualPortTurtlebotSerialConnector:
         self.t_0 = t_0
 
         self.__thread = TurtlebotReaderThread(
-            self.connection, self.__packet_spec, self.queue, t_0=self.t_0
+            self.connection,
+            self.__packet_spec,
+            self.queue,
+            t_0=self.t_0,
+            counters=counters,
         )
 
         self.__thread.name = 'Serial comm Thread'
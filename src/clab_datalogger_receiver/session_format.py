@@ -0,0 +1,487 @@
+"""
+Module that implements the native session file format.
+
+The file is columnar and chunked by time, so that a time range can be read
+without loading the whole session.
+Its layout is:
+
+- `FILE_MAGIC`, then the header: its byte length as `u32` and a JSON object
+    with the format version, the column names and the `PlottingStruct`
+    configuration.
+- The chunks, aligned to 8 bytes, each one made of `CHUNK_MAGIC`,
+    the number of rows and of columns as `u32`, 4 padding bytes, and then
+    the data as little endian `float64`, one column after the other
+    (time first).
+- The index: a JSON object listing the offset, the number of rows, and the
+    minimum, maximum and CRC32 checksum of each column of every chunk,
+    followed by its byte length as `u64` and `INDEX_MAGIC`.
+    The NaN samples are ignored by the minimum and the maximum, that are
+    `null` if a column of the chunk has only NaN samples.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+
+from typing import BinaryIO, Callable, Iterator
+
+import numpy as np
+
+from .checksums import CorruptedRange, checksum
+from .received_structure import PlottingStruct
+
+FILE_MAGIC: bytes = b'CLABSES\x01'
+CHUNK_MAGIC: bytes = b'CHNK'
+INDEX_MAGIC: bytes = b'CLABIDX\x01'
+
+FORMAT_VERSION: int = 1
+
+SESSION_DTYPE = np.dtype('<f8')
+
+# Rows written in each chunk, if not limited by its duration
+SESSION_CHUNK_ROWS: int = 1 << 16
+
+_U32 = struct.Struct('<I')
+_U64 = struct.Struct('<Q')
+# Padded, so that the data of the chunks (aligned to 8 bytes) is aligned
+_CHUNK_HEADER = struct.Struct('<4sII4x')
+_CHUNK_ALIGNMENT = 8
+
+
+def get_session_column_names(data_struct: PlottingStruct) -> list[str]:
+    """Return the column names, as `<subplot>.<field>` after `time`."""
+    names = ['time']
+    for sp_config in data_struct.to_config_list():
+        for sp_name, fields in sp_config.items():
+            names.extend(f'{sp_name}.{f_name}' for f_name in fields)
+
+    return names
+
+
+def columns_from_data(x_data, y_data) -> np.ndarray:
+    """Stack the data vectors in a `(n_columns, n_rows)` array."""
+    return np.vstack(
+        [x_data] + [y_f for y_sp in y_data for y_f in y_sp],
+        dtype=SESSION_DTYPE,
+    )
+
+
+def split_columns(
+    data_struct: PlottingStruct, columns: np.ndarray
+) -> tuple[np.ndarray, list[list[np.ndarray]]]:
+    """
+    Split a `(n_columns, n_rows)` array in the data vectors layout.
+
+    This is the same layout of the session store, the inverse of
+    `columns_from_data`.
+    Each subplot is a `(n_fields, n_rows)` view of `columns`, whose rows
+    are the data vectors of its fields.
+    """
+    y_data = []
+    col_i = 1
+    for sp in data_struct.subplots:
+        y_data.append(columns[col_i : col_i + len(sp)])
+        col_i += len(sp)
+
+    return columns[0], y_data
+
+
+def slice_data(y_data, start: int, end: int) -> list:
+    """
+    Return the samples `[start, end)` of the data vectors, without copy.
+
+    The subplots that are 2-D arrays are sliced at once, the ones that are
+    lists of data vectors one field at a time.
+    """
+    return [
+        (
+            y_sp[:, start:end]
+            if isinstance(y_sp, np.ndarray)
+            else [y_f[start:end] for y_f in y_sp]
+        )
+        for y_sp in y_data
+    ]
+
+
+def write_session_header(file: BinaryIO, data_struct: PlottingStruct) -> None:
+    """Write `FILE_MAGIC` and the header describing `data_struct`."""
+    header = json.dumps(
+        {
+            'version': FORMAT_VERSION,
+            'columns': get_session_column_names(data_struct),
+            'schema': data_struct.to_config_list(),
+        }
+    ).encode('utf-8')
+
+    file.write(FILE_MAGIC)
+    file.write(_U32.pack(len(header)))
+    file.write(header)
+
+
+def read_session_header(buffer, filepath: str = '') -> tuple[dict, int]:
+    """
+    Read the header at the start of `buffer`.
+
+    Return the header and the position of the first byte after it.
+    """
+    if bytes(buffer[: len(FILE_MAGIC)]) != FILE_MAGIC:
+        raise ValueError(f'{filepath} is not a session file')
+
+    pos = len(FILE_MAGIC)
+    if len(buffer) < pos + _U32.size:
+        raise ValueError(f'{filepath} has an incomplete header')
+    (header_len,) = _U32.unpack_from(buffer, pos)
+    pos += _U32.size
+    if len(buffer) < pos + header_len:
+        raise ValueError(f'{filepath} has an incomplete header')
+    header = json.loads(bytes(buffer[pos : pos + header_len]))
+
+    if header['version'] > FORMAT_VERSION:
+        raise ValueError(
+            f'Unsupported session file version {header["version"]}'
+        )
+
+    return header, pos + header_len
+
+
+def write_chunk_record(file: BinaryIO, columns: np.ndarray) -> int:
+    """
+    Write `columns`, a `(n_columns, n_rows)` array, as a chunk.
+
+    Return the offset of the chunk in the file.
+    """
+    padding = -file.tell() % _CHUNK_ALIGNMENT
+    file.write(b'\x00' * padding)
+
+    offset = file.tell()
+    file.write(_CHUNK_HEADER.pack(CHUNK_MAGIC, *columns.shape[::-1]))
+    file.write(np.ascontiguousarray(columns, dtype=SESSION_DTYPE).tobytes())
+
+    return offset
+
+
+def iter_chunk_records(buffer, pos: int) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    Yield the offset and the data of the chunks written from `pos` on.
+
+    The data is a view of `buffer`.
+    The iteration stops at the first incomplete or corrupted chunk, or at
+    the index, so that the chunks of a truncated file can be read.
+    """
+    while True:
+        pos += -pos % _CHUNK_ALIGNMENT
+        if len(buffer) < pos + _CHUNK_HEADER.size:
+            return
+
+        magic, n_rows, n_columns = _CHUNK_HEADER.unpack_from(buffer, pos)
+        start = pos + _CHUNK_HEADER.size
+        end = start + n_rows * n_columns * SESSION_DTYPE.itemsize
+        if magic != CHUNK_MAGIC or len(buffer) < end:
+            return
+
+        yield pos, (
+            np.frombuffer(buffer[start:end], dtype=SESSION_DTYPE).reshape(
+                n_columns, n_rows
+            )
+        )
+        pos = end
+
+
+def _json_floats(values: np.ndarray) -> list[float | None]:
+    """Return `values` as a list, with `None` (JSON `null`) for NaN."""
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+class SessionWriter:
+    """
+    Write a session file, chunk by chunk.
+
+    Data appended is buffered until a chunk is complete, that happens when
+    it has `chunk_rows` rows or when it spans `chunk_duration` seconds.
+    Remember to call `close()` (or to use the writer as a context manager)
+    to write the index, otherwise the file is incomplete.
+    """
+
+    filepath: str
+    data_struct: PlottingStruct
+    chunk_rows: int
+    chunk_duration: float | None
+    n_columns: int
+
+    index: list[dict]
+
+    _pending: list[np.ndarray]
+    _pending_rows: int
+
+    def __init__(
+        self,
+        filepath: str,
+        data_struct: PlottingStruct,
+        chunk_rows: int = SESSION_CHUNK_ROWS,
+        chunk_duration: float | None = None,
+    ) -> None:
+        """Create the file, writing its header."""
+        self.filepath = filepath
+        self.data_struct = data_struct
+        self.chunk_rows = chunk_rows
+        self.chunk_duration = chunk_duration
+
+        self.index = []
+        self._pending = []
+        self._pending_rows = 0
+        self.n_columns = len(get_session_column_names(data_struct))
+
+        # pylint: disable-next=consider-using-with
+        self._file = open(filepath, 'wb')
+        write_session_header(self._file, data_struct)
+
+    def __enter__(self) -> SessionWriter:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def n_rows(self) -> int:
+        """Return the number of rows appended, written or not."""
+        return sum(c['n_rows'] for c in self.index) + self._pending_rows
+
+    def write_chunk(self, columns: np.ndarray) -> dict:
+        """
+        Write `columns`, a `(n_columns, n_rows)` array, as a single chunk.
+
+        Return the index entry of the chunk.
+        """
+        assert columns.shape[0] == self.n_columns, 'Wrong number of columns'
+        # Converted once, so that both the checksums and the write use it
+        columns = np.ascontiguousarray(columns, dtype=SESSION_DTYPE)
+
+        entry = {
+            'offset': write_chunk_record(self._file, columns),
+            'n_rows': columns.shape[1],
+            't_min': float(columns[0, 0]),
+            't_max': float(columns[0, -1]),
+            'min': _json_floats(np.fmin.reduce(columns, axis=1)),
+            'max': _json_floats(np.fmax.reduce(columns, axis=1)),
+            'crc32': [checksum(column) for column in columns],
+        }
+        self.index.append(entry)
+
+        return entry
+
+    def _first_chunk_rows(self, times: np.ndarray) -> int | None:
+        """Return the rows of the first chunk in `times`, if complete."""
+        n_rows = min(self.chunk_rows, len(times))
+        if self.chunk_duration is not None:
+            n_rows = min(
+                n_rows,
+                int(np.searchsorted(times, times[0] + self.chunk_duration)),
+            )
+            n_rows = max(n_rows, 1)
+
+        if n_rows < len(times) or n_rows == self.chunk_rows:
+            return n_rows
+        return None
+
+    def _write_pending(self, force: bool) -> None:
+        """Write the complete chunks, and all the rest if `force`."""
+        if self._pending_rows == 0:
+            return
+
+        columns = np.concatenate(self._pending, axis=1)
+        while columns.shape[1] > 0:
+            n_rows = self._first_chunk_rows(columns[0])
+            if n_rows is None:
+                if not force:
+                    break
+                n_rows = columns.shape[1]
+
+            self.write_chunk(columns[:, :n_rows])
+            columns = columns[:, n_rows:]
+
+        self._pending = [columns] if columns.shape[1] > 0 else []
+        self._pending_rows = columns.shape[1]
+
+    def append(self, x_new, y_new) -> None:
+        """Append a batch of samples, writing the chunks completed."""
+        self.append_columns(columns_from_data(x_new, y_new))
+
+    def append_columns(self, columns: np.ndarray) -> None:
+        """Append a `(n_columns, n_rows)` array, like `append()`."""
+        if columns.shape[1] == 0:
+            return
+
+        self._pending.append(columns)
+        self._pending_rows += columns.shape[1]
+        self._write_pending(force=False)
+
+    def flush(self) -> None:
+        """Write all the pending data, even if it does not fill a chunk."""
+        self._write_pending(force=True)
+        self._file.flush()
+
+    def close(self) -> None:
+        """Write the pending data and the index, then close the file."""
+        if self._file.closed:
+            return
+
+        self._write_pending(force=True)
+
+        index = json.dumps({'chunks': self.index}).encode('utf-8')
+        self._file.write(index)
+        self._file.write(_U64.pack(len(index)))
+        self._file.write(INDEX_MAGIC)
+        self._file.close()
+
+
+class SessionReader:
+    """
+    Read a session file, loading only the chunks that are needed.
+
+    The file is memory mapped, so reading a chunk touches only its pages.
+    """
+
+    filepath: str
+    data_struct: PlottingStruct
+    columns: list[str]
+    index: list[dict]
+
+    # Arrays built from the index, used to search the chunks
+    chunk_t_min: np.ndarray
+    chunk_t_max: np.ndarray
+    chunk_min: np.ndarray
+    chunk_max: np.ndarray
+
+    def __init__(self, filepath: str) -> None:
+        """Open the file, reading its header and its index."""
+        self.filepath = filepath
+
+        self._map = np.memmap(filepath, dtype=np.uint8, mode='r')
+
+        header, _ = read_session_header(self._map, filepath)
+
+        self.columns = header['columns']
+        self.data_struct = PlottingStruct.from_config_list(header['schema'])
+
+        self.index = self._read_index()
+
+        n_cols = len(self.columns)
+        self.chunk_t_min = np.array([c['t_min'] for c in self.index])
+        self.chunk_t_max = np.array([c['t_max'] for c in self.index])
+        self.chunk_min = np.array(
+            [c['min'] for c in self.index], dtype=float
+        ).reshape(-1, n_cols)
+        self.chunk_max = np.array(
+            [c['max'] for c in self.index], dtype=float
+        ).reshape(-1, n_cols)
+
+    def _read_index(self) -> list[dict]:
+        """Read the index at the end of the file."""
+        if bytes(self._map[-len(INDEX_MAGIC) :]) != INDEX_MAGIC:
+            raise ValueError(f'{self.filepath} has no index, incomplete file')
+
+        pos = len(self._map) - len(INDEX_MAGIC) - _U64.size
+        (index_len,) = _U64.unpack_from(self._map, pos)
+        return json.loads(bytes(self._map[pos - index_len : pos]))['chunks']
+
+    def __len__(self) -> int:
+        """Return the number of rows in the file."""
+        return sum(c['n_rows'] for c in self.index)
+
+    @property
+    def t_range(self) -> tuple[float, float]:
+        """Return the first and the last time in the file."""
+        if len(self.index) == 0:
+            return 0, 0
+        return self.index[0]['t_min'], self.index[-1]['t_max']
+
+    def close(self) -> None:
+        """Release the mapping of the file."""
+        del self._map
+
+    def read_chunk(self, chunk_idx: int) -> np.ndarray:
+        """Return the `(n_columns, n_rows)` data of a chunk, as a view."""
+        entry = self.index[chunk_idx]
+        n_rows = entry['n_rows']
+
+        magic = bytes(self._map[entry['offset'] : entry['offset'] + 4])
+        if magic != CHUNK_MAGIC:
+            raise ValueError(f'Chunk {chunk_idx} not found, corrupted file')
+
+        start = entry['offset'] + _CHUNK_HEADER.size
+        n_bytes = n_rows * len(self.columns) * SESSION_DTYPE.itemsize
+
+        return (
+            self._map[start : start + n_bytes]
+            .view(SESSION_DTYPE)
+            .reshape(len(self.columns), n_rows)
+        )
+
+    def verify(
+        self, progress: Callable[[float], None] | None = None
+    ) -> list[CorruptedRange]:
+        """
+        Check the data of every chunk against the checksums in the index.
+
+        The file is read once, chunk by chunk.
+        `progress`, if given, is called with the fraction of chunks checked.
+        Return the ranges of the columns that are corrupted.
+        """
+        corrupted = []
+
+        for c_i, entry in enumerate(self.index):
+            try:
+                columns = self.read_chunk(c_i)
+                crcs = [checksum(column) for column in columns]
+            except ValueError:
+                # Chunk header corrupted or data truncated
+                crcs = [None] * len(self.columns)
+
+            for name, crc, expected in zip(
+                self.columns, crcs, entry.get('crc32', crcs)
+            ):
+                if crc is None or crc != expected:
+                    corrupted.append(
+                        CorruptedRange(name, entry['t_min'], entry['t_max'])
+                    )
+
+            if progress is not None:
+                progress((c_i + 1) / len(self.index))
+
+        return corrupted
+
+    def find_chunks(self, t_start: float, t_end: float) -> range:
+        """Return the indices of the chunks overlapping `[t_start, t_end]`."""
+        first = int(np.searchsorted(self.chunk_t_max, t_start, side='left'))
+        last = int(np.searchsorted(self.chunk_t_min, t_end, side='right'))
+        return range(first, max(first, last))
+
+    def read_columns(
+        self, t_start: float = -np.inf, t_end: float = np.inf
+    ) -> np.ndarray:
+        """Return the `(n_columns, n_rows)` data in `[t_start, t_end]`."""
+        chunks = [
+            self.read_chunk(c_i) for c_i in self.find_chunks(t_start, t_end)
+        ]
+        if len(chunks) == 0:
+            return np.empty((len(self.columns), 0), dtype=SESSION_DTYPE)
+
+        columns = np.concatenate(chunks, axis=1)
+        times = columns[0]
+        first = int(np.searchsorted(times, t_start, side='left'))
+        last = int(np.searchsorted(times, t_end, side='right'))
+        return columns[:, first:last]
+
+    def read_range(
+        self, t_start: float = -np.inf, t_end: float = np.inf
+    ) -> tuple[np.ndarray, list[list[np.ndarray]]]:
+        """
+        Return the data in `[t_start, t_end]`, reading only needed chunks.
+
+        The data has the same layout of the session store, so it can be
+        passed to the savers directly.
+        """
+        return split_columns(
+            self.data_struct, self.read_columns(t_start, t_end)
+        )
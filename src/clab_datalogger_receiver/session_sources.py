@@ -0,0 +1,557 @@
+"""
+Module with the sources of the saved sessions, used to review them.
+
+Each source gives access to a time range of a saved session, as a
+`(n_columns, n_samples)` array with the time in the first row,
+loading only what is needed when the file format allows it.
+The session being acquired can be reviewed as well, through
+`LiveSessionSource`.
+"""
+from __future__ import annotations
+
+import json
+import os
+from abc import abstractmethod
+from typing import Iterator
+
+import numpy as np
+
+from .decimation import MinMaxPyramid, minmax_decimate, minmax_reduce
+from .received_structure import DataStruct, PlottingStruct, StructField
+from .saver import ARROW_SCHEMA_METADATA_KEY, mat73_fields_order
+from .session_format import SessionReader, columns_from_data, slice_data
+from .session_store import SessionStore
+
+# Above this number of samples in the requested range, the envelope is
+#   built a slab at a time, so that the memory used stays bounded
+MAX_ENVELOPE_READ_ROWS: int = 1 << 21
+# Rows of the slabs of the sources without chunks of their own, rounded to
+#   the HDF5 chunks for the MAT v7.3 files
+ENVELOPE_SLAB_ROWS: int = 1 << 20
+
+SESSION_FILE_FILTERS: list[tuple[str, str]] = [
+    # ( desc, extension)
+    ("CLAB session files", "clabs"),
+    ("Parquet files", "parquet"),
+    ("MAT files", "mat"),
+    ("Arrow IPC/Feather files", "feather"),
+]
+
+
+class SessionSource:
+    """Base class of the saved session sources."""
+
+    filepath: str
+    data_struct: PlottingStruct
+
+    @property
+    @abstractmethod
+    def t_range(self) -> tuple[float, float]:
+        """Return the first and the last time of the session."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_columns(self, t_start: float, t_end: float) -> np.ndarray:
+        """Return the `(n_columns, n_samples)` data in `[t_start, t_end]`."""
+        raise NotImplementedError
+
+    def count_rows(self, t_start: float, t_end: float) -> int | None:
+        """
+        Return the (estimated) samples in `[t_start, t_end]`.
+
+        `None` means unknown, so the range is just read.
+        """
+        return None
+
+    def iter_envelopes(
+        self, t_start: float, t_end: float, bucket_rows: int
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield the envelope of `[t_start, t_end]`, one slab after the other.
+
+        The slabs are reduced to buckets of `bucket_rows` samples, see
+        `bucket_envelope`.
+        By default the range is read at once, as a single slab.
+        """
+        yield bucket_envelope(self.read_columns(t_start, t_end), bucket_rows)
+
+    def read_envelope(
+        self, t_start: float, t_end: float, n_buckets: int
+    ) -> np.ndarray:
+        """
+        Return the envelope of the data in `[t_start, t_end]`.
+
+        About `2 * n_buckets` points per column are returned, so that the
+        range can be rendered at screen resolution.
+        Large ranges are read in slabs, see `iter_envelopes`.
+        """
+        n_rows = self.count_rows(t_start, t_end)
+        if n_rows is None or n_rows <= MAX_ENVELOPE_READ_ROWS:
+            return minmax_decimate(self.read_columns(t_start, t_end), n_buckets)
+
+        bucket_rows = -(-n_rows // n_buckets)
+        return np.hstack(list(self.iter_envelopes(t_start, t_end, bucket_rows)))
+
+    def close(self) -> None:
+        """Release the resources of the source."""
+
+
+class InMemorySessionSource(SessionSource):
+    """Source of the sessions that must be loaded entirely."""
+
+    columns: np.ndarray
+
+    def __init__(
+        self, filepath: str, data_struct: PlottingStruct, columns: np.ndarray
+    ) -> None:
+        self.filepath = filepath
+        self.data_struct = data_struct
+        self.columns = columns
+
+    @property
+    def t_range(self) -> tuple[float, float]:
+        if self.columns.shape[1] == 0:
+            return 0, 0
+        return float(self.columns[0, 0]), float(self.columns[0, -1])
+
+    def read_columns(self, t_start: float, t_end: float) -> np.ndarray:
+        return cut_range(self.columns, t_start, t_end)
+
+
+class ChunkedSessionSource(SessionSource):
+    """Source of the native session files, see `session_format`."""
+
+    reader: SessionReader
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+        self.reader = SessionReader(filepath)
+        self.data_struct = self.reader.data_struct
+
+    @property
+    def t_range(self) -> tuple[float, float]:
+        return self.reader.t_range
+
+    def read_columns(self, t_start: float, t_end: float) -> np.ndarray:
+        return self.reader.read_columns(t_start, t_end)
+
+    def count_rows(self, t_start: float, t_end: float) -> int | None:
+        return sum(
+            self.reader.index[c_i]['n_rows']
+            for c_i in self.reader.find_chunks(t_start, t_end)
+        )
+
+    def iter_envelopes(
+        self, t_start: float, t_end: float, bucket_rows: int
+    ) -> Iterator[np.ndarray]:
+        """Yield the envelope of the chunks, small ones from statistics."""
+        reader = self.reader
+        for c_i in reader.find_chunks(t_start, t_end):
+            if reader.index[c_i]['n_rows'] <= bucket_rows and (
+                t_start <= reader.chunk_t_min[c_i]
+                and reader.chunk_t_max[c_i] <= t_end
+            ):
+                yield statistics_envelope(
+                    reader.chunk_t_min[c_i],
+                    reader.chunk_t_max[c_i],
+                    reader.chunk_min[c_i],
+                    reader.chunk_max[c_i],
+                )
+            else:
+                yield bucket_envelope(
+                    cut_range(reader.read_chunk(c_i), t_start, t_end),
+                    bucket_rows,
+                )
+
+    def close(self) -> None:
+        self.reader.close()
+
+
+class ParquetSessionSource(SessionSource):
+    """
+    Source of the Parquet files.
+
+    Only the row groups overlapping the requested range are read, found
+    through the statistics of the time column.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq
+
+        # pylint: enable=import-outside-toplevel
+
+        self.filepath = filepath
+        self.file = pq.ParquetFile(filepath)
+
+        schema = self.file.schema_arrow
+        self.data_struct = data_struct_from_arrow_schema(schema)
+
+        metadata = self.file.metadata
+        time_idx = schema.get_field_index('time')
+        n_cols = metadata.num_columns
+
+        self.group_rows = np.array(
+            [
+                metadata.row_group(g).num_rows
+                for g in range(metadata.num_row_groups)
+            ]
+        )
+        self.group_min = np.full((metadata.num_row_groups, n_cols), np.nan)
+        self.group_max = np.full((metadata.num_row_groups, n_cols), np.nan)
+        for g_i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(g_i)
+            for c_i in range(n_cols):
+                stats = row_group.column(c_i).statistics
+                if stats is not None and stats.has_min_max:
+                    self.group_min[g_i, c_i] = stats.min
+                    self.group_max[g_i, c_i] = stats.max
+
+        # Time first, like the other sources
+        order = [time_idx] + [c for c in range(n_cols) if c != time_idx]
+        self.group_min = self.group_min[:, order]
+        self.group_max = self.group_max[:, order]
+        self.column_names = [schema.names[c] for c in order]
+
+    @property
+    def t_range(self) -> tuple[float, float]:
+        if len(self.group_rows) == 0:
+            return 0, 0
+        return float(self.group_min[0, 0]), float(self.group_max[-1, 0])
+
+    def find_groups(self, t_start: float, t_end: float) -> list[int]:
+        """Return the row groups overlapping `[t_start, t_end]`."""
+        return np.flatnonzero(
+            ~((self.group_max[:, 0] < t_start) | (self.group_min[:, 0] > t_end))
+        ).tolist()
+
+    def read_groups(self, groups: list[int]) -> np.ndarray:
+        """Return the `(n_columns, n_rows)` data of the row groups."""
+        if len(groups) == 0:
+            return np.empty((len(self.column_names), 0))
+
+        table = self.file.read_row_groups(groups, columns=self.column_names)
+        return np.vstack(
+            [
+                col.to_numpy(zero_copy_only=False).astype(float)
+                for col in table.columns
+            ]
+        )
+
+    def read_columns(self, t_start: float, t_end: float) -> np.ndarray:
+        return cut_range(
+            self.read_groups(self.find_groups(t_start, t_end)),
+            t_start,
+            t_end,
+        )
+
+    def count_rows(self, t_start: float, t_end: float) -> int | None:
+        return int(self.group_rows[self.find_groups(t_start, t_end)].sum())
+
+    def iter_envelopes(
+        self, t_start: float, t_end: float, bucket_rows: int
+    ) -> Iterator[np.ndarray]:
+        """Yield the envelope of the row groups, small ones from statistics."""
+        for g_i in self.find_groups(t_start, t_end):
+            g_min, g_max = self.group_min[g_i], self.group_max[g_i]
+            if (
+                self.group_rows[g_i] <= bucket_rows
+                and t_start <= g_min[0]
+                and g_max[0] <= t_end
+                and not np.isnan(g_min).any()
+                and not np.isnan(g_max).any()
+            ):
+                yield statistics_envelope(g_min[0], g_max[0], g_min, g_max)
+            else:
+                yield bucket_envelope(
+                    cut_range(self.read_groups([g_i]), t_start, t_end),
+                    bucket_rows,
+                )
+
+
+class Mat73SessionSource(SessionSource):
+    """
+    Source of the MAT v7.3 files, written by `save_as_mat_v73`.
+
+    Only the time vector is loaded, the data is read when requested.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        # pylint: disable=import-outside-toplevel
+        import h5py
+
+        # pylint: enable=import-outside-toplevel
+
+        self.filepath = filepath
+        self.file = h5py.File(filepath, 'r')
+        group = self.file['turtlebot_data']
+
+        names = [
+            name
+            for name in mat73_fields_order(group)
+            if name not in ('time', 'field_names')
+        ]
+        field_names_group = group['field_names']
+
+        subplots = []
+        for name in names:
+            # MATLAB dimensions are reversed in HDF5
+            chars = field_names_group[name][:].T
+            subplots.append(
+                DataStruct(
+                    [
+                        StructField(
+                            'd', ''.join(map(chr, row)).rstrip() or None
+                        )
+                        for row in chars
+                    ],
+                    name=name,
+                )
+            )
+
+        self.data_struct = PlottingStruct(subplots)
+        self.datasets = [group[name] for name in names]
+        self.times = group['time'][:, 0]
+
+    @property
+    def t_range(self) -> tuple[float, float]:
+        if len(self.times) == 0:
+            return 0, 0
+        return float(self.times[0]), float(self.times[-1])
+
+    def _find_rows(self, t_start: float, t_end: float) -> tuple[int, int]:
+        """Return the first and the end index of `[t_start, t_end]`."""
+        return (
+            int(np.searchsorted(self.times, t_start, side='left')),
+            int(np.searchsorted(self.times, t_end, side='right')),
+        )
+
+    def read_rows(self, first: int, last: int) -> np.ndarray:
+        """Return the `(n_columns, n_rows)` data of the rows `[first, last)`."""
+        return np.vstack(
+            [self.times[first:last]]
+            + [dset[first:last, :].T for dset in self.datasets]
+        )
+
+    def read_columns(self, t_start: float, t_end: float) -> np.ndarray:
+        return self.read_rows(*self._find_rows(t_start, t_end))
+
+    def count_rows(self, t_start: float, t_end: float) -> int | None:
+        first, last = self._find_rows(t_start, t_end)
+        return last - first
+
+    def iter_envelopes(
+        self, t_start: float, t_end: float, bucket_rows: int
+    ) -> Iterator[np.ndarray]:
+        """Yield the envelope of slabs made of whole HDF5 chunks."""
+        first, last = self._find_rows(t_start, t_end)
+
+        chunk_rows = max(
+            (dset.chunks[0] for dset in self.datasets if dset.chunks),
+            default=1,
+        )
+        slab_rows = max(1, ENVELOPE_SLAB_ROWS // chunk_rows) * chunk_rows
+
+        # The slabs start on the chunks, so no chunk is read twice
+        for start in range(first - first % slab_rows, last, slab_rows):
+            yield bucket_envelope(
+                self.read_rows(max(start, first), min(start + slab_rows, last)),
+                bucket_rows,
+            )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class LiveSessionSource(SessionSource):
+    """
+    Source of the session being acquired, while the data keeps arriving.
+
+    Wide ranges are read from the `history` pyramid kept up to date with
+    the store, so that reviewing them does not depend on the session
+    length, and narrow ones from the store itself.
+    """
+
+    store: SessionStore
+    history: MinMaxPyramid
+
+    def __init__(self, store: SessionStore, history: MinMaxPyramid) -> None:
+        self.filepath = store.session_dir
+        self.data_struct = store.data_struct
+        self.store = store
+        self.history = history
+
+    @property
+    def t_range(self) -> tuple[float, float]:
+        x_data = self.store.x_data
+        if len(x_data) == 0:
+            return 0, 0
+        return float(x_data[0]), float(x_data[-1])
+
+    def _find_rows(self, t_start: float, t_end: float) -> tuple[int, int]:
+        """Return the first and the end index of `[t_start, t_end]`."""
+        x_data = self.store.x_data
+        return (
+            int(np.searchsorted(x_data, t_start, side='left')),
+            int(np.searchsorted(x_data, t_end, side='right')),
+        )
+
+    def read_columns(self, t_start: float, t_end: float) -> np.ndarray:
+        first, last = self._find_rows(t_start, t_end)
+        return columns_from_data(
+            self.store.x_data[first:last],
+            slice_data(self.store.y_data, first, last),
+        )
+
+    def count_rows(self, t_start: float, t_end: float) -> int | None:
+        first, last = self._find_rows(t_start, t_end)
+        return last - first
+
+    def read_envelope(
+        self, t_start: float, t_end: float, n_buckets: int
+    ) -> np.ndarray:
+        # Reading the samples is bounded as well, by the size of a bucket
+        #   of the first level of the history
+        first, last = self._find_rows(t_start, t_end)
+        if last - first > self.history.base_rows * n_buckets:
+            envelope = self.history.envelope(t_start, t_end, n_buckets)
+            if envelope is not None:
+                return envelope
+
+        return minmax_decimate(self.read_columns(t_start, t_end), n_buckets)
+
+
+def cut_range(columns: np.ndarray, t_start: float, t_end: float) -> np.ndarray:
+    """Return the samples of `columns` in `[t_start, t_end]`, as a view."""
+    times = columns[0]
+    first = int(np.searchsorted(times, t_start, side='left'))
+    last = int(np.searchsorted(times, t_end, side='right'))
+    return columns[:, first:last]
+
+
+def bucket_envelope(columns: np.ndarray, bucket_rows: int) -> np.ndarray:
+    """
+    Reduce `columns` to the minimum and maximum of `bucket_rows` buckets.
+
+    See `minmax_reduce`. If the buckets would not reduce the data, it is
+    returned as is.
+    """
+    if bucket_rows <= 2 or columns.shape[1] <= 2:
+        return columns
+    return minmax_reduce(columns, np.arange(0, columns.shape[1], bucket_rows))
+
+
+def statistics_envelope(
+    t_min: float, t_max: float, mins: np.ndarray, maxs: np.ndarray
+) -> np.ndarray:
+    """
+    Return the envelope of a chunk from its statistics.
+
+    As in `minmax_reduce`, the minimum is put at the first time and the
+    maximum at the last one, the time of the extremes being unknown.
+    `mins` and `maxs` include the time column.
+    """
+    envelope = np.column_stack([mins, maxs]).astype(float)
+    envelope[0] = t_min, t_max
+    return envelope
+
+
+def data_struct_from_arrow_schema(schema) -> PlottingStruct:
+    """
+    Return the `PlottingStruct` of a table written by `save_as_arrow`.
+
+    If the table was written by something else, all the columns but `time`
+    are put in a single subplot.
+    """
+    metadata = schema.metadata or {}
+    config = metadata.get(ARROW_SCHEMA_METADATA_KEY.encode('utf-8'))
+    if config is not None:
+        return PlottingStruct.from_config_list(json.loads(config))
+
+    return PlottingStruct(
+        [
+            DataStruct(
+                [
+                    StructField('d', name)
+                    for name in schema.names
+                    if name != 'time'
+                ],
+                name='data',
+            )
+        ]
+    )
+
+
+def load_mat_v5(filepath: str) -> InMemorySessionSource:
+    """Load a MAT v5 file written by `save_as_mat`, it is not seekable."""
+    # pylint: disable=import-outside-toplevel
+    from scipy.io import loadmat
+
+    # pylint: enable=import-outside-toplevel
+
+    data = loadmat(filepath)['turtlebot_data'][0, 0]
+    field_names = data['field_names'][0, 0]
+
+    subplots = []
+    rows = [data['time'].reshape(-1)]
+    for name in data.dtype.names:
+        if name in ('time', 'field_names'):
+            continue
+        subplots.append(
+            DataStruct(
+                [StructField('d', str(f).rstrip()) for f in field_names[name]],
+                name=name,
+            )
+        )
+        rows.extend(data[name])
+
+    return InMemorySessionSource(
+        filepath, PlottingStruct(subplots), np.vstack(rows).astype(float)
+    )
+
+
+def load_feather(filepath: str) -> InMemorySessionSource:
+    """Load an Arrow IPC/Feather file, memory mapped when uncompressed."""
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.feather as pf
+
+    # pylint: enable=import-outside-toplevel
+
+    table = pf.read_table(filepath, memory_map=True)
+    data_struct = data_struct_from_arrow_schema(table.schema)
+    names = ['time'] + [n for n in table.column_names if n != 'time']
+
+    return InMemorySessionSource(
+        filepath,
+        data_struct,
+        np.vstack(
+            [
+                table.column(name).to_numpy().astype(float, copy=False)
+                for name in names
+            ]
+        ),
+    )
+
+
+def is_mat_v73(filepath: str) -> bool:
+    """Return `True` if the `.mat` file is a v7.3 (HDF5) one."""
+    with open(filepath, 'rb') as file:
+        return file.read(19) == b'MATLAB 7.3 MAT-file'
+
+
+def open_session_source(filepath: str) -> SessionSource:
+    """Open a saved session, choosing the source by the file extension."""
+    extension = os.path.splitext(filepath)[1].lower()
+
+    if extension == '.clabs':
+        return ChunkedSessionSource(filepath)
+    if extension == '.parquet':
+        return ParquetSessionSource(filepath)
+    if extension == '.mat':
+        if is_mat_v73(filepath):
+            return Mat73SessionSource(filepath)
+        return load_mat_v5(filepath)
+    if extension == '.feather':
+        return load_feather(filepath)
+
+    raise ValueError(f'Unsupported session file: {filepath}')
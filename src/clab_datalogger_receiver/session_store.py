@@ -0,0 +1,228 @@
+"""
+Module that implements the disk backed storage of an acquisition session.
+
+The full history of a session is kept in `numpy.memmap` files, one per
+channel, inside a session directory.
+This lets the history grow far beyond the available RAM, while the most
+recently written pages stay in the OS page cache and are thus cheap to read
+back for plotting and exporting.
+Optionally, the session is also journaled, so that it can be recovered
+after a crash (see the `journal` module).
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .journal import JOURNAL_FILENAME, SessionJournal
+from .received_structure import PlottingStruct
+
+SESSIONS_FOLDER: str = os.path.join(
+    os.path.expanduser('~'), '.clab_datalogger', 'sessions'
+)
+
+STORE_DTYPE = np.float64
+
+
+def get_sessions_folder() -> str:
+    """Return the folder containing the session directories, creating it."""
+    os.makedirs(SESSIONS_FOLDER, exist_ok=True)
+    return SESSIONS_FOLDER
+
+
+class MemmapColumn:
+    """
+    Growable 1-D array backed by a memory mapped file.
+
+    The file is preallocated with some spare capacity, which is doubled
+    whenever an append does not fit anymore, so appends are amortized O(1).
+    """
+
+    filename: str
+    size: int
+
+    _map: np.memmap
+
+    def __init__(self, filename: str, initial_capacity: int = 1 << 16):
+        """Create (or truncate) the backing file of the column."""
+        self.filename = filename
+        self.size = 0
+        self._map = np.memmap(
+            filename,
+            dtype=STORE_DTYPE,
+            mode='w+',
+            shape=(max(1, initial_capacity),),
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Return the number of samples that fit without growing the file."""
+        return self._map.shape[0]
+
+    @property
+    def data(self) -> np.ndarray:
+        """Return a view of the stored samples, without copying them."""
+        return self._map[: self.size]
+
+    def _grow(self, min_capacity: int) -> None:
+        """Extend the backing file so that at least `min_capacity` fits."""
+        new_capacity = max(min_capacity, 2 * self.capacity)
+
+        self._map.flush()
+        # Views handed out before keep the old mapping alive, and they stay
+        #   valid since the file only grows.
+        # `numpy.memmap` extends the file itself when opened in 'r+' mode
+        #   with a bigger shape.
+        self._map = np.memmap(
+            self.filename,
+            dtype=STORE_DTYPE,
+            mode='r+',
+            shape=(new_capacity,),
+        )
+
+    def append(self, values: np.ndarray) -> None:
+        """Append `values` at the end of the column."""
+        n_new = len(values)
+        if n_new == 0:
+            return
+
+        if self.size + n_new > self.capacity:
+            self._grow(self.size + n_new)
+
+        self._map[self.size : self.size + n_new] = values
+        self.size += n_new
+
+    def clear(self) -> None:
+        """Forget all the stored samples, keeping the allocated file."""
+        self.size = 0
+
+    def flush(self) -> None:
+        """Write the dirty pages to disk."""
+        self._map.flush()
+
+
+class SessionStore:
+    """
+    Disk backed column store holding the full history of a session.
+
+    The layout of `x_data` and `y_data` is the same used by the savers,
+    so the arrays can be passed to them directly.
+    """
+
+    data_struct: PlottingStruct
+    session_dir: str
+
+    x_column: MemmapColumn
+    y_columns: list[list[MemmapColumn]]
+
+    journal: SessionJournal | None
+
+    _owns_dir: bool
+
+    def __init__(
+        self,
+        data_struct: PlottingStruct,
+        session_dir: str | None = None,
+        initial_capacity: int = 1 << 16,
+        journal: bool = False,
+    ) -> None:
+        """
+        Create the backing files of the session.
+
+        If `session_dir` is not given, a new directory is created inside
+        the sessions folder, and it is removed on `close()`.
+        If `journal` is `True`, the data appended is also journaled.
+        """
+        self.data_struct = data_struct
+
+        self._owns_dir = session_dir is None
+        if session_dir is None:
+            session_dir = tempfile.mkdtemp(
+                prefix='session_', dir=get_sessions_folder()
+            )
+        else:
+            os.makedirs(session_dir, exist_ok=True)
+
+        self.session_dir = session_dir
+
+        self.x_column = MemmapColumn(
+            os.path.join(session_dir, 'time.bin'), initial_capacity
+        )
+        self.y_columns = [
+            [
+                MemmapColumn(
+                    os.path.join(session_dir, f'sp{sp_i}_f{f_i}.bin'),
+                    initial_capacity,
+                )
+                for f_i in range(len(sp))
+            ]
+            for sp_i, sp in enumerate(data_struct.subplots)
+        ]
+
+        self.journal = self._open_journal() if journal else None
+
+    def _open_journal(self) -> SessionJournal:
+        """Create a new journal in the session directory."""
+        return SessionJournal(
+            os.path.join(self.session_dir, JOURNAL_FILENAME), self.data_struct
+        )
+
+    def __len__(self) -> int:
+        """Return the number of stored samples."""
+        return self.x_column.size
+
+    @property
+    def x_data(self) -> np.ndarray:
+        """Return the time vector of the whole session."""
+        return self.x_column.data
+
+    @property
+    def y_data(self) -> list[list[np.ndarray]]:
+        """Return the data vectors of the whole session."""
+        return [[col.data for col in sp_cols] for sp_cols in self.y_columns]
+
+    def append(self, x_new, y_new) -> None:
+        """Append a batch of samples to the session."""
+        x_new = np.asarray(x_new, dtype=STORE_DTYPE)
+        self.x_column.append(x_new)
+        if self.journal is not None:
+            self.journal.append(x_new, y_new)
+
+        for sp_cols, y_sp in zip(self.y_columns, y_new):
+            for col, y_f in zip(sp_cols, y_sp):
+                col.append(y_f)
+
+    def clear(self) -> None:
+        """Forget all the stored samples."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = self._open_journal()
+
+        self.x_column.clear()
+        for sp_cols in self.y_columns:
+            for col in sp_cols:
+                col.clear()
+
+    def flush(self) -> None:
+        """Write the dirty pages of all the columns to disk."""
+        self.x_column.flush()
+        for sp_cols in self.y_columns:
+            for col in sp_cols:
+                col.flush()
+
+    def close(self) -> None:
+        """Release the session, removing its directory if owned."""
+        # The session is closed properly, so it does not need recovery
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+        if self._owns_dir:
+            # On Windows the files of live mappings cannot be removed,
+            #   so ignore the errors instead of failing on exit.
+            shutil.rmtree(self.session_dir, ignore_errors=True)
+        else:
+            self.flush()
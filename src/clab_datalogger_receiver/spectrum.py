@@ -0,0 +1,128 @@
+"""
+Module that implements the live spectrum of the channels.
+
+The power spectral density is estimated with the method of Welch, over
+the last segments of the stream: each segment is transformed once, as
+soon as its samples arrive, and the estimate is the mean of the
+periodograms of the last segments.
+The sample rate is estimated from the times of the samples, that are
+assumed to be evenly spaced.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from scipy.signal import get_window
+
+# Samples of each segment, setting the frequency resolution
+SPECTRUM_SEGMENT_LENGTH: int = 1024
+# Fraction of each segment shared with the next one
+SPECTRUM_OVERLAP: float = 0.5
+# Segments averaged in the estimate
+SPECTRUM_AVERAGED_SEGMENTS: int = 16
+
+
+class StreamingWelch:
+    """
+    Welch estimate of the power spectral density, over the last segments.
+
+    It matches `scipy.signal.welch` with the same segments, `'constant'`
+    detrending and one-sided density scaling.
+    """
+
+    segment_length: int
+    step: int
+    window: np.ndarray
+
+    # Periodograms of the last segments, in a ring of `n_averaged`
+    _periodograms: np.ndarray
+    _sample_rates: np.ndarray
+    _n_stored: int
+    _next: int
+    # Samples not yet in a segment, with the time first
+    _pending: np.ndarray
+
+    def __init__(
+        self,
+        n_channels: int,
+        segment_length: int = SPECTRUM_SEGMENT_LENGTH,
+        overlap: float = SPECTRUM_OVERLAP,
+        n_averaged: int = SPECTRUM_AVERAGED_SEGMENTS,
+        window: str = 'hann',
+    ) -> None:
+        self.segment_length = segment_length
+        self.step = max(1, segment_length - int(segment_length * overlap))
+        self.window = get_window(window, segment_length)
+
+        n_frequencies = segment_length // 2 + 1
+        self._periodograms = np.zeros((n_averaged, n_channels, n_frequencies))
+        self._sample_rates = np.zeros(n_averaged)
+        self._n_stored = 0
+        self._next = 0
+        self._pending = np.empty((n_channels + 1, 0))
+
+    @property
+    def ready(self) -> bool:
+        """Return whether at least a segment was transformed."""
+        return self._n_stored > 0
+
+    @property
+    def sample_rate(self) -> float:
+        """Return the mean sample rate of the averaged segments."""
+        return float(self._sample_rates[: self._n_stored].mean())
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        """Return the frequencies of the estimate."""
+        return np.fft.rfftfreq(self.segment_length, 1 / self.sample_rate)
+
+    @property
+    def psd(self) -> np.ndarray:
+        """Return the `(n_channels, n_frequencies)` estimate."""
+        return self._periodograms[: self._n_stored].mean(axis=0)
+
+    def append(self, columns: np.ndarray) -> int:
+        """
+        Append `columns`, a `(n_channels + 1, n)` array with the time first.
+
+        Return the number of new segments transformed.
+        """
+        pending = np.concatenate([self._pending, columns], axis=1)
+        n_samples = pending.shape[1]
+        if n_samples < self.segment_length:
+            self._pending = pending
+            return 0
+
+        n_segments = (n_samples - self.segment_length) // self.step + 1
+        indices = (
+            np.arange(self.segment_length)[None, :]
+            + self.step * np.arange(n_segments)[:, None]
+        )
+        # Only the last segments would be kept
+        indices = indices[-len(self._sample_rates) :]
+
+        times = pending[0, indices]
+        sample_rates = (self.segment_length - 1) / (times[:, -1] - times[:, 0])
+
+        segments = pending[1:, indices]
+        segments = segments - segments.mean(axis=-1, keepdims=True)
+        spectra = np.fft.rfft(segments * self.window, axis=-1)
+
+        # One sided density, so all the frequencies but the DC and the
+        #   Nyquist one have also the power of the negative ones
+        periodograms = np.abs(spectra) ** 2 / (
+            sample_rates[None, :, None] * np.sum(self.window**2)
+        )
+        periodograms[..., 1 : (self.segment_length + 1) // 2] *= 2
+
+        for periodogram, sample_rate in zip(
+            periodograms.transpose(1, 0, 2), sample_rates
+        ):
+            self._periodograms[self._next] = periodogram
+            self._sample_rates[self._next] = sample_rate
+            self._next = (self._next + 1) % len(self._sample_rates)
+            self._n_stored = min(self._n_stored + 1, len(self._sample_rates))
+
+        self._pending = pending[:, n_segments * self.step :].copy()
+        return n_segments
@@ -5,6 +5,9 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, Signal
 
+from .derived_channels import DerivedChannels
+from .received_structure import PlottingStruct
+
 DATATYPES = ['float','char','int8','uint8','int16','uint16','int32','uint32','int64','uint64','double']
     
 class StructConfigEditor(QDialog):
@@ -61,11 +64,12 @@ class StructConfigEditor(QDialog):
         # Trace name
         trace_item = QTableWidgetItem(trace_name)
         self.table.setItem(row, 1, trace_item)
-        # Datatype dropdown
+        # Datatype dropdown, editable to enter the expression of a
+        #   derived field
         dtype_combo = QComboBox()
+        dtype_combo.setEditable(True)
         dtype_combo.addItems(DATATYPES)
-        if dtype in DATATYPES:
-            dtype_combo.setCurrentText(dtype)
+        dtype_combo.setCurrentText(str(dtype))
         self.table.setCellWidget(row, 2, dtype_combo)
 
     def add_trace(self):
@@ -95,11 +99,18 @@ class StructConfigEditor(QDialog):
                 subplots[subplot] = {}
             subplots[subplot][trace] = dtype
         yaml_list = [{k: v} for k, v in subplots.items()]
+        # Check the types and the expressions before replacing the file
+        try:
+            DerivedChannels(PlottingStruct.from_config_list(yaml_list))
+        except (AssertionError, ValueError) as e:
+            QMessageBox.critical(self, "Invalid configuration", str(e))
+            return
         try:
             with open(self.yaml_path, "w") as f:
                 yaml.dump(yaml_list, f, sort_keys=False)
-            QMessageBox.information(self, "Saved", "YAML saved successfully.")
-            self.yaml_saved.emit()
-            self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Could not save YAML: {e}")
+            return
+        QMessageBox.information(self, "Saved", "YAML saved successfully.")
+        self.yaml_saved.emit()
+        self.accept()
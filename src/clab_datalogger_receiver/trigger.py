@@ -0,0 +1,179 @@
+"""
+Module that implements the oscilloscope like trigger of the captures.
+
+The trigger looks for a condition on a channel, like a rising edge
+through a level, and a capture is complete once the data after the
+trigger time covers the post-trigger duration.
+The data of the capture, around the trigger time, is then taken from the
+buffer of the plotted data, that holds more than a time window.
+The conditions are evaluated on whole batches with NumPy.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# Conditions of the trigger: the edges fire when the level is crossed,
+#   the levels whenever the channel is beyond it
+TRIGGER_CONDITIONS: list[str] = [
+    'rising',
+    'falling',
+    'either',
+    'above',
+    'below',
+]
+# In normal mode the trigger is armed again after each capture, in single
+#   mode it stops after the first one
+TRIGGER_MODES: list[str] = ['normal', 'single']
+
+
+@dataclass
+class TriggerSettings:
+    """Settings of the trigger."""
+
+    # Session column of the channel, 0 is the time
+    column: int
+    level: float
+    condition: str = 'rising'
+    # Seconds captured before and after the trigger time
+    pre: float = 0.1
+    post: float = 0.1
+    mode: str = 'normal'
+
+    def __post_init__(self):
+        assert (
+            self.condition in TRIGGER_CONDITIONS
+        ), f'Unsupported trigger condition: {self.condition}'
+        assert (
+            self.mode in TRIGGER_MODES
+        ), f'Unsupported trigger mode: {self.mode}'
+        assert self.column > 0, 'The trigger channel can not be the time'
+        assert self.pre >= 0 and self.post >= 0, 'Negative capture duration'
+
+
+def find_trigger_samples(
+    values: np.ndarray, previous: float, level: float, condition: str
+) -> np.ndarray:
+    """
+    Return the mask of the samples of `values` meeting `condition`.
+
+    `previous` is the value before the first one, used by the edges.
+    The NaN values never meet a condition.
+    """
+    if condition == 'above':
+        return values > level
+    if condition == 'below':
+        return values < level
+
+    before = np.empty_like(values)
+    before[0] = previous
+    before[1:] = values[:-1]
+
+    rising = (before < level) & (values >= level)
+    if condition == 'rising':
+        return rising
+    falling = (before > level) & (values <= level)
+    if condition == 'falling':
+        return falling
+    return rising | falling
+
+
+class Trigger:
+    """
+    Trigger on a channel of the incoming batches.
+
+    `append()` returns the trigger times of the captures completed by
+    each batch. After a capture, the next trigger is searched after its
+    end, so captures do not overlap.
+    """
+
+    settings: TriggerSettings
+
+    armed: bool
+    # Trigger time of the capture in progress, if any
+    t_trigger: float | None
+    # The next trigger must be after this time
+    t_rearm: float
+    n_captures: int
+
+    # Last value of the previous batch, for the edges
+    _previous: float
+
+    def __init__(self, settings: TriggerSettings) -> None:
+        self.settings = settings
+        self.armed = True
+        self.t_trigger = None
+        self.t_rearm = -np.inf
+        self.n_captures = 0
+        self._previous = np.nan
+
+    @property
+    def stopped(self) -> bool:
+        """Return whether the trigger will not capture anymore."""
+        return not self.armed and self.t_trigger is None
+
+    def append(self, columns: np.ndarray) -> list[float]:
+        """
+        Process a batch of session `columns`, with the time first.
+
+        Return the trigger times of the completed captures.
+        """
+        if columns.shape[1] == 0 or self.stopped:
+            return []
+
+        times = columns[0]
+        values = columns[self.settings.column]
+        fired = np.flatnonzero(
+            find_trigger_samples(
+                values,
+                self._previous,
+                self.settings.level,
+                self.settings.condition,
+            )
+        )
+        self._previous = values[-1]
+
+        captures = []
+        while True:
+            if self.armed:
+                # The first trigger after the end of the last capture
+                first = np.searchsorted(
+                    times[fired], self.t_rearm, side='right'
+                )
+                if first == len(fired):
+                    break
+                self.t_trigger = float(times[fired[first]])
+                self.armed = False
+
+            if (
+                self.t_trigger is None
+                or times[-1] < self.t_trigger + self.settings.post
+            ):
+                break
+
+            captures.append(self.t_trigger)
+            self.n_captures += 1
+            self.t_rearm = self.t_trigger + self.settings.post
+            self.t_trigger = None
+            self.armed = self.settings.mode == 'normal'
+
+        return captures
+
+
+def extract_capture(
+    columns: np.ndarray, t_trigger: float, pre: float, post: float
+) -> np.ndarray:
+    """
+    Return a copy of `columns` around `t_trigger`, with relative times.
+
+    The data from `pre` seconds before the trigger to `post` seconds after
+    is taken, or the part of it that `columns` holds.
+    """
+    start, end = np.searchsorted(
+        columns[0], [t_trigger - pre, t_trigger + post], side='left'
+    )
+    capture = columns[:, start : end + 1].copy()
+    capture[0] -= t_trigger
+    return capture
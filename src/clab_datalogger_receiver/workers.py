@@ -1,20 +1,59 @@
-from queue import Empty, Queue
-from typing import Tuple
+import os
+
+from queue import Empty, Full, Queue
+from threading import Event
+from time import monotonic, perf_counter
+from typing import Callable, Tuple
 
 from numpy import array as np_array
+from numpy import float64 as np_float64
+from numpy import ndarray as np_ndarray
+from numpy import vstack as np_vstack
 
 from PySide6.QtCore import QObject
 from PySide6.QtCore import Signal as pyqtSignal
 from PySide6.QtCore import Slot as pyqtSlot
-from PySide6.QtWidgets import QApplication
 
+from .derived_channels import DerivedChannels
+from .perf_counters import PipelineCounters
 from .received_structure import PlottingStruct
+from .saver import SaveCancelledError
 from .serial_communication.packets import TimedPacketBase
+from .spectrum import StreamingWelch
 from .simple_console_main_classes import (
     SubplotsReferences,
 )
 
-import time
+# Put in the queue to wake up a worker waiting for packets, when stopping
+_STOP = object()
+
+
+def wait_packets(rx_queue: Queue) -> tuple[list, bool]:
+    """
+    Wait for packets in `rx_queue`, then take all the ones available.
+
+    The wait blocks on the queue, so it uses no CPU while no data arrives.
+    Return the packets and whether the stop marker was found.
+    """
+    packets = [rx_queue.get()]
+    try:
+        while True:
+            packets.append(rx_queue.get_nowait())
+    except Empty:
+        pass
+
+    if any(p is _STOP for p in packets):
+        return [p for p in packets if p is not _STOP], True
+    return packets, False
+
+
+def wake_up(rx_queue: Queue) -> None:
+    """Wake up the worker waiting on `rx_queue`, to let it stop."""
+    try:
+        rx_queue.put_nowait(_STOP)
+    except Full:
+        # The worker is not waiting, it will see that it has to stop
+        pass
 
 
 class DequeueWorker(QObject):
@@ -42,18 +81,19 @@ class DequeueWorker(QObject):
         # debugpy.debug_this_thread()
 
         while self.working:
-            new = False
-            data = []
-            while not self.rx_queue.empty():
-                data.append(self.rx_queue.get(block=False))
-                new = True
-            if new:
+            data, stop = wait_packets(self.rx_queue)
+            if data:
                 self.got_new_packages.emit(data)
-
-            QApplication.processEvents()
+            if stop:
+                break
 
         self.finished.emit()
 
+    def stop(self):
+        """Stop the worker, also if it is waiting for data."""
+        self.working = False
+        wake_up(self.rx_queue)
+
     # def loop(self):
     #     self.manage_packet()
 
@@ -81,6 +121,10 @@ class DequeueAndPlotterWorker(QObject):
 
     subplots_ref: SubplotsReferences
     data_struct: PlottingStruct
+    # Computes the derived fields, not present in the packets
+    derived_channels: DerivedChannels
+    # Counts the batches and the time spent turning them in arrays
+    counters: PipelineCounters
 
     time_window: float
 
@@ -89,12 +133,15 @@ class DequeueAndPlotterWorker(QObject):
         rx_queue: Queue[TimedPacketBase],
         subplots_ref: SubplotsReferences,
         time_window: float = 10,
+        counters: PipelineCounters | None = None,
     ):
         super().__init__()
 
         self.rx_queue = rx_queue
+        self.counters = counters if counters is not None else PipelineCounters()
         self.data_struct = subplots_ref.data_struct
         self.subplots_ref = subplots_ref
+        self.derived_channels = DerivedChannels(self.data_struct)
 
         self.init_data()
         self.working = True
@@ -106,33 +153,23 @@ class DequeueAndPlotterWorker(QObject):
         Initialise the runner function with passed args, kwargs.
         '''
         while self.working:
-            new = False
-            packages = []
-
-            try:
-                # Block for a short time to wait for new data
-                package = self.rx_queue.get(block=True, timeout=0.1)
-                packages.append(package)
-                new = True
-
-                # Drain the rest of the queue
-                while not self.rx_queue.empty():
-                    packages.append(self.rx_queue.get(block=False))
-            except Empty:
-                pass  # timeout occurred
-            except Exception:
-                pass  # some other exception
+            packages, stop = wait_packets(self.rx_queue)
 
-            QApplication.processEvents()
+            if packages:
+                t_start = perf_counter()
+                x_new, y_new = self.get_data_from_packages(packages)
+                self.counters.decode_time += perf_counter() - t_start
+                self.counters.batches += 1
+                self.got_new_data.emit(x_new, y_new)
+            if stop:
+                break
 
-            if not new:
-                # Introduce a small sleep to avoid busy-waiting
-                time.sleep(0.01)
-                continue
-
-            x_new, y_new = self.get_data_from_packages(packages)
+        self.finished.emit()
 
-            self.got_new_data.emit(x_new, y_new)
+    def stop(self):
+        """Stop the worker, also if it is waiting for data."""
+        self.working = False
+        wake_up(self.rx_queue)
 
     def init_data(self) -> None:
         """Initialize `self.y_data_vector` according to `self.data_struct`."""
@@ -148,25 +185,137 @@ class DequeueAndPlotterWorker(QObject):
 
     def get_data_from_packages(
         self, packages: list[TimedPacketBase]
-    ) -> Tuple[list, list[list]]:
+    ) -> Tuple[list, list[np_ndarray]]:
+        """
+        Return the time and the data vectors of `packages`.
+
+        The data of each subplot is gathered in a single contiguous
+        `(n_samples, n_fields)` array, returned transposed so that its
+        rows are the data vectors of the fields.
+        The derived fields are computed here, off the GUI thread.
+        """
         x = [p.time for p in packages]
 
-        y = [[[] for _ in range(len(sp))] for sp in self.data_struct.subplots]
+        y = [
+            np_array([p.data[ax_i] for p in packages], dtype=np_float64).T
+            for ax_i in range(len(self.data_struct))
+        ]
 
-        num_subplots: int = len(self.data_struct)
+        return x, self.derived_channels.evaluate(y)
 
-        for package in packages:
-            for ax_i in range(num_subplots):
-                for i, data_aa in enumerate(package.data[ax_i]):
-                    y[ax_i][i].append(data_aa)
+    def update_plot_structs(self, subplots_ref) -> None:
+        """
+        Update the plots, and the data structure if it is a new one.
+
+        The state of the filters of the derived fields is kept, unless the
+        data structure changed.
+        """
+        if subplots_ref.data_struct is not self.data_struct:
+            self.data_struct = subplots_ref.data_struct
+            self.derived_channels = DerivedChannels(self.data_struct)
+        self.subplots_ref = subplots_ref
 
-        for y_i, yy in enumerate(y):
-            for y_ii, yyy in enumerate(yy):
-                y[y_i][y_ii] = np_array(yyy)  # type: ignore
 
-        return x, y
+class SaveWorker(QObject):
+    """
+    Worker that saves the data to a file, off the GUI thread.
 
-    def update_plot_structs(self, subplots_ref) -> None:
-        """Update the data structure with a new one."""
-        self.data_struct = subplots_ref.data_struct
-        self.subplots_ref = subplots_ref
+    `save_fcn` is one of the save functions of the `saver` module with all
+    the arguments already bound, except `progress`.
+    The data given to it should be a snapshot, that is not modified while
+    the worker runs.
+    The event loop of the worker thread is busy while saving, so `cancel()`
+    must be called directly, not through a queued connection.
+    """
+
+    progress = pyqtSignal(float)
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+    save_fcn: Callable
+    filepath: str
+    # Set from another thread to stop the save
+    cancel_event: Event
+
+    def __init__(self, save_fcn: Callable, filepath: str):
+        super().__init__()
+
+        self.save_fcn = save_fcn
+        self.filepath = filepath
+        self.cancel_event = Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Return whether the save was asked to stop."""
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Request the save to stop as soon as possible, from any thread."""
+        self.cancel_event.set()
+
+    def on_progress(self, fraction: float):
+        """Forward the progress, interrupting the save if cancelled."""
+        if self.cancel_requested:
+            raise SaveCancelledError
+        self.progress.emit(fraction)
+
+    @pyqtSlot()
+    def run(self):
+        """Save the data, emitting the outcome before `finished`."""
+        try:
+            self.save_fcn(progress=self.on_progress)
+            self.saved.emit(self.filepath)
+        except SaveCancelledError:
+            # Do not leave a partially written file around
+            if os.path.isfile(self.filepath):
+                os.remove(self.filepath)
+            self.cancelled.emit()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.failed.emit(e)
+
+        self.finished.emit()
+
+
+class SpectrumWorker(QObject):
+    """
+    Worker that estimates the spectrum of a subplot, off the GUI thread.
+
+    It lives in a thread running its event loop, and `append()` is
+    connected to the `got_new_data` signal of the dequeuing worker.
+    The estimate is emitted at most every `min_interval` seconds, and only
+    if new segments were transformed since the last one.
+    """
+
+    updated = pyqtSignal(object, object)
+
+    subplot_index: int
+    spectrum: StreamingWelch
+    min_interval: float
+
+    def __init__(
+        self, subplot_index: int, n_fields: int, min_interval: float = 0.1
+    ):
+        """Estimate the spectrum of the `n_fields` of a subplot."""
+        super().__init__()
+
+        self.subplot_index = subplot_index
+        self.spectrum = StreamingWelch(n_fields)
+        self.min_interval = min_interval
+
+        self._changed = False
+        self._last_emit = 0.0
+
+    @pyqtSlot(object, object)
+    def append(self, x_new, y_new: list[np_ndarray]):
+        """Append the new data, emitting the estimate."""
+        columns = np_vstack([x_new, y_new[self.subplot_index]])
+        if self.spectrum.append(columns):
+            self._changed = True
+
+        now = monotonic()
+        if self._changed and now - self._last_emit >= self.min_interval:
+            self._changed = False
+            self._last_emit = now
+            self.updated.emit(self.spectrum.frequencies, self.spectrum.psd)
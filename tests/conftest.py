@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from clab_datalogger_receiver.received_structure import PlottingStruct
+
+
+@pytest.fixture
+def make_test_data():
+    """
+    Return a factory of the data of `test_struct_cfg_multiple.yaml`.
+
+    The factory returns the structure and `n` samples, `dt` seconds apart
+    from `t_start`.
+    The field `f_i` of the subplot `sp_i` is `sin(x * (sp_i + 1) + f_i)`,
+    or just its argument if `linear`, so that its values are easy to tell.
+    """
+
+    def make(
+        n: int = 1000,
+        t_start: float = 0.0,
+        dt: float = 0.01,
+        linear: bool = False,
+    ):
+        data_struct = PlottingStruct.from_yaml_file(
+            'tests/test_struct_cfg_multiple.yaml'
+        )
+        x = t_start + np.arange(n) * dt
+        wave = (lambda v: v) if linear else np.sin
+        y = [
+            [wave(x * (sp_i + 1) + f_i) for f_i in range(len(sp))]
+            for sp_i, sp in enumerate(data_struct.subplots)
+        ]
+        return data_struct, x, y
+
+    return make
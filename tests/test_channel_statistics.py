@@ -0,0 +1,51 @@
+import numpy as np
+
+from clab_datalogger_receiver.channel_statistics import (
+    SessionStatistics,
+    WindowStatistics,
+)
+
+
+def get_test_columns(n: int = 20_000):
+    rng = np.random.default_rng(0)
+    x = np.arange(n) * 0.001
+    columns = np.vstack([x, rng.normal(5, 2, n) + 1e6, rng.normal(0, 1, n)])
+    columns[2, ::7] = np.nan
+    return columns
+
+
+def test_session_statistics_match_whole_data():
+    columns = get_test_columns()
+    statistics = SessionStatistics(2)
+    for start in range(0, columns.shape[1], 97):
+        statistics.append(columns[:, start : start + 97])
+
+    values = columns[1:]
+    stats = statistics.stats
+    assert np.allclose(stats.get_mean(), np.nanmean(values, axis=1))
+    assert np.allclose(stats.std, np.nanstd(values, axis=1, ddof=1))
+    assert np.allclose(stats.rms, np.sqrt(np.nanmean(values**2, axis=1)))
+    assert np.array_equal(stats.min, np.nanmin(values, axis=1))
+    assert np.array_equal(stats.max, np.nanmax(values, axis=1))
+    assert np.isclose(statistics.rates[0], 1000)
+
+
+def test_window_statistics_follow_the_window():
+    columns = get_test_columns()
+    statistics = WindowStatistics(2, duration=2.0)
+    for start in range(0, columns.shape[1], 97):
+        statistics.append(columns[:, start : start + 97])
+
+        # The window holds whole batches, covering the last 2 s
+        t_last = columns[0, min(start + 96, columns.shape[1] - 1)]
+        assert statistics.t_last == t_last
+        assert t_last - 2.0 - 0.097 < statistics.t_first <= t_last - 2.0 or (
+            statistics.t_first == 0
+        )
+
+        first = int(np.searchsorted(columns[0], statistics.t_first))
+        values = columns[1:, first : start + 97]
+        stats = statistics.stats
+        assert np.allclose(stats.get_mean(), np.nanmean(values, axis=1))
+        assert np.allclose(stats.std, np.nanstd(values, axis=1, ddof=1))
+        assert np.array_equal(stats.max, np.nanmax(values, axis=1))
@@ -0,0 +1,94 @@
+import numpy as np
+
+from clab_datalogger_receiver.decimation import (
+    MinMaxPyramid,
+    StreamingMinMaxDecimator,
+    minmax_decimate,
+    minmax_reduce,
+)
+
+
+def test_minmax_keeps_spikes():
+    n = 100_000
+    columns = np.vstack([np.arange(n) * 0.001, np.zeros(n), np.zeros(n)])
+    columns[1, 12345] = 50.0
+    columns[2, 54321] = -50.0
+
+    decimated = minmax_decimate(columns, 500)
+    assert decimated.shape == (3, 1000)
+    assert decimated[1].max() == 50.0
+    assert decimated[2].min() == -50.0
+    assert np.all(np.diff(decimated[0]) >= 0)
+
+    small = columns[:, :800]
+    assert minmax_decimate(small, 500) is small
+
+
+def test_streaming_matches_whole_range():
+    n = 5000
+    x = np.arange(n) * 0.001
+    columns = np.vstack([x, np.sin(x * 7), np.cos(x * 3)])
+    columns[2, 1234] = 9.0
+
+    decimator = StreamingMinMaxDecimator(3, bucket_width=0.05, capacity=200)
+    for start in range(0, n, 33):
+        decimator.append(columns[:, start : start + 33])
+
+    starts = np.flatnonzero(np.diff(np.floor(x / 0.05), prepend=-1))
+    expected = minmax_reduce(columns, starts)
+    assert np.array_equal(decimator.view(), expected)
+    assert decimator.view()[2].max() == 9.0
+
+    # Only the buckets from the requested time, and the one before it
+    assert decimator.view(t_start=4.0)[0, 0] == 3.95
+
+
+def test_pyramid_envelope_of_growing_session():
+    n = 100_003
+    x = np.arange(n) * 0.001
+    columns = np.vstack([x, np.sin(x * 7)])
+    columns[1, 76543] = 20.0
+
+    pyramid = MinMaxPyramid(2, base_rows=16, factor=4)
+    for start in range(0, n, 1000):
+        pyramid.append(columns[:, start : start + 1000])
+
+    # The coarsest level holds the whole session in a few buckets
+    assert pyramid.levels[-1].size < pyramid.factor
+    for level in pyramid.levels:
+        assert np.all(np.diff(level.points[0]) >= 0)
+
+    envelope = pyramid.envelope(-np.inf, np.inf, 50)
+    assert envelope.shape[1] <= 2 * (50 + 2 + 3 * len(pyramid.levels) + 1)
+    assert envelope[0, 0] == x[0]
+    assert envelope[0, -1] == x[-1]
+    assert envelope[1].max() == 20.0
+    assert envelope[1].min() == columns[1].min()
+
+    # A narrow range is read from a finer level
+    narrow = pyramid.envelope(76.0, 77.0, 100)
+    assert narrow[0, 0] <= 76.0 and narrow[0, -1] >= 77.0
+    assert narrow[0, -1] < 78.0
+    assert narrow[1].max() == 20.0
+
+
+def test_streaming_extremes_of_sliding_window():
+    n = 20_000
+    x = np.arange(n) * 0.001
+    columns = np.vstack([x, np.sin(x * 3) * x, np.full(n, np.nan)])
+    columns[1, 4321] = 100.0
+
+    decimator = StreamingMinMaxDecimator(3, bucket_width=0.01, capacity=300)
+    for start in range(0, n, 77):
+        decimator.append(columns[:, start : start + 77])
+
+        t_start = x[min(start + 76, n - 1)] - 2.0
+        mins, maxs = decimator.extremes(t_start)
+
+        # The buckets overlapping the window, and the last samples
+        first = int(np.searchsorted(x, np.floor(t_start / 0.01) * 0.01))
+        window = columns[1, max(0, first) : start + 77]
+        assert mins[0] == window.min() and maxs[0] == window.max()
+        assert np.isnan(mins[1]) and np.isnan(maxs[1])
+
+    assert len(decimator.window) <= decimator.points.capacity // 2
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from clab_datalogger_receiver.derived_channels import (
+    DerivedChannels,
+    DerivedExpressionError,
+    parse_expression,
+)
+from clab_datalogger_receiver.filters import StreamingFilter, design_lowpass
+from clab_datalogger_receiver.received_structure import PlottingStruct
+
+
+def get_test_struct(norm_expression: str = 'sqrt(a_x**2 + a_y**2 + a_z**2)'):
+    return PlottingStruct.from_config_list(
+        [
+            {
+                'accel_data': {
+                    'a_x': 'float',
+                    'a_norm': norm_expression,
+                    'a_y': 'float',
+                    'a_z': 'float',
+                }
+            },
+            {
+                'misc_data': {
+                    'a': 'double',
+                    'scaled': '2 * accel_data.a_norm + a',
+                    'two_pi': '2 * pi',
+                }
+            },
+        ]
+    )
+
+
+def test_derived_fields_are_not_received():
+    data_struct = get_test_struct()
+
+    assert data_struct.struct_format_string == ['fff', 'd']
+    assert data_struct.subplots[0].fields[1].derived
+    assert (
+        PlottingStruct.from_config_list(
+            data_struct.to_config_list()
+        ).to_config_list()
+        == data_struct.to_config_list()
+    )
+
+
+def test_evaluate_derived_fields():
+    data_struct = get_test_struct('sqrt(a_z**2 + a_y**2 + a_x**2)')
+    derived = DerivedChannels(data_struct)
+    assert len(derived) == 3
+
+    rng = np.random.default_rng(0)
+    received = [rng.normal(size=(3, 50)), rng.normal(size=(1, 50))]
+    y_data = derived.evaluate(received)
+
+    assert y_data[0].shape == (4, 50)
+    assert np.array_equal(y_data[0][[0, 2, 3]], received[0])
+    assert np.allclose(y_data[0][1], np.linalg.norm(received[0], axis=0))
+    assert np.allclose(y_data[1][1], 2 * y_data[0][1] + received[1][0])
+    assert np.all(y_data[1][2] == 2 * np.pi)
+
+
+@pytest.mark.parametrize(
+    'expression',
+    [
+        '__import__("os")',
+        'a_x.__class__',
+        'np.sqrt(a_x)',
+        '[a_x for a_x in a_y]',
+        'lambda: a_x',
+        'a_x if a_y else a_z',
+        '0 < a_x < 1',
+        'sqrt(a_x',
+        'unknown_field + 1',
+        'a_norm + 1',
+    ],
+)
+def test_invalid_expressions_are_rejected(expression: str):
+    with pytest.raises(DerivedExpressionError):
+        DerivedChannels(get_test_struct(expression))
+
+
+def test_filters_keep_their_state():
+    data_struct = PlottingStruct.from_config_list(
+        [
+            {
+                'motor': {
+                    'current': 'float',
+                    'current_lp': 'lowpass(current, 20, 1000)',
+                    'current_avg': 'moving_average(2 * current, 4)',
+                }
+            }
+        ]
+    )
+    derived = DerivedChannels(data_struct)
+
+    rng = np.random.default_rng(0)
+    current = rng.normal(size=(1, 1000))
+    y_data = np.hstack(
+        [
+            derived.evaluate([current[:, i : i + 30]])[0]
+            for i in range(0, 1000, 30)
+        ]
+    )
+
+    assert np.allclose(
+        y_data[1], StreamingFilter(*design_lowpass(20, 1000))(current[0])
+    )
+    assert np.allclose(
+        y_data[2][3:], np.convolve(2 * current[0], np.ones(4) / 4, 'valid')
+    )
+
+
+def test_same_filters_are_applied_together():
+    data_struct = PlottingStruct.from_config_list(
+        [
+            {'a': {'x': 'float', 'x_lp': 'lowpass(x, 50, 1000)'}},
+            {'b': {'y': 'float', 'y_lp': 'lowpass(y, 50, 1000)'}},
+        ]
+    )
+    derived = DerivedChannels(data_struct)
+
+    rng = np.random.default_rng(0)
+    received = [rng.normal(size=(1, 300)), rng.normal(size=(1, 300))]
+    y_data = [
+        np.hstack(rows)
+        for rows in zip(
+            *[
+                derived.evaluate([r[:, i : i + 7] for r in received])
+                for i in range(0, 300, 7)
+            ]
+        )
+    ]
+
+    for sp_y, sp_received in zip(y_data, received):
+        assert np.allclose(
+            sp_y[1],
+            StreamingFilter(*design_lowpass(50, 1000))(sp_received[0]),
+        )
+
+
+@pytest.mark.parametrize(
+    'expression',
+    ['lowpass(a_x, a_y, 1000)', 'lowpass(a_x, 600, 1000)', 'notch()'],
+)
+def test_invalid_filters_are_rejected(expression: str):
+    with pytest.raises(DerivedExpressionError):
+        DerivedChannels(get_test_struct(expression))
+
+
+def test_parse_expression_accepts_arithmetic():
+    parse_expression('hypot(a_x, a_y) * (a_z > 0) - -1.5 ** 2')
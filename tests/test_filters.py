@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from scipy.signal import lfilter
+
+from clab_datalogger_receiver.filters import (
+    FILTER_DESIGNS,
+    StreamingFilter,
+    design_lowpass,
+    design_notch,
+)
+
+
+@pytest.mark.parametrize(
+    'name, params',
+    [
+        ('lowpass', (20, 1000, 4)),
+        ('highpass', (5, 1000)),
+        ('bandpass', (10, 100, 1000)),
+        ('notch', (50, 1000)),
+        ('moving_average', (8,)),
+    ],
+)
+def test_streaming_filter_matches_whole_stream(name, params):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(3, 2000))
+
+    b, a = FILTER_DESIGNS[name](*params)
+    streaming = StreamingFilter(b, a)
+    filtered = np.hstack(
+        [streaming(values[:, i : i + 37]) for i in range(0, 2000, 37)]
+    )
+
+    whole = StreamingFilter(b, a)(values)
+    assert np.allclose(filtered, whole)
+    # The initial state changes only the start of the output
+    assert np.allclose(
+        filtered[:, -100:], lfilter(b, a, values)[:, -100:], atol=1e-4
+    )
+
+
+def test_streaming_filter_starts_at_steady_state():
+    streaming = StreamingFilter(*design_lowpass(20, 1000))
+    assert np.allclose(streaming(np.full(50, 3.0)), 3.0)
+
+
+def test_streaming_filter_recovers_after_nan():
+    streaming = StreamingFilter(*design_notch(50, 1000))
+    streaming(np.array([1.0, np.nan, 2.0]))
+    assert np.all(np.isfinite(streaming(np.ones(10))))
+
+
+def test_nan_resets_only_its_channel():
+    t = np.arange(1000) / 1000
+    values = np.vstack([np.sin(2 * np.pi * 5 * t), np.cos(2 * np.pi * 5 * t)])
+    values[0, 300] = np.nan
+
+    bank = StreamingFilter(*design_lowpass(20, 1000))
+    alone = StreamingFilter(*design_lowpass(20, 1000))
+    filtered = np.hstack(
+        [bank(values[:, i : i + 50]) for i in range(0, 1000, 50)]
+    )
+    filtered_alone = np.hstack(
+        [alone(values[1, i : i + 50]) for i in range(0, 1000, 50)]
+    )
+
+    assert np.allclose(filtered[1], filtered_alone)
+    # The channel with the NaN starts again at the next batch
+    assert np.all(np.isfinite(filtered[0, 350:]))
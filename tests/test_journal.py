@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from clab_datalogger_receiver.journal import (
+    JOURNAL_FILENAME,
+    LOCK_FILENAME,
+    SessionJournal,
+    find_unfinished_sessions,
+    is_session_locked,
+    recover_journal,
+)
+from clab_datalogger_receiver.received_structure import PlottingStruct
+from clab_datalogger_receiver.session_format import SessionReader
+
+
+def test_recover_truncated_journal(tmp_path):
+    data_struct = PlottingStruct.from_yaml_file(
+        'tests/test_struct_cfg_multiple.yaml'
+    )
+    session_dir = tmp_path / 'session_crashed'
+    session_dir.mkdir()
+    journal_path = str(session_dir / JOURNAL_FILENAME)
+
+    x = np.arange(300) * 0.01
+    y = [
+        [np.cos(x + f_i) for f_i in range(len(sp))]
+        for sp in data_struct.subplots
+    ]
+
+    journal = SessionJournal(journal_path, data_struct, sync_interval=0)
+    for start in range(0, len(x), 100):
+        journal.append(
+            x[start : start + 100],
+            [[y_f[start : start + 100] for y_f in y_sp] for y_sp in y],
+        )
+    journal.close(remove=False)
+    assert journal.error is None
+
+    # Simulate a crash while writing the last chunk
+    with open(journal_path, 'r+b') as f:
+        f.truncate(os.path.getsize(journal_path) - 10)
+
+    assert find_unfinished_sessions(str(tmp_path)) == [str(session_dir)]
+    assert not find_unfinished_sessions(
+        str(tmp_path), exclude=[str(session_dir)]
+    )
+
+    recovered_path = str(tmp_path / 'recovered.clabs')
+    n_recovered = recover_journal(journal_path, recovered_path)
+    assert 0 < n_recovered < len(x)
+
+    x_read, y_read = SessionReader(recovered_path).read_range()
+    assert np.array_equal(x_read, x[:n_recovered])
+    assert np.array_equal(y_read[1][0], y[1][0][:n_recovered])
+
+
+def test_running_session_is_not_unfinished(tmp_path):
+    data_struct = PlottingStruct.from_yaml_file(
+        'tests/test_struct_cfg_multiple.yaml'
+    )
+    session_dir = tmp_path / 'session_running'
+    session_dir.mkdir()
+
+    journal = SessionJournal(
+        str(session_dir / JOURNAL_FILENAME), data_struct, sync_interval=0
+    )
+    assert is_session_locked(str(session_dir))
+    assert not find_unfinished_sessions(str(tmp_path))
+
+    journal.close(remove=False)
+    assert not is_session_locked(str(session_dir))
+    assert find_unfinished_sessions(str(tmp_path)) == [str(session_dir)]
+
+
+def test_lock_of_crashed_process_is_released(tmp_path):
+    session_dir = tmp_path / 'session_crashed'
+    session_dir.mkdir()
+    (session_dir / JOURNAL_FILENAME).write_bytes(b'')
+
+    # The process ends without releasing the lock
+    subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            'import os; from clab_datalogger_receiver.journal import '
+            f'lock_session; lock_session({str(session_dir)!r}); os._exit(1)',
+        ],
+        check=False,
+    )
+
+    assert (session_dir / LOCK_FILENAME).is_file()
+    assert not is_session_locked(str(session_dir))
+    assert find_unfinished_sessions(str(tmp_path)) == [str(session_dir)]
@@ -0,0 +1,89 @@
+import struct
+
+from queue import Queue
+
+import numpy as np
+
+from cobs import cobs
+
+from clab_datalogger_receiver.perf_counters import (
+    PipelineCounters,
+    PipelineRates,
+)
+from clab_datalogger_receiver.received_structure import PlottingStruct
+from clab_datalogger_receiver.serial_communication._packetizers import (
+    TurtlebotThreadedConnection,
+)
+
+
+def test_rates_between_samples():
+    previous = PipelineCounters(
+        received_packets=100,
+        dropped_packets=1,
+        batches=10,
+        decode_time=0.01,
+        frames=5,
+        update_axis_time=0.02,
+    )
+    current = PipelineCounters(
+        received_packets=600,
+        dropped_packets=3,
+        queue_stalls=2,
+        batches=20,
+        decode_time=0.03,
+        frames=20,
+        update_axis_time=0.08,
+    )
+
+    rates = PipelineRates.from_counters(previous, current, 0.5, 7)
+
+    assert rates.packet_rate == 1000
+    assert rates.dropped_packets == 3
+    assert rates.drop_rate == 4
+    assert rates.queue_stalls == 2
+    assert rates.queue_depth == 7
+    assert np.isclose(rates.decode_ms, 2)
+    assert rates.render_fps == 30
+    assert np.isclose(rates.update_axis_ms, 4)
+    assert 'FPS' in rates.format()
+
+
+def test_rates_without_batches():
+    counters = PipelineCounters()
+
+    rates = PipelineRates.from_counters(counters, counters.snapshot(), 1, 0)
+
+    assert np.isnan(rates.decode_ms)
+    assert np.isnan(rates.update_axis_ms)
+    assert rates.render_fps == 0
+    assert '-' in rates.format()
+
+
+def test_snapshot_is_a_copy():
+    counters = PipelineCounters()
+    snapshot = counters.snapshot()
+
+    counters.frames += 1
+
+    assert snapshot.frames == 0
+
+
+def test_packetizer_counts_packets():
+    data_struct = PlottingStruct.from_yaml_file(
+        'tests/test_struct_cfg_single.yaml'
+    )
+    counters = PipelineCounters()
+    rx_queue = Queue(maxsize=1)
+    connection = TurtlebotThreadedConnection(
+        data_struct, rx_queue, counters=counters
+    )
+
+    packet = cobs.encode(struct.pack('<5f', *range(5)))
+    connection.handle_packet(packet)
+    # Wrong size and invalid COBS encoding
+    connection.handle_packet(cobs.encode(b'\x01\x02'))
+    connection.handle_packet(b'\x00\x00')
+
+    assert counters.received_packets == 1
+    assert counters.dropped_packets == 2
+    assert rx_queue.get_nowait().data == [tuple(float(v) for v in range(5))]
@@ -1,3 +1,5 @@
+import pytest
+
 from clab_datalogger_receiver.received_structure import (
     DataStruct,
     PlottingStruct,
@@ -45,6 +47,17 @@ def test_from_dict():
     assert confront_datastructs(t, t_test)
 
 
+def test_from_dict_unknown_type():
+    with pytest.raises(ValueError, match='flaot'):
+        DataStruct.from_dict({'a': 'flaot'})
+    with pytest.raises(ValueError, match='unsigned lon'):
+        DataStruct.from_dict({'a': 'unsigned lon'})
+
+    # A copy of another field is an expression
+    t = DataStruct.from_dict({'a': 'float', 'b': 'a', 'c': '2 * a'})
+    assert [f.expression for f in t.fields] == [None, 'a', '2 * a']
+
+
 def test_from_yaml_single():
     t = PlottingStruct(
         [
@@ -75,3 +88,14 @@ def test_from_yaml_single():
         )
         for (a, b) in zip(t.subplots, t2.subplots)
     )
+
+
+def test_config_list_roundtrip():
+    t = PlottingStruct.from_yaml_file('tests/test_struct_cfg_multiple.yaml')
+
+    config = t.to_config_list()
+    assert config == [
+        {'accel_data': {'a_x': 'f', 'a_y': 'f', 'a_z': 'f'}},
+        {'misc_data': {'a': 'f', 'b': 'f'}},
+    ]
+    assert confront_plotting_struct(PlottingStruct.from_config_list(config), t)
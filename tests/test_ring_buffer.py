@@ -0,0 +1,39 @@
+import numpy as np
+
+from clab_datalogger_receiver.ring_buffer import RingBuffer
+
+
+def test_views_are_contiguous_and_stable():
+    buffer = RingBuffer(2, capacity=8)
+    data = np.vstack([np.arange(30.0), -np.arange(30.0)])
+
+    buffer.append(data[:, :5])
+    buffer.append(data[:, 5:11])
+    assert len(buffer) == 8
+    assert np.array_equal(buffer.view(), data[:, 3:11])
+
+    last = buffer.view(4)
+    assert last[0].flags.c_contiguous
+    assert np.array_equal(last, data[:, 7:11])
+
+    # The view of 4 samples survives other 4 appended
+    buffer.append(data[:, 11:15])
+    assert np.array_equal(last, data[:, 7:11])
+    assert np.array_equal(buffer.view(), data[:, 7:15])
+
+    # Batches bigger than the capacity keep the last samples
+    buffer.append(data[:, 15:30])
+    assert np.array_equal(buffer.view(), data[:, 22:30])
+
+
+def test_resize_keeps_last_samples():
+    buffer = RingBuffer(1, capacity=4)
+    buffer.append(np.arange(6.0)[None])
+
+    buffer.resize(10)
+    assert np.array_equal(buffer.view()[0], [2, 3, 4, 5])
+    buffer.append(np.arange(6.0, 12.0)[None])
+    assert np.array_equal(buffer.view()[0], np.arange(2.0, 12.0))
+
+    buffer.resize(3)
+    assert np.array_equal(buffer.view()[0], [9, 10, 11])
@@ -0,0 +1,81 @@
+import numpy as np
+
+from clab_datalogger_receiver.rotation import (
+    SegmentRecorder,
+    find_segments,
+    read_manifest,
+    save_segmented,
+    split_segments,
+)
+from clab_datalogger_receiver.session_format import SessionReader
+
+
+def test_split_by_duration_and_rows(make_test_data):
+    _, x, _ = make_test_data(t_start=0.5)
+
+    bounds = split_segments(x, segment_duration=2.0, max_rows=150)
+    assert bounds[0] == (0, 150)
+    assert bounds[1] == (150, 200)
+    # No gap nor overlap between the segments
+    assert all(b[1] == a[0] for b, a in zip(bounds[:-1], bounds[1:]))
+    assert bounds[-1][1] == len(x)
+    for start, end in bounds:
+        assert x[end - 1] - x[start] < 2.0
+
+
+def test_recorded_segments_match_data(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data(t_start=0.5)
+    base_path = str(tmp_path / 'rec')
+
+    recorder = SegmentRecorder(
+        base_path, 'session', data_struct, segment_duration=3.0
+    )
+    for end in range(37, len(x) + 37, 37):
+        recorder.update(x[:end], [[y_f[:end] for y_f in y_sp] for y_sp in y])
+    recorder.update(x, y, final=True)
+    assert recorder.close() == []
+
+    manifest = read_manifest(base_path)
+    assert manifest['complete']
+    assert [s['file'] for s in manifest['segments']] == [
+        f'rec_{i:04d}.clabs' for i in range(4)
+    ]
+
+    x_read = np.concatenate(
+        [
+            SessionReader(str(tmp_path / s['file'])).read_range()[0]
+            for s in manifest['segments']
+        ]
+    )
+    assert np.array_equal(x_read, x)
+
+    segment = find_segments(manifest, 4.0, 4.1)
+    assert [s['index'] for s in segment] == [1]
+
+
+def test_save_segmented_by_size(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data(t_start=0.5)
+    base_path = str(tmp_path / 'out')
+
+    # 6 columns of 8 bytes, so 100 rows per segment
+    segments = save_segmented(
+        data_struct, x, y, base_path, 'parquet', max_segment_bytes=4800
+    )
+    assert len(segments) == 10
+    assert sum(s['n_rows'] for s in segments) == len(x)
+    assert segments == read_manifest(base_path)['segments']
+
+
+def test_finish_reports_progress(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data(t_start=0.5)
+    base_path = str(tmp_path / 'rec')
+
+    recorder = SegmentRecorder(
+        base_path, 'session', data_struct, segment_duration=3.0
+    )
+    recorder.update(x, y, final=True)
+    fractions = []
+    recorder.finish(progress=fractions.append)
+
+    assert fractions == [0.25, 0.5, 0.75, 1.0]
+    assert read_manifest(base_path)['complete']
@@ -0,0 +1,170 @@
+import numpy as np
+import pytest
+
+from scipy.io import loadmat
+
+from clab_datalogger_receiver.saver import (
+    build_arrow_table,
+    compare_mat_data,
+    get_column_names,
+    save_as_arrow,
+    save_as_mat,
+    save_as_mat_v73,
+    save_as_session,
+    verify_saved_file,
+)
+
+
+def test_column_names(make_test_data):
+    data_struct, _, _ = make_test_data(10, dt=1.0, linear=True)
+
+    assert get_column_names(data_struct) == [
+        'time',
+        'accel_data_a_x',
+        'accel_data_a_y',
+        'accel_data_a_z',
+        'misc_data_a',
+        'misc_data_b',
+    ]
+
+
+def test_arrow_export_roundtrip(tmp_path, make_test_data):
+    pytest.importorskip('pyarrow')
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.feather as pf
+    import pyarrow.parquet as pq
+
+    data_struct, x, y = make_test_data(10, dt=1.0, linear=True)
+    y[1][1] = y[1][1][:7]
+
+    table = build_arrow_table(data_struct, x, y)
+    # Columns are wrapped, not copied
+    assert np.shares_memory(table.column('time').chunk(0).to_numpy(), x)
+    assert table.column('misc_data_b').null_count == 3
+
+    parquet_path = str(tmp_path / 'out.parquet')
+    save_as_arrow(data_struct, x, y, parquet_path, row_group_size=4)
+    assert pq.ParquetFile(parquet_path).metadata.num_row_groups == 3
+    assert pq.read_table(parquet_path).equals(table)
+
+    feather_path = str(tmp_path / 'out.feather')
+    save_as_arrow(data_struct, x, y, feather_path, file_format='feather')
+    assert pf.read_table(feather_path).equals(table)
+
+
+def test_mat_v73_layout(tmp_path, make_test_data):
+    pytest.importorskip('h5py')
+    # pylint: disable=import-outside-toplevel
+    import h5py
+
+    data_struct, x, y = make_test_data(10, dt=1.0, linear=True)
+
+    mat_path = str(tmp_path / 'out.mat')
+    save_as_mat_v73(data_struct, x, y, mat_path, chunk_rows=4)
+
+    with open(mat_path, 'rb') as file:
+        header = file.read(128)
+    assert header.startswith(b'MATLAB 7.3 MAT-file')
+    assert header.endswith(b'\x00\x02IM')
+
+    with h5py.File(mat_path, 'r') as file:
+        group = file['turtlebot_data']
+        assert group.attrs['MATLAB_class'] == b'struct'
+        # HDF5 dimensions are reversed in MATLAB, like `savemat` layout
+        assert np.array_equal(group['time'][:, 0], x)
+        assert np.array_equal(group['accel_data'][:].T, np.array(y[0]))
+        assert np.array_equal(group['misc_data'][:].T, np.array(y[1]))
+
+        names = group['field_names/accel_data'][:].T
+        assert [''.join(map(chr, row)) for row in names] == [
+            'a_x',
+            'a_y',
+            'a_z',
+        ]
+
+
+def corrupt_value(filepath: str, value: float):
+    with open(filepath, 'r+b') as file:
+        content = file.read()
+        pos = content.index(np.float64(value).tobytes())
+        file.seek(pos)
+        file.write(np.float64(-value).tobytes())
+
+
+def test_mat_v5_check_data(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data(10, dt=1.0, linear=True)
+    mat_path = str(tmp_path / 'out.mat')
+    save_as_mat(data_struct, x, y, mat_path, check_data=True)
+
+    saved = {
+        'turtlebot_data': {
+            'time': x,
+            'field_names': {'accel_data': ['a_x', 'a_y', 'a_z']},
+            'accel_data': y[0],
+        }
+    }
+    loaded = loadmat(mat_path)
+    loaded['turtlebot_data'][0, 0]['accel_data'][2, 3] = -1
+    corrupted = compare_mat_data(saved, loaded)
+    assert [str(c) for c in corrupted] == ['accel_data.a_z, from 0 s to 9 s']
+
+
+@pytest.mark.parametrize('extension', ['mat', 'feather', 'parquet', 'clabs'])
+def test_verify_reports_corrupted_chunk(tmp_path, extension, make_test_data):
+    pytest.importorskip('pyarrow')
+    pytest.importorskip('h5py')
+
+    data_struct, x, y = make_test_data(10, dt=1.0, linear=True)
+    y[1][0][5] = 1234.5678
+    path = str(tmp_path / f'out.{extension}')
+
+    if extension == 'mat':
+        save_as_mat_v73(
+            data_struct,
+            x,
+            y,
+            path,
+            compression_level=None,
+            chunk_rows=4,
+            check_data=True,
+        )
+    elif extension in ('feather', 'parquet'):
+        save_as_arrow(
+            data_struct,
+            x,
+            y,
+            path,
+            file_format=extension,
+            compression='none',
+            row_group_size=4,
+            check_data=True,
+        )
+    else:
+        save_as_session(data_struct, x, y, path, chunk_rows=4, check_data=True)
+
+    assert verify_saved_file(path) == []
+
+    corrupt_value(path, 1234.5678)
+    corrupted = verify_saved_file(path)
+    assert [(c.channel, c.t_start, c.t_end) for c in corrupted] == [
+        ('misc_data.a', 4.0, 7.0)
+    ]
+
+
+@pytest.mark.parametrize('extension', ['mat', 'feather', 'parquet'])
+def test_verify_channels_shorter_than_time(tmp_path, extension, make_test_data):
+    pytest.importorskip('pyarrow')
+    pytest.importorskip('h5py')
+
+    data_struct, x, y = make_test_data(10, dt=1.0, linear=True)
+    y[1][1] = y[1][1][:3]
+    path = str(tmp_path / f'out.{extension}')
+
+    if extension == 'mat':
+        save_as_mat_v73(data_struct, x, y, path, chunk_rows=4)
+    else:
+        save_as_arrow(
+            data_struct, x, y, path, file_format=extension, row_group_size=4
+        )
+
+    assert verify_saved_file(path) == []
@@ -0,0 +1,96 @@
+import numpy as np
+
+from clab_datalogger_receiver.session_format import (
+    SessionReader,
+    SessionWriter,
+    columns_from_data,
+    slice_data,
+    split_columns,
+)
+
+
+def test_roundtrip_in_batches(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data()
+    path = str(tmp_path / 'session.clabs')
+
+    with SessionWriter(path, data_struct, chunk_rows=128) as writer:
+        for start in range(0, len(x), 37):
+            writer.append(
+                x[start : start + 37],
+                [[y_f[start : start + 37] for y_f in y_sp] for y_sp in y],
+            )
+
+    reader = SessionReader(path)
+    assert len(reader) == len(x)
+    assert all(c['n_rows'] == 128 for c in reader.index[:-1])
+    assert reader.data_struct.to_config_list() == data_struct.to_config_list()
+
+    x_read, y_read = reader.read_range()
+    assert np.array_equal(x_read, x)
+    for y_sp_read, y_sp in zip(y_read, y):
+        for y_f_read, y_f in zip(y_sp_read, y_sp):
+            assert np.array_equal(y_f_read, y_f)
+
+    assert reader.index[2]['t_min'] == x[256]
+    assert reader.index[2]['t_max'] == x[383]
+    assert reader.chunk_min[2, 1] == y[0][0][256:384].min()
+    assert reader.chunk_max[2, 1] == y[0][0][256:384].max()
+    assert reader.read_chunk(2).flags.aligned
+
+
+def test_time_range_reads_only_needed_chunks(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data()
+    path = str(tmp_path / 'session.clabs')
+
+    with SessionWriter(path, data_struct, chunk_duration=1.0) as writer:
+        writer.append(x, y)
+
+    reader = SessionReader(path)
+    assert len(reader.index) == 10
+
+    t_start, t_end = x[250], x[420]
+    assert list(reader.find_chunks(t_start, t_end)) == [2, 3, 4]
+
+    x_read, y_read = reader.read_range(t_start, t_end)
+    assert np.array_equal(x_read, x[250:421])
+    assert np.array_equal(y_read[1][1], y[1][1][250:421])
+
+
+def test_subplot_blocks_roundtrip(make_test_data):
+    data_struct, x, y = make_test_data(100)
+
+    columns = columns_from_data(x, y)
+    x_split, y_split = split_columns(data_struct, columns)
+
+    assert np.shares_memory(x_split, columns)
+    for y_sp_split, y_sp in zip(y_split, y):
+        assert y_sp_split.shape == (len(y_sp), len(x))
+        assert np.shares_memory(y_sp_split, columns)
+
+    assert np.array_equal(columns_from_data(x_split, y_split), columns)
+    assert np.array_equal(
+        columns_from_data(x[10:20], slice_data(y_split, 10, 20)),
+        columns_from_data(x[10:20], slice_data(y, 10, 20)),
+    )
+
+
+def test_chunk_statistics_ignore_nan(tmp_path, make_test_data):
+    data_struct, x, y = make_test_data(300)
+    y[0][1][150] = np.nan
+    y[1][0][100:200] = np.nan
+    path = str(tmp_path / 'session.clabs')
+
+    with SessionWriter(path, data_struct, chunk_rows=100) as writer:
+        writer.append(x, y)
+
+    with open(path, 'rb') as file:
+        assert b'NaN' not in file.read()
+
+    reader = SessionReader(path)
+    assert reader.chunk_min[1, 2] == np.nanmin(y[0][1][100:200])
+    assert reader.chunk_max[1, 2] == np.nanmax(y[0][1][100:200])
+    # A field with only NaN samples has no extremes
+    assert np.isnan(reader.chunk_min[1, 4])
+    assert np.isnan(reader.chunk_max[1, 4])
+    assert reader.chunk_min[2, 4] == y[1][0][200:].min()
+    assert list(reader.find_chunks(x[120], x[180])) == [1]
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from clab_datalogger_receiver import session_sources
+from clab_datalogger_receiver.saver import (
+    save_as_arrow,
+    save_as_mat_v73,
+    save_as_session,
+)
+from clab_datalogger_receiver.session_sources import open_session_source
+
+
+def save_test_session(path: str, data_struct, x, y):
+    y[0][1][12345] = 50.0
+    y[1][0][54321] = -50.0
+
+    extension = path.rsplit('.', 1)[1]
+    if extension == 'parquet':
+        save_as_arrow(data_struct, x, y, path, row_group_size=10_000)
+    elif extension == 'mat':
+        save_as_mat_v73(data_struct, x, y, path, chunk_rows=4096)
+    else:
+        save_as_session(data_struct, x, y, path, chunk_rows=10_000)
+
+
+@pytest.mark.parametrize('extension', ['clabs', 'parquet', 'mat'])
+def test_envelope_of_large_range_is_read_in_slabs(
+    tmp_path, monkeypatch, extension, make_test_data
+):
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    if extension == 'mat':
+        pytest.importorskip('h5py')
+    monkeypatch.setattr(session_sources, 'MAX_ENVELOPE_READ_ROWS', 1000)
+    monkeypatch.setattr(session_sources, 'ENVELOPE_SLAB_ROWS', 10_000)
+
+    path = str(tmp_path / f'session.{extension}')
+    data_struct, x, y = make_test_data(100_000, dt=0.001)
+    save_test_session(path, data_struct, x, y)
+    source = open_session_source(path)
+
+    # Buckets of 200 rows: every slab is read and reduced
+    envelope = source.read_envelope(x[0], x[-1], 500)
+    assert 1000 <= envelope.shape[1] <= 1100
+    assert np.all(np.diff(envelope[0]) >= 0)
+    assert envelope[2].max() == 50.0
+    assert envelope[4].min() == -50.0
+
+    # Narrower range, cut inside the slabs
+    envelope = source.read_envelope(x[5000], x[95_000], 500)
+    assert envelope[0, 0] == x[5000]
+    assert envelope[0, -1] == x[95_000]
+    assert envelope[2].max() == 50.0
+
+    source.close()
+
+
+@pytest.mark.parametrize('extension', ['clabs', 'parquet'])
+def test_envelope_of_small_chunks_from_statistics(
+    tmp_path, monkeypatch, extension, make_test_data
+):
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(session_sources, 'MAX_ENVELOPE_READ_ROWS', 1000)
+
+    path = str(tmp_path / f'session.{extension}')
+    data_struct, x, y = make_test_data(100_000, dt=0.001)
+    save_test_session(path, data_struct, x, y)
+    source = open_session_source(path)
+
+    # Buckets of 20000 rows, larger than the chunks of 10000 rows
+    envelope = source.read_envelope(x[0], x[-1], 5)
+    assert envelope.shape[1] == 20
+    assert np.array_equal(envelope[0, 0::2], x[0::10_000])
+    assert np.array_equal(envelope[0, 1::2], x[9999::10_000])
+    assert envelope[2].max() == 50.0
+    assert envelope[4].min() == -50.0
+
+    source.close()
@@ -0,0 +1,29 @@
+import numpy as np
+
+from clab_datalogger_receiver.received_structure import PlottingStruct
+from clab_datalogger_receiver.session_store import SessionStore
+
+
+def test_append_grows_past_capacity(tmp_path):
+    data_struct = PlottingStruct.from_yaml_file(
+        'tests/test_struct_cfg_multiple.yaml'
+    )
+    store = SessionStore(
+        data_struct, session_dir=str(tmp_path), initial_capacity=4
+    )
+
+    x = np.arange(10, dtype=float)
+    y = [[x * (f_i + 1) for f_i in range(len(sp))] for sp in data_struct]
+
+    store.append(x[:3], [[y_f[:3] for y_f in y_sp] for y_sp in y])
+    first_view = store.x_data
+    store.append(x[3:], [[y_f[3:] for y_f in y_sp] for y_sp in y])
+
+    assert len(store) == 10
+    assert np.array_equal(store.x_data, x)
+    assert np.array_equal(first_view, x[:3])
+    for y_sp_stored, y_sp in zip(store.y_data, y):
+        for y_f_stored, y_f in zip(y_sp_stored, y_sp):
+            assert np.array_equal(y_f_stored, y_f)
+
+    store.close()
@@ -0,0 +1,55 @@
+import numpy as np
+
+from scipy.signal import welch
+
+from clab_datalogger_receiver.spectrum import StreamingWelch
+
+
+def test_streaming_welch_matches_scipy():
+    fs = 1000
+    n = 10_000
+    rng = np.random.default_rng(0)
+    x = np.arange(n) / fs
+    columns = np.vstack(
+        [
+            x,
+            np.sin(2 * np.pi * 123 * x) + rng.normal(0, 0.1, n),
+            rng.normal(0, 1, n),
+        ]
+    )
+
+    for segment_length in (256, 255):
+        spectrum = StreamingWelch(
+            2, segment_length=segment_length, overlap=0.5, n_averaged=1000
+        )
+        for start in range(0, n, 37):
+            spectrum.append(columns[:, start : start + 37])
+
+        step = spectrum.step
+        n_segments = (n - segment_length) // step + 1
+        frequencies, psd = welch(
+            columns[1:, : (n_segments - 1) * step + segment_length],
+            fs=fs,
+            nperseg=segment_length,
+            noverlap=segment_length - step,
+        )
+        assert np.allclose(spectrum.frequencies, frequencies)
+        assert np.allclose(spectrum.psd, psd)
+
+
+def test_streaming_welch_averages_last_segments():
+    fs = 2000
+    x = np.arange(20_000) / fs
+    columns = np.vstack([x, np.sin(2 * np.pi * 100 * x)])
+    columns[1, 10_000:] = np.sin(2 * np.pi * 400 * x[10_000:])
+
+    spectrum = StreamingWelch(1, segment_length=512, n_averaged=8)
+    assert not spectrum.ready
+    assert spectrum.append(columns[:, :100]) == 0
+    spectrum.append(columns[:, 100:])
+
+    assert spectrum.ready
+    assert np.isclose(spectrum.sample_rate, fs)
+    # Only the segments after the change of frequency are averaged
+    peak = spectrum.frequencies[np.argmax(spectrum.psd[0])]
+    assert abs(peak - 400) < fs / 512
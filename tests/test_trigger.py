@@ -0,0 +1,83 @@
+import numpy as np
+
+from clab_datalogger_receiver.trigger import (
+    Trigger,
+    TriggerSettings,
+    extract_capture,
+    find_trigger_samples,
+)
+
+
+def get_test_columns(n: int = 1000):
+    # Square wave with period 0.1 s, sampled at 1 kHz
+    times = np.arange(n) * 1e-3
+    values = np.where(np.arange(n) % 100 < 50, 1.0, -1.0)
+    return np.vstack([times, values, -values])
+
+
+def append_batches(trigger: Trigger, columns: np.ndarray, size: int = 7):
+    captures = []
+    for start in range(0, columns.shape[1], size):
+        captures.extend(trigger.append(columns[:, start : start + size]))
+    return captures
+
+
+def test_find_trigger_samples():
+    values = np.array([0.0, 2.0, 2.0, 0.0, np.nan, 2.0])
+
+    assert np.array_equal(
+        np.flatnonzero(find_trigger_samples(values, 0.0, 1.0, 'rising')), [1]
+    )
+    assert np.array_equal(
+        np.flatnonzero(find_trigger_samples(values, 2.0, 1.0, 'falling')),
+        [0, 3],
+    )
+    assert np.array_equal(
+        np.flatnonzero(find_trigger_samples(values, 0.0, 1.0, 'above')),
+        [1, 2, 5],
+    )
+
+
+def test_normal_mode_captures_every_edge():
+    columns = get_test_columns()
+    trigger = Trigger(TriggerSettings(column=2, level=0.0, pre=0.01, post=0.02))
+
+    captures = append_batches(trigger, columns)
+
+    # The rising edges of the inverted wave, split across the batches
+    assert np.allclose(captures, np.arange(0.05, 0.96, 0.1))
+    assert trigger.n_captures == len(captures)
+    assert not trigger.stopped
+
+
+def test_captures_do_not_overlap():
+    columns = get_test_columns()
+    trigger = Trigger(
+        TriggerSettings(column=1, level=0.0, condition='either', post=0.12)
+    )
+
+    captures = append_batches(trigger, columns, size=100)
+
+    assert np.all(np.diff(captures) > 0.12)
+
+
+def test_single_mode_stops_after_a_capture():
+    columns = get_test_columns()
+    trigger = Trigger(
+        TriggerSettings(
+            column=1, level=0.5, condition='above', post=0.03, mode='single'
+        )
+    )
+
+    assert append_batches(trigger, columns) == [0.0]
+    assert trigger.stopped
+
+
+def test_extract_capture():
+    columns = get_test_columns()
+
+    capture = extract_capture(columns, 0.25, pre=0.01, post=0.02)
+
+    assert np.isclose(capture[0, 0], -0.01)
+    assert np.isclose(capture[0, -1], 0.02)
+    assert np.array_equal(capture[1:], columns[1:, 240:271])
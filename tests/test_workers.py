@@ -0,0 +1,83 @@
+import threading
+import time
+
+from queue import Queue
+
+from PySide6.QtCore import QCoreApplication, QObject, QThread, Qt, Signal
+
+from clab_datalogger_receiver.workers import (
+    SaveWorker,
+    wait_packets,
+    wake_up,
+)
+
+
+def test_wait_packets_until_woken_up():
+    rx_queue = Queue(maxsize=10)
+    received = []
+
+    def consume():
+        while True:
+            packets, stop = wait_packets(rx_queue)
+            received.extend(packets)
+            if stop:
+                return
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+
+    for i in range(5):
+        rx_queue.put(i)
+    wake_up(rx_queue)
+    consumer.join(timeout=5)
+
+    assert not consumer.is_alive()
+    assert received == list(range(5))
+
+
+def test_wake_up_full_queue():
+    rx_queue = Queue(maxsize=1)
+    rx_queue.put(0)
+
+    wake_up(rx_queue)
+
+    assert wait_packets(rx_queue) == ([0], False)
+
+
+def test_cancel_running_save(tmp_path):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    started = threading.Event()
+    progress_calls = []
+
+    def save_fcn(progress):
+        started.set()
+        # Saves for at most 5 s, unless cancelled
+        for i in range(500):
+            progress_calls.append(i)
+            progress(i / 500)
+            time.sleep(0.01)
+
+    class Dialog(QObject):
+        canceled = Signal()
+
+    dialog = Dialog()
+    save_thread = QThread()
+    save_worker = SaveWorker(save_fcn, str(tmp_path / 'saved.txt'))
+    save_thread.started.connect(save_worker.run)
+    save_worker.finished.connect(save_thread.quit)
+    dialog.canceled.connect(
+        save_worker.cancel, Qt.ConnectionType.DirectConnection
+    )
+    save_worker.moveToThread(save_thread)
+    save_thread.start()
+
+    assert started.wait(5)
+    dialog.canceled.emit()
+    # `quit()` is queued to this thread, that owns the QThread
+    deadline = time.monotonic() + 10
+    while not save_thread.wait(10) and time.monotonic() < deadline:
+        app.processEvents()
+    assert save_thread.isFinished()
+
+    assert save_worker.cancel_requested
+    assert len(progress_calls) < 100